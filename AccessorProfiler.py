@@ -0,0 +1,205 @@
+import re
+import time
+import pstats
+import inspect
+import functools
+import threading
+from .LazyModule import LazyModule
+from .Robot import Robot
+
+sp = LazyModule("sympy") # only imported on first symbolic use
+
+class AccessorProfiler:
+    """
+    Opt in instrumentation of the Robot accessors (get_Xmat*, get_dXmat*, get_d2Xmat*,
+    get_Imat*, get_S* by default). While enabled, the accessors of the Robot class
+    are replaced by timing wrappers and sympy's lambdify is wrapped to count the
+    compilations made inside each accessor. Disabling restores the original
+    methods, so there is no overhead at all when disabled.
+
+    Per accessor (and per accessor family, e.g. get_Xmat_hom_Funcs_ordered_by_id
+    belongs to "Xmat_hom_Func") it records:
+    - calls                 - number of calls
+    - cumulative_time       - seconds spent in the accessor (including nested accessors)
+    - own_time              - seconds excluding nested instrumented accessors
+    - lambdify_compilations - number of lambdify calls made inside the accessor
+    - lambdify_time         - seconds spent in those lambdify calls
+
+    Only one profiler can be enabled at a time (it instruments the Robot class,
+    so every robot is measured). Usage:
+
+        with AccessorProfiler() as profiler:
+            CodeGenerator(robot).generate_source()
+        profiler.get_stats(by = "family")
+        profiler.get_pstats().sort_stats("cumulative").print_stats(10)
+    """
+    DEFAULT_PATTERN = r"^get_(Xmats?|dXmats?|d2Xmats?|Imats?|Ss?)(_|$)"
+    # selector suffixes and plural tokens removed to name an accessor's family
+    SELECTORS = ("_ordered_by_id", "_ordered_by_name", "_dict_by_id", "_dict_by_name", "_by_bfs_level", "_by_id", "_by_name")
+    PLURALS = {"Xmats": "Xmat", "dXmats": "dXmat", "d2Xmats": "d2Xmat", "Imats": "Imat", "Ss": "S", "Funcs": "Func"}
+    OUTSIDE = "<outside accessors>" # lambdify compilations made outside the instrumented accessors
+    _active = None # the enabled profiler
+
+    def __init__(self, pattern = None):
+        self.pattern = re.compile(pattern or AccessorProfiler.DEFAULT_PATTERN)
+        self.names = sorted(name for name, value in vars(Robot).items() if callable(value) and self.pattern.match(name))
+        self.originals = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    @staticmethod
+    def get_family(name):
+        # "get_Xmats_hom_ordered_by_id" -> "Xmat_hom"
+        family = name[4:] if name.startswith("get_") else name
+        for selector in AccessorProfiler.SELECTORS:
+            if family.endswith(selector):
+                family = family[:-len(selector)]
+                break
+        return "_".join(AccessorProfiler.PLURALS.get(token, token) for token in family.split("_"))
+
+    def reset(self):
+        # clear every record (the profiler stays enabled if it is)
+        with self.lock:
+            self.records = {}
+
+    def is_enabled(self):
+        return AccessorProfiler._active is self
+
+    def enable(self):
+        if AccessorProfiler._active is self:
+            return
+        if AccessorProfiler._active is not None:
+            raise RuntimeError("Another AccessorProfiler is already enabled")
+        AccessorProfiler._active = self
+        for name in self.names:
+            self.originals[name] = vars(Robot)[name]
+            setattr(Robot, name, self.wrap(name, self.originals[name]))
+        self.originals["<lambdify>"] = sp.utilities.lambdify
+        sp.utilities.lambdify = self.wrap_lambdify(sp.utilities.lambdify)
+
+    def disable(self):
+        if AccessorProfiler._active is not self:
+            return
+        sp.utilities.lambdify = self.originals.pop("<lambdify>")
+        for name, function in self.originals.items():
+            setattr(Robot, name, function)
+        self.originals = {}
+        AccessorProfiler._active = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.disable()
+
+    def get_stack(self):
+        # [[accessor name, seconds in nested accessors]] of the calling thread
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def get_record(self, name):
+        # (called with the lock held)
+        if name not in self.records:
+            self.records[name] = {"calls": 0, "cumulative_time": 0.0, "own_time": 0.0, \
+                                  "lambdify_compilations": 0, "lambdify_time": 0.0}
+        return self.records[name]
+
+    def wrap(self, name, function):
+        profiler = self
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = profiler.get_stack()
+            stack.append([name, 0.0])
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()[1]
+                if len(stack) > 0:
+                    stack[-1][1] += elapsed
+                with profiler.lock:
+                    record = profiler.get_record(name)
+                    record["calls"] += 1
+                    record["cumulative_time"] += elapsed
+                    record["own_time"] += elapsed - nested
+        return wrapper
+
+    def wrap_lambdify(self, lambdify):
+        profiler = self
+        @functools.wraps(lambdify)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return lambdify(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                stack = profiler.get_stack()
+                with profiler.lock:
+                    record = profiler.get_record(stack[-1][0] if len(stack) > 0 else AccessorProfiler.OUTSIDE)
+                    record["lambdify_compilations"] += 1
+                    record["lambdify_time"] += elapsed
+        return wrapper
+
+    def get_stats(self, by = "accessor"):
+        """
+        Returns the recorded statistics.
+
+        Inputs:
+        - (str) by - "accessor" (one entry per accessor) or "family" (summed per accessor family)
+
+        Output:
+        - {str: dict} - calls, cumulative_time, own_time, lambdify_compilations, lambdify_time
+        """
+        with self.lock:
+            records = {name: dict(record) for name, record in self.records.items()}
+        if by == "accessor":
+            return records
+        if by != "family":
+            raise ValueError("Unknown grouping [" + str(by) + "], use accessor or family")
+        families = {}
+        for name, record in records.items():
+            family = name if name == AccessorProfiler.OUTSIDE else AccessorProfiler.get_family(name)
+            if family not in families:
+                families[family] = dict(record)
+            else:
+                for key, value in record.items():
+                    families[family][key] += value
+        return families
+
+    def create_stats(self):
+        # fills self.stats in the cProfile format so pstats.Stats(profiler) can load it
+        # {(file, line, name): (primitive calls, calls, own time, cumulative time, callers)}
+        self.stats = {}
+        lambdify_key = ("~", 0, "<lambdify>")
+        lambdify_calls = 0
+        lambdify_time = 0.0
+        lambdify_callers = {}
+        for name, record in self.get_stats().items():
+            function = self.originals.get(name, vars(Robot).get(name))
+            if name == AccessorProfiler.OUTSIDE or function is None:
+                key = ("~", 0, name)
+            else:
+                key = (inspect.getsourcefile(function), function.__code__.co_firstlineno, "Robot." + name)
+            if record["calls"] > 0:
+                # (lambdify is reported as a callee so its time is not part of the accessor's own time)
+                own_time = max(0.0, record["own_time"] - record["lambdify_time"])
+                self.stats[key] = (record["calls"], record["calls"], own_time, record["cumulative_time"], {})
+            if record["lambdify_compilations"] > 0:
+                compilations = record["lambdify_compilations"]
+                lambdify_callers[key] = (compilations, compilations, record["lambdify_time"], record["lambdify_time"])
+                lambdify_calls += compilations
+                lambdify_time += record["lambdify_time"]
+        if lambdify_calls > 0:
+            self.stats[lambdify_key] = (lambdify_calls, lambdify_calls, lambdify_time, lambdify_time, lambdify_callers)
+
+    def get_pstats(self):
+        # pstats.Stats report (sort_stats, print_stats, print_callers, dump_stats, ...)
+        return pstats.Stats(self)
+
+    def dump_stats(self, filename):
+        # writes a pstats file (e.g., for snakeviz or python -m pstats)
+        self.get_pstats().dump_stats(filename)
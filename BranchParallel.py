@@ -0,0 +1,226 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+class BranchParallelExecutor:
+    """
+    Runs the batched kinematics and dynamics of a robot with the independent
+    branches of its tree on a thread pool (NumPy releases the GIL inside its
+    array operations). The joints are split into:
+    - the trunk - the joints down to the branch points that were split (run on the calling thread)
+    - tasks     - balanced groups of whole subtrees hanging off the trunk (one per thread)
+
+    Forward passes run the trunk first and then every task concurrently. Backward
+    passes run every task concurrently up to its subtree roots, then the forces
+    of the subtree roots are reduced into the trunk on the calling thread in the
+    same (joint id) order as NumericModel, so results do not depend on the thread
+    scheduling or the number of threads. A serial chain is a single task, so only
+    branched trees (humanoids, multi arm rigs, hands) run in parallel.
+    """
+
+    def __init__(self, robot, num_threads = None, dtype = np.float64):
+        self.model = robot.get_numeric_model(dtype)
+        self.num_threads = max(1, int(num_threads or os.cpu_count() or 1))
+        self.pool = None
+        self.partition(robot)
+
+    def partition(self, robot):
+        # split the tree into the trunk and at most num_threads tasks of similar size
+        model = self.model
+        schedule = model.schedule
+        children = [[] for _ in range(model.num_joints)]
+        for jid, parent_id in enumerate(model.parent_ids):
+            if parent_id != -1:
+                children[parent_id].append(jid)
+        sizes = [len(robot.get_subtree_by_id(jid)) for jid in range(model.num_joints)]
+        target_size = model.num_joints / self.num_threads
+        trunk = []
+        subtrees = [jid for jid in range(model.num_joints) if model.parent_ids[jid] == -1]
+        # split the largest subtree at its next branch point until every subtree fits a thread
+        while len(subtrees) > 0:
+            largest = max(subtrees, key = lambda jid: (sizes[jid], -jid))
+            if sizes[largest] <= target_size:
+                break
+            chain = [largest]
+            while len(children[chain[-1]]) == 1:
+                chain.append(children[chain[-1]][0])
+            if len(children[chain[-1]]) == 0:
+                break # a serial chain cannot be split
+            trunk.extend(chain)
+            subtrees.remove(largest)
+            subtrees.extend(children[chain[-1]])
+        # greedy balancing: the largest subtrees first, each to the least loaded task
+        task_roots = [[] for _ in range(self.num_threads)]
+        loads = [0] * self.num_threads
+        for root in sorted(subtrees, key = lambda jid: (-sizes[jid], jid)):
+            ind = int(np.argmin(loads))
+            task_roots[ind].append(root)
+            loads[ind] += sizes[root]
+        self.trunk_jids = np.array(sorted(trunk), dtype = int)
+        self.trunk_levels = schedule.get_sublevels(self.trunk_jids)
+        self.tasks = []
+        for roots in task_roots:
+            if len(roots) == 0:
+                continue
+            jids = np.array(sorted(sum([robot.get_subtree_by_id(root) for root in roots], [])), dtype = int)
+            internal = np.array([jid for jid in jids if jid not in roots], dtype = int)
+            self.tasks.append({"roots": sorted(roots), "jids": jids, "index": schedule.as_index(jids), \
+                               "levels": schedule.get_sublevels(jids), \
+                               "backward_levels": schedule.get_sublevels(internal, reverse = True)})
+        self.tasks.sort(key = lambda task: task["jids"][0])
+        # the joints that pass their forces into the trunk (trunk joints and the task roots below them)
+        into_trunk = [jid for jid in range(model.num_joints) if model.parent_ids[jid] in trunk]
+        self.reduction_levels = schedule.get_sublevels(into_trunk, reverse = True)
+
+    def get_trunk(self):
+        # (k,) joint ids run on the calling thread
+        return self.trunk_jids
+
+    def get_tasks(self):
+        # [(k,) joint ids] of each task
+        return [task["jids"] for task in self.tasks]
+
+    def get_num_tasks(self):
+        return len(self.tasks)
+
+    def is_serial(self):
+        # a single task without a trunk is the whole tree (the NumericModel passes are used directly)
+        return len(self.tasks) <= 1 and len(self.trunk_jids) == 0
+
+    def run_tasks(self, function):
+        # function(task) for every task (on the thread pool if there is more than one)
+        if len(self.tasks) == 1 or self.num_threads == 1:
+            return [function(task) for task in self.tasks]
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers = self.num_threads)
+        return list(self.pool.map(function, self.tasks))
+
+    def close(self):
+        # shut down the thread pool (it is restarted on the next call)
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def forward_kinematics_hom(self, Q, include_fixed_joints = False):
+        """
+        Returns the world pose of every link (see NumericModel.forward_kinematics_hom).
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - (bool) include_fixed_joints - append the fixed joint frames after the links
+
+        Output:
+        - (N, num_joints [+ num_fixed_joints], 4, 4) array
+        """
+        model = self.model
+        if self.is_serial():
+            return model.forward_kinematics_hom(Q, include_fixed_joints)
+        Q = model.as_batch(Q, model.num_pos)
+        N = Q.shape[0]
+        num_frames = model.num_joints + (len(model.fixed_joint_names) if include_fixed_joints else 0)
+        T_local = np.empty((N, model.num_joints, 4, 4), dtype = model.dtype)
+        T = np.zeros((N, num_frames, 4, 4), dtype = model.dtype)
+        if len(self.trunk_jids) > 0:
+            T_local[:, self.trunk_jids] = model.joint_transforms_hom(Q, self.trunk_jids)
+            model.forward_poses(T, T_local, self.trunk_levels)
+        def run_task(task):
+            T_local[:, task["index"]] = model.joint_transforms_hom(Q, task["jids"])
+            model.forward_poses(T, T_local, task["levels"])
+        self.run_tasks(run_task)
+        if include_fixed_joints:
+            model.fixed_joint_poses(T)
+        return T
+
+    def inverse_dynamics(self, Q, QD, QDD, gravity = 9.81):
+        """
+        Returns the joint forces / torques (see NumericModel.inverse_dynamics).
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - QD, QDD - (N, num_vel) or (num_vel,) joint velocities and accelerations
+        - (float) gravity - acceleration of gravity (along -z of the base frame)
+
+        Output:
+        - (N, num_vel) array
+        """
+        model = self.model
+        if self.is_serial():
+            return model.inverse_dynamics(Q, QD, QDD, gravity)
+        Q = model.as_batch(Q, model.num_pos)
+        N = Q.shape[0]
+        QD = np.broadcast_to(model.as_batch(QD, model.num_vel), (N, model.num_vel))
+        QDD = np.broadcast_to(model.as_batch(QDD, model.num_vel), (N, model.num_vel))
+        a_base = model.base_acceleration(gravity)
+        X = np.empty((N, model.num_joints, 6, 6), dtype = model.dtype)
+        vJ = model.joint_motions(QD)
+        v = np.zeros((N, model.num_joints, 6), dtype = model.dtype)
+        a = model.joint_motions(QDD)
+        f = np.empty((N, model.num_joints, 6), dtype = model.dtype)
+        def forward(jids, index, levels):
+            X[:, index] = model.joint_transforms(Q, jids)
+            model.forward_motions(X, vJ, v, a, a_base, levels)
+            f[:, index] = model.link_forces(v[:, index], a[:, index], index)
+        if len(self.trunk_jids) > 0:
+            forward(self.trunk_jids, self.trunk_jids, self.trunk_levels)
+        def run_task(task):
+            forward(task["jids"], task["index"], task["levels"])
+            model.backward_forces(X, f, task["backward_levels"])
+        self.run_tasks(run_task)
+        # deterministic reduction of the subtree forces into the trunk
+        model.backward_forces(X, f, self.reduction_levels)
+        return model.project_forces(f)
+
+    @staticmethod
+    def benchmark_scaling(robot, N = 4096, thread_counts = None, repeats = 5, dtype = np.float64, rng = None):
+        """
+        Times forward_kinematics_hom and inverse_dynamics for several thread counts
+        (the best of repeats runs on random states within the limits).
+
+        Inputs:
+        - (Robot) robot - the robot
+        - (int) N - batch size
+        - thread_counts - [int] thread counts (powers of two up to the number of cores if None)
+        - (int) repeats - timed runs per thread count
+        - dtype - floating point type
+        - rng - numpy Generator or seed (optional)
+
+        Output:
+        - [dict] - per thread count: num_threads, num_tasks, fk_seconds, id_seconds,
+                   fk_speedup, id_speedup (over the serial NumericModel), and max_error
+        """
+        model = robot.get_numeric_model(dtype)
+        if thread_counts is None:
+            num_cores = os.cpu_count() or 1
+            thread_counts = sorted(set([2**power for power in range(num_cores.bit_length()) if 2**power <= num_cores] + [num_cores]))
+        rng = np.random.default_rng(rng)
+        Q = model.sample_uniform(N, rng)
+        QD = rng.standard_normal((N, model.num_vel)).astype(dtype)
+        QDD = rng.standard_normal((N, model.num_vel)).astype(dtype)
+        def best_time(function):
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                function()
+                times.append(time.perf_counter() - start)
+            return min(times)
+        serial_fk = best_time(lambda: model.forward_kinematics_hom(Q))
+        serial_id = best_time(lambda: model.inverse_dynamics(Q, QD, QDD))
+        tau = model.inverse_dynamics(Q, QD, QDD)
+        results = []
+        for num_threads in thread_counts:
+            with BranchParallelExecutor(robot, num_threads, dtype) as executor:
+                fk_seconds = best_time(lambda: executor.forward_kinematics_hom(Q))
+                id_seconds = best_time(lambda: executor.inverse_dynamics(Q, QD, QDD))
+                max_error = float(np.max(np.abs(executor.inverse_dynamics(Q, QD, QDD) - tau), initial = 0))
+                results.append({"num_threads": num_threads, "num_tasks": executor.get_num_tasks(), \
+                                "fk_seconds": fk_seconds, "id_seconds": id_seconds, \
+                                "fk_speedup": serial_fk / fk_seconds, "id_speedup": serial_id / id_seconds, \
+                                "max_error": max_error})
+        return results
@@ -0,0 +1,233 @@
+import os
+import hashlib
+import tempfile
+import importlib.util
+import numpy as np
+from .LazyModule import LazyModule
+
+sp = LazyModule("sympy") # only imported on first symbolic use
+
+class CodeGenerator:
+    """
+    Exports the whole kinematic chain of a robot as a single flat NumPy module.
+
+    The world transforms of every link (and fixed joint frame) are built from the
+    per-joint Xmat_sp / Xmat_sp_hom expressions, common subexpressions are
+    eliminated across all of them (so e.g. each sin/cos of a joint angle is
+    computed once), and the result is written as straight-line code that
+    evaluates all frames for a batch of configurations in one call.
+    Generated modules are cached on disk (and in memory) by model hash.
+    """
+    VERSION = 1          # bump when the generated code changes
+    loaded_modules = {}  # model hash -> module (shared by all generators in the process)
+
+    def __init__(self, robot, cache_dir = None):
+        self.robot = robot
+        self.cache_dir = cache_dir if cache_dir is not None else \
+                         os.path.join(tempfile.gettempdir(), "urdfparser_codegen")
+        self.model_hash = None
+
+    #################
+    #    Getters    #
+    #################
+
+    def get_model_hash(self):
+        """
+        Returns a hash of everything the generated code depends on
+        (transforms, topology, fixed joint frames, and the state layout).
+
+        Output:
+        - (str) - hex digest
+        """
+        if self.model_hash is None:
+            hasher = hashlib.sha256()
+            hasher.update(repr((CodeGenerator.VERSION, self.robot.floating_base, self.robot.using_quaternion)).encode())
+            for joint in self.robot.get_joints_ordered_by_id():
+                parent_id = self.robot.get_link_by_name(joint.get_parent()).get_id()
+                hasher.update(repr((joint.get_name(), joint.get_id(), parent_id)).encode())
+                hasher.update(sp.srepr(joint.get_transformation_matrix()).encode())
+                if joint.get_transformation_matrix_hom() is not None:
+                    hasher.update(sp.srepr(joint.get_transformation_matrix_hom()).encode())
+            for fixed_joint in self.robot.get_fixed_joints_ordered_by_id():
+                hasher.update(repr((fixed_joint.get_name(), fixed_joint.get_parent())).encode())
+                hasher.update(np.ascontiguousarray(fixed_joint.get_transformation_matrix_hom(), dtype = float).tobytes())
+            self.model_hash = hasher.hexdigest()
+        return self.model_hash
+
+    def get_frame_names(self):
+        # link frames (named by their joint, in joint id order) followed by the fixed joint frames
+        return [joint.get_name() for joint in self.robot.get_joints_ordered_by_id()] + \
+               [fixed_joint.get_name() for fixed_joint in self.robot.get_fixed_joints_ordered_by_id()]
+
+    def has_hom(self):
+        # homogenous transforms are not built for floating base robots
+        return all(joint.get_transformation_matrix_hom() is not None for joint in self.robot.joints)
+
+    ####################
+    #    Generation    #
+    ####################
+
+    def load_module(self):
+        """
+        Returns the generated module, generating and writing it to the cache
+        directory only if no module with the same model hash exists yet.
+
+        Output:
+        - (module) - with fk_spatial(q) (and fk_hom(q) for fixed base robots)
+        """
+        model_hash = self.get_model_hash()
+        if model_hash in CodeGenerator.loaded_modules:
+            return CodeGenerator.loaded_modules[model_hash]
+        module_name = "urdfparser_fk_" + model_hash[:16]
+        path = os.path.join(self.cache_dir, module_name + ".py")
+        if not os.path.exists(path):
+            self.write_module(path)
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        CodeGenerator.loaded_modules[model_hash] = module
+        return module
+
+    def write_module(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        # write then rename so concurrent processes never import a partial file
+        fd, tmp_path = tempfile.mkstemp(suffix = ".py", dir = os.path.dirname(path))
+        with os.fdopen(fd, "w") as module_file:
+            module_file.write(self.generate_source())
+        os.replace(tmp_path, path)
+
+    def generate_source(self):
+        """
+        Generates the source of the flat NumPy FK module.
+
+        Output:
+        - (str) - python source
+        """
+        frame_names = self.get_frame_names()
+        lines = ["# Auto-generated by URDFParser.CodeGenerator for robot [" + self.robot.get_name() + "]. Do not edit.", \
+                 "import numpy", \
+                 "", \
+                 "MODEL_HASH = \"" + self.get_model_hash() + "\"", \
+                 "NUM_POS = " + str(self.robot.get_num_pos()), \
+                 "FRAME_NAMES = " + repr(frame_names), \
+                 "SPATIAL_FRAME_NAMES = " + repr(frame_names[:self.robot.get_num_joints()]), \
+                 ""]
+        # ^iX_0 = ^iX_parent * ^parentX_0 for all joints
+        lines += self.generate_function("fk_spatial", "spatial (6x6) transforms from the world frame to each link frame", \
+                                        self.build_chain(spatial = True), 6)
+        if self.has_hom():
+            # T_world_i = T_world_parent * T_parent_i for all joints and fixed joint frames
+            lines += self.generate_function("fk_hom", "homogenous (4x4) world poses of each link and fixed joint frame", \
+                                            self.build_chain(spatial = False), 4)
+        return "\n".join(lines) + "\n"
+
+    def get_joint_symbols(self, joint):
+        # maps the joint's free symbols to entries of the state vector
+        q_inds = self.robot.get_joint_index_q(joint.get_id())
+        if joint.jtype == "floating":
+            if self.robot.using_quaternion:
+                fb_symbols = [joint.x_fb, joint.y_fb, joint.z_fb, joint.q1_fb, joint.q2_fb, joint.q3_fb, joint.q4_fb]
+            else:
+                fb_symbols = [joint.x_fb, joint.y_fb, joint.z_fb, joint.roll_fb, joint.pitch_fb, joint.yaw_fb]
+            return {symbol: sp.Symbol("q" + str(ind)) for symbol, ind in zip(fb_symbols, q_inds)}
+        return {joint.theta: sp.Symbol("q" + str(q_inds))}
+
+    def build_chain(self, spatial):
+        """
+        Builds the world transform of every frame. Each frame refers to its parent's
+        (non constant) entries through symbols to avoid expression swell.
+
+        Outputs:
+        - [(Symbol, expr)] - assignments (in dependency order)
+        - [Matrix] - the transform of each output frame (entries are symbols or constants)
+        """
+        size = 6 if spatial else 4
+        assignments = []
+        world = {} # link name -> matrix of symbols / constants
+        root_name = self.robot.get_link_by_id(-1).get_name()
+        world[root_name] = sp.eye(size)
+        frames = []
+        for joint in self.robot.get_joints_ordered_by_id():
+            local = joint.get_transformation_matrix() if spatial else joint.get_transformation_matrix_hom()
+            local = local.xreplace(self.get_joint_symbols(joint))
+            parent_world = world[joint.get_parent()]
+            full = local * parent_world if spatial else parent_world * local
+            world[joint.get_child()] = self.symbolize(full, "X" + str(joint.get_id()) + "_", assignments)
+            frames.append(world[joint.get_child()])
+        if not spatial:
+            link_by_joint = {joint.get_name(): joint.get_child() for joint in self.robot.joints}
+            link_by_joint[None] = root_name # fixed joints attached to the base link
+            for fixed_joint in self.robot.get_fixed_joints_ordered_by_id():
+                local = sp.Matrix(np.asarray(fixed_joint.get_transformation_matrix_hom(), dtype = float))
+                full = world[link_by_joint[fixed_joint.get_parent()]] * local
+                frames.append(self.symbolize(full, "F" + str(fixed_joint.get_id()) + "_", assignments))
+        return assignments, frames
+
+    def symbolize(self, matrix, prefix, assignments):
+        # constants are kept inline, everything else is assigned to a fresh symbol
+        out = sp.zeros(matrix.rows, matrix.cols)
+        for row in range(matrix.rows):
+            for col in range(matrix.cols):
+                entry = matrix[row, col]
+                if entry.is_number:
+                    out[row, col] = sp.Float(entry) if entry != 0 else sp.S.Zero
+                else:
+                    symbol = sp.Symbol(prefix + str(row) + str(col))
+                    assignments.append((symbol, entry))
+                    out[row, col] = symbol
+        return out
+
+    def generate_function(self, func_name, description, chain, size):
+        assignments, frames = chain
+        # eliminate common subexpressions across every frame at once
+        symbols = [symbol for symbol, _ in assignments]
+        replacements, reduced = sp.cse([expr for _, expr in assignments], \
+                                       symbols = sp.numbered_symbols("c"), order = "none")
+        statements = self.topological_sort(replacements + list(zip(symbols, reduced)))
+        printer = sp.printing.numpy.NumPyPrinter({"fully_qualified_modules": True, "inline": True})
+        used_q = sorted({int(symbol.name[1:]) for _, expr in statements for symbol in expr.free_symbols \
+                         if symbol.name[0] == "q" and symbol.name[1:].isdigit()})
+        lines = ["def " + func_name + "(q):", \
+                 "    \"\"\"", \
+                 "    Returns the " + description + ".", \
+                 "", \
+                 "    Inputs:", \
+                 "    - q - (..., NUM_POS) array of joint positions", \
+                 "", \
+                 "    Outputs:", \
+                 "    - (..., " + str(len(frames)) + ", " + str(size) + ", " + str(size) + ") array", \
+                 "    \"\"\"", \
+                 "    q = numpy.asarray(q)", \
+                 "    if q.dtype.kind != \"f\":", \
+                 "        q = q.astype(numpy.float64)", \
+                 "    out = numpy.zeros(q.shape[:-1] + (" + str(len(frames)) + ", " + str(size) + ", " + str(size) + "), dtype = q.dtype)"]
+        lines += ["    q" + str(ind) + " = q[..., " + str(ind) + "]" for ind in used_q]
+        lines += ["    " + symbol.name + " = " + printer.doprint(expr) for symbol, expr in statements]
+        for frame_id, frame in enumerate(frames):
+            for row in range(size):
+                for col in range(size):
+                    entry = frame[row, col]
+                    if entry != 0:
+                        value = entry.name if entry.is_Symbol else repr(float(entry))
+                        lines.append("    out[..., " + str(frame_id) + ", " + str(row) + ", " + str(col) + "] = " + value)
+        lines += ["    return out", ""]
+        return lines
+
+    def topological_sort(self, statements):
+        # order assignments so every symbol is defined before it is used
+        defined = {symbol for symbol, _ in statements}
+        remaining = list(statements)
+        ordered = []
+        done = set()
+        while remaining:
+            next_remaining = []
+            for symbol, expr in remaining:
+                if all(dep in done or dep not in defined for dep in expr.free_symbols):
+                    ordered.append((symbol, expr))
+                    done.add(symbol)
+                else:
+                    next_remaining.append((symbol, expr))
+            if len(next_remaining) == len(remaining):
+                raise ValueError("Cyclic dependency in generated code")
+            remaining = next_remaining
+        return ordered
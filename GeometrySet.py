@@ -0,0 +1,92 @@
+import numpy as np
+
+class GeometrySet:
+    """
+    The collision or visual geometry of a link stored as NumPy arrays.
+
+    For geometry k:
+    - types[k]        - BOX, CYLINDER, SPHERE, or MESH
+    - params[k]       - box: size xyz, cylinder: (radius, length, 0), sphere: (radius, 0, 0), mesh: scale xyz
+    - origins[k]      - 4x4 homogenous pose in the link frame
+    - mesh_filenames[k] - mesh reference (None for primitives)
+    """
+    BOX = 0
+    CYLINDER = 1
+    SPHERE = 2
+    MESH = 3
+    __slots__ = ("types", "params", "origins", "mesh_filenames")
+
+    def __init__(self):
+        self.types = np.zeros(0, dtype = int)
+        self.params = np.zeros((0, 3))
+        self.origins = np.zeros((0, 4, 4))
+        self.mesh_filenames = []
+
+    def add(self, gtype, params, origin_hom, mesh_filename = None):
+        # arrays are replaced (never modified in place) so GeometrySets can be shared by clones
+        self.types = np.append(self.types, gtype)
+        self.params = np.vstack((self.params, np.reshape(np.asarray(params, dtype = float), (1, 3))))
+        self.origins = np.concatenate((self.origins, np.reshape(origin_hom, (1, 4, 4))))
+        self.mesh_filenames = self.mesh_filenames + [mesh_filename]
+
+    def extend(self, other, hom_xfrm = None):
+        # append other's geometry (optionally moved by hom_xfrm, the pose of other's frame in this frame)
+        other_origins = other.origins if hom_xfrm is None else np.matmul(hom_xfrm, other.origins)
+        self.types = np.concatenate((self.types, other.types))
+        self.params = np.vstack((self.params, other.params))
+        self.origins = np.concatenate((self.origins, other_origins))
+        self.mesh_filenames = self.mesh_filenames + other.mesh_filenames
+
+    def clone(self):
+        new_set = GeometrySet()
+        new_set.extend(self)
+        return new_set
+
+    def get_num_geometries(self):
+        return len(self.types)
+
+    def is_empty(self):
+        return len(self.types) == 0
+
+    def get_half_extents(self):
+        """
+        Returns the half extents of each (primitive) geometry's box in its own frame.
+        Meshes are not loaded so their extents are unknown (nan).
+
+        Output:
+        - (k, 3) array
+        """
+        half_extents = np.full((len(self.types), 3), np.nan)
+        boxes = self.types == GeometrySet.BOX
+        half_extents[boxes] = 0.5*self.params[boxes]
+        cylinders = self.types == GeometrySet.CYLINDER
+        half_extents[cylinders] = np.stack((self.params[cylinders, 0], self.params[cylinders, 0], 0.5*self.params[cylinders, 1]), axis = -1)
+        spheres = self.types == GeometrySet.SPHERE
+        half_extents[spheres] = self.params[spheres, :1]
+        return half_extents
+
+    def get_bounding_radii(self):
+        # radius of the sphere around each geometry's origin that contains it (nan for meshes)
+        radii = np.linalg.norm(self.get_half_extents(), axis = -1)
+        spheres = self.types == GeometrySet.SPHERE
+        radii[spheres] = self.params[spheres, 0]
+        cylinders = self.types == GeometrySet.CYLINDER
+        radii[cylinders] = np.hypot(self.params[cylinders, 0], 0.5*self.params[cylinders, 1])
+        return radii
+
+    def get_bounding_sphere(self):
+        """
+        Returns a sphere (in the link frame) containing all primitive geometry.
+
+        Output:
+        - (4,) array center xyz and radius (nan if there is no primitive geometry)
+        """
+        radii = self.get_bounding_radii()
+        known = ~np.isnan(radii)
+        if not np.any(known):
+            return np.full(4, np.nan)
+        centers = self.origins[known, :3, 3]
+        radii = radii[known]
+        center = 0.5*(np.min(centers - radii[:,None], axis = 0) + np.max(centers + radii[:,None], axis = 0))
+        radius = np.max(np.linalg.norm(centers - center, axis = -1) + radii)
+        return np.append(center, radius)
@@ -1,6 +1,8 @@
 import numpy as np
 
 class InertiaSet:
+    __slots__ = ("ixx", "ixy", "ixz", "iyy", "iyz", "izz")
+
     def __init__(self, ixx_in, ixy_in, ixz_in, iyy_in, iyz_in, izz_in):
         self.ixx = ixx_in
         self.ixy = ixy_in
@@ -0,0 +1,137 @@
+import numpy as np
+from .NumericModel import NumericModel
+
+class InverseKinematics:
+    """
+    Batched damped least squares inverse kinematics for a named link, joint, or
+    fixed joint frame. Every target of a batch is iterated at once and targets
+    drop out of the batch as soon as they converge:
+
+        dq = J^T (J J^T + damping^2 I)^-1 e
+
+    where e is the [orientation; position] error of the frame in world coordinates.
+    Positions are clamped to the parsed joint limits after every step. The
+    floating base (if any) is not moved, its pose is taken from the initial positions.
+    """
+
+    def __init__(self, robot, frame_name, damping = 1e-2, max_iterations = 100, position_tolerance = 1e-4, \
+                       orientation_tolerance = 1e-3, max_step = 0.5, dtype = np.float64):
+        self.model = robot.get_numeric_model(dtype)
+        self.frame_name = frame_name
+        self.model.get_frame(frame_name) # fail early on unknown frames
+        self.damping = damping
+        self.max_iterations = max_iterations
+        self.position_tolerance = position_tolerance
+        self.orientation_tolerance = orientation_tolerance
+        self.max_step = max_step
+        # the joints that are solved for and their position / velocity indices
+        moving = self.model.jtypes != NumericModel.FLOATING
+        self.q_inds = self.model.q_index[moving]
+        self.v_inds = self.model.v_index[moving]
+
+    def initial_positions(self, N):
+        # zero positions (identity floating base quaternion) clamped to the limits
+        Q = np.zeros((N, self.model.num_pos), dtype = self.model.dtype)
+        if self.model.floating_base and self.model.using_quaternion:
+            Q[:, 4] = 1 # the scalar part (see quat_to_rot_sp)
+        return self.model.clamp(Q)
+
+    def pose_error(self, poses, targets, position_only):
+        # (N, 6) [orientation; position] error (or (N, 3) position error) in world coordinates
+        position_error = targets[:, :3, 3] - poses[:, :3, 3]
+        if position_only:
+            return position_error
+        # rotation vector of R_target R^T
+        R_error = targets[:, :3, :3] @ np.swapaxes(poses[:, :3, :3], -1, -2)
+        vee = 0.5*np.stack((R_error[:, 2, 1] - R_error[:, 1, 2], \
+                            R_error[:, 0, 2] - R_error[:, 2, 0], \
+                            R_error[:, 1, 0] - R_error[:, 0, 1]), axis = -1)
+        sin_angle = np.linalg.norm(vee, axis = -1)
+        cos_angle = 0.5*(np.trace(R_error, axis1 = -2, axis2 = -1) - 1)
+        angle = np.arctan2(sin_angle, cos_angle)
+        scale = np.divide(angle, sin_angle, out = np.ones_like(angle), where = sin_angle > 1e-9)
+        return np.concatenate((vee*scale[:, None], position_error), axis = -1)
+
+    def solve(self, targets, Q0 = None, num_restarts = 0, rng = None):
+        """
+        Solves the inverse kinematics for a batch of targets.
+
+        Inputs:
+        - targets - (N, 4, 4) target poses or (N, 3) target positions (position only)
+        - Q0 - (N, num_pos) or (num_pos,) initial positions (zeros if None, restarts are sampled uniformly within the limits)
+        - (int) num_restarts - number of random restarts for targets that did not converge
+        - rng - numpy Generator or seed for the restarts (optional)
+
+        Output:
+        - (dict) with
+            Q                 - (N, num_pos) solutions (the best iterate for targets that did not converge)
+            converged         - (N,) bool
+            iterations        - (N,) total number of iterations (over all restarts)
+            restarts          - (N,) number of restarts used
+            position_error    - (N,) final position error norm
+            orientation_error - (N,) final orientation error (angle, 0 if position only)
+        """
+        model = self.model
+        targets = np.asarray(targets, dtype = model.dtype)
+        position_only = targets.shape[-1] == 3 and targets.ndim <= 2
+        if position_only:
+            targets = np.reshape(targets, (-1, 3))
+            target_poses = np.zeros((targets.shape[0], 4, 4), dtype = model.dtype)
+            target_poses[:, :3, 3] = targets
+            targets = target_poses
+        targets = np.reshape(targets, (-1, 4, 4))
+        N = targets.shape[0]
+        if Q0 is None:
+            Q = self.initial_positions(N)
+        else:
+            # (num_pos,) or (1, num_pos) initial positions are shared by every target
+            Q = model.clamp(np.broadcast_to(model.as_batch(Q0, model.num_pos), (N, model.num_pos)))
+        rng = np.random.default_rng(rng)
+        converged = np.zeros(N, dtype = bool)
+        iterations = np.zeros(N, dtype = int)
+        restarts = np.zeros(N, dtype = int)
+        position_error = np.full(N, np.inf, dtype = model.dtype)
+        orientation_error = np.full(N, np.inf, dtype = model.dtype)
+        best_Q = Q.copy()
+        rows = 3 if position_only else 6
+        regularizer = self.damping**2 * np.eye(rows, dtype = model.dtype)
+        for attempt in range(num_restarts + 1):
+            active = np.flatnonzero(~converged)
+            if len(active) == 0:
+                break
+            if attempt > 0:
+                Q[np.ix_(active, self.q_inds)] = model.sample_uniform(len(active), rng)[:, self.q_inds]
+                restarts[active] += 1
+            for iteration in range(self.max_iterations + 1):
+                T = model.forward_kinematics_hom(Q[active])
+                error = self.pose_error(model.frame_poses(None, self.frame_name, T), targets[active], position_only)
+                curr_position_error = np.linalg.norm(error[:, -3:], axis = -1)
+                curr_orientation_error = np.zeros(len(active), dtype = model.dtype) if position_only else np.linalg.norm(error[:, :3], axis = -1)
+                # keep the best iterate of every target (over all restarts)
+                better = curr_position_error + curr_orientation_error < position_error[active] + orientation_error[active]
+                best_Q[active[better]] = Q[active[better]]
+                position_error[active[better]] = curr_position_error[better]
+                orientation_error[active[better]] = curr_orientation_error[better]
+                done = (curr_position_error <= self.position_tolerance) & (curr_orientation_error <= self.orientation_tolerance)
+                converged[active[done]] = True
+                best_Q[active[done]] = Q[active[done]]
+                position_error[active[done]] = curr_position_error[done]
+                orientation_error[active[done]] = curr_orientation_error[done]
+                if iteration == self.max_iterations or np.all(done):
+                    break
+                # drop the converged targets from the batch
+                keep = ~done
+                active = active[keep]
+                T = T[keep]
+                error = error[keep]
+                iterations[active] += 1
+                J = model.frame_jacobian(None, self.frame_name, T)[:, 6 - rows:, :][:, :, self.v_inds]
+                JJt = J @ np.swapaxes(J, -1, -2) + regularizer
+                dq = np.einsum("nji,nj->ni", J, np.linalg.solve(JJt, error[..., None])[..., 0])
+                # limit the step size
+                step = np.linalg.norm(dq, axis = -1, keepdims = True)
+                dq *= np.minimum(1, self.max_step / np.maximum(step, 1e-12))
+                Q[np.ix_(active, self.q_inds)] += dq
+                Q[active] = model.clamp(Q[active])
+        return {"Q": best_Q, "converged": converged, "iterations": iterations, "restarts": restarts, \
+                "position_error": position_error, "orientation_error": orientation_error if not position_only else np.zeros(N, dtype = model.dtype)}
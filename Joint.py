@@ -1,42 +1,58 @@
-# import numpy as np
 import numpy as np
-import sympy as sp
+import copy
+from .LazyModule import LazyModule
 from .SpatialAlgebra import Origin, Translation, Rotation, Quaternion_Tools
 
+sp = LazyModule("sympy") # only imported on first symbolic use
+
+class SharedSymbol:
+    # class level sympy symbol shared by every joint (created on first use so sympy is loaded lazily)
+    def __init__(self, name):
+        self.name = name
+        self.symbol = None
+
+    def __get__(self, obj, objtype = None):
+        if self.symbol is None:
+            self.symbol = sp.symbols(self.name)
+        return self.symbol
+
 class Joint:
     floating_base = False
+    # symbols are class level (not per joint) to save memory
+    theta = SharedSymbol("theta") # Free 1D joint variable
+    x_fb, y_fb, z_fb = SharedSymbol("x_fb"), SharedSymbol("y_fb"), SharedSymbol("z_fb")
+    q1_fb, q2_fb, q3_fb, q4_fb = SharedSymbol("q1_fb"), SharedSymbol("q2_fb"), SharedSymbol("q3_fb"), SharedSymbol("q4_fb")
+    roll_fb, pitch_fb, yaw_fb = SharedSymbol("roll_fb"), SharedSymbol("pitch_fb"), SharedSymbol("yaw_fb")
+    __slots__ = ("name", "jid", "urdf_jid", "bfs_jid", "bfs_id", "bfs_level", "origin", "jtype", "parent", "child", \
+                 "Xmat_sp", "Xmat_sp_free", "Xmat_sp_hom", "Xmat_sp_hom_free", "dXmat_sp_hom", "d2Xmat_sp_hom", \
+                 "S", "axis", "damping", "dof", "using_quaternion", "joint_limits", "velocity_limit", "effort_limit")
+
     def __init__(self, name, jid, parent, child, using_quaternion = False):
         self.name = name         # name
         self.jid = jid           # temporary ID (replaced by standard DFS parse ordering)
         self.urdf_jid = jid      # URDF ordered ID
         self.bfs_jid = jid       # temporary ID (replaced by BFS parse ordering)
+        self.bfs_id = jid        # temporary ID (replaced by BFS parse ordering)
         self.bfs_level = 0       # temporary level (replaced by BFS parse ordering)
         self.origin = Origin()   # Fixed origin location
         self.jtype = None        # type of joint
         self.parent = parent     # parent link name
         self.child = child       # child link name TODO - currently unused
-        self.theta = sp.symbols("theta") # Free 1D joint variable
         self.Xmat_sp = None      # Sympy X matrix placeholder
-        self.Xmat_sp_free = None # Sympy X_free matrix placeholder
-        if not Joint.floating_base:
-            self.Xmat_sp_hom = None      # Sympy X homogenous 4x4 matrix placeholder
-            self.Xmat_sp_hom_free = None # Sympy X_free homogenous 4x4  matrix placeholder
-        self.Smat_sp = None      # Sympy S matrix placeholder (usually a vector)
+        self.Xmat_sp_free = None # Sympy X_free matrix placeholder (released after set_type)
+        self.Xmat_sp_hom = None      # Sympy X homogenous 4x4 matrix placeholder (not used with floating base)
+        self.Xmat_sp_hom_free = None # Sympy X_free homogenous 4x4  matrix placeholder (released after set_type)
+        self.dXmat_sp_hom = None     # derivatives are built lazily on first use
+        self.d2Xmat_sp_hom = None
+        self.S = None            # numpy S matrix placeholder (usually a vector)
+        self.axis = None         # unit axis of motion of revolute and prismatic joints
         self.damping = 0         # damping placeholder
         self.dof = 0             # dof placeholder
         # for floating base
         self.using_quaternion = using_quaternion
-        self.x_fb = sp.symbols("x_fb")
-        self.y_fb = sp.symbols("y_fb")
-        self.z_fb = sp.symbols("z_fb")
-        self.q1_fb = sp.symbols("q1_fb")
-        self.q2_fb = sp.symbols("q2_fb")
-        self.q3_fb = sp.symbols("q3_fb")
-        self.q4_fb = sp.symbols("q4_fb")
-        self.roll_fb = sp.symbols("roll_fb")
-        self.pitch_fb = sp.symbols("pitch_fb")
-        self.yaw_fb = sp.symbols("yaw_fb")
         self.joint_limits = []
+        self.velocity_limit = float("inf")
+        self.effort_limit = float("inf")
 
     def set_id(self, id_in):
         self.jid = id_in
@@ -65,37 +81,29 @@ class Joint:
     def set_transformation_matrix(self, matrix_in):
         self.Xmat_sp = matrix_in
 
+    def set_transformation_matrix_hom(self, matrix_in):
+        self.Xmat_sp_hom = matrix_in
+        # derivatives are rebuilt lazily from the new matrix
+        self.dXmat_sp_hom = None
+        self.d2Xmat_sp_hom = None
+
     def set_type(self, jtype, axis = None):
         self.jtype = jtype
         self.origin.build_fixed_transform()
-        if self.jtype == 'revolute':
-            self.dof = 1
-            if axis[2] == 1:
-                self.Xmat_sp_free = self.origin.rotation.rot(self.origin.rotation.rz(self.theta))
-                self.Xmat_sp_hom_free = self.origin.rotation.rot_hom(self.origin.rotation.rz(self.theta))
-                self.S = np.array([0,0,1,0,0,0])
-            elif axis[1] == 1:
-                self.Xmat_sp_free = self.origin.rotation.rot(self.origin.rotation.ry(self.theta))
-                self.Xmat_sp_hom_free = self.origin.rotation.rot_hom(self.origin.rotation.ry(self.theta))
-                self.S = np.array([0,1,0,0,0,0])
-            elif axis[0] == 1:
-                self.Xmat_sp_free = self.origin.rotation.rot(self.origin.rotation.rx(self.theta))
-                self.Xmat_sp_hom_free = self.origin.rotation.rot_hom(self.origin.rotation.rx(self.theta))
-                self.S = np.array([1,0,0,0,0,0])
-        elif self.jtype == 'prismatic':
+        if self.jtype in ('revolute', 'continuous', 'prismatic'):
+            # (continuous joints are unlimited revolute joints)
             self.dof = 1
-            if axis[2] == 1:
-                self.Xmat_sp_free = self.origin.translation.xlt(self.origin.translation.skew(0,0,self.theta))
-                self.Xmat_sp_hom_free = self.origin.translation.gen_tx_hom(0,0,self.theta)
-                self.S = np.array([0,0,0,0,0,1])
-            elif axis[1] == 1:
-                self.Xmat_sp_free = self.origin.translation.xlt(self.origin.translation.skew(0,self.theta,0))
-                self.Xmat_sp_hom_free = self.origin.translation.gen_tx_hom(0,self.theta,0)
-                self.S = np.array([0,0,0,0,1,0])
-            elif axis[0] == 1:
-                self.Xmat_sp_free = self.origin.translation.xlt(self.origin.translation.skew(self.theta,0,0))
-                self.Xmat_sp_hom_free = self.origin.translation.gen_tx_hom(self.theta,0,0)
-                self.S = np.array([0,0,0,1,0,0])
+            self.set_axis(axis)
+            x, y, z = [value.item() for value in self.axis]
+            if self.jtype == 'prismatic':
+                self.Xmat_sp_free = self.origin.translation.xlt(self.origin.translation.skew(x*self.theta,y*self.theta,z*self.theta))
+                self.Xmat_sp_hom_free = self.origin.translation.gen_tx_hom(x*self.theta,y*self.theta,z*self.theta)
+                self.S = np.concatenate((np.zeros(3, dtype = self.axis.dtype), self.axis))
+            else:
+                E = self.get_free_rotation()
+                self.Xmat_sp_free = self.origin.rotation.rot(E)
+                self.Xmat_sp_hom_free = self.origin.rotation.rot_hom(E)
+                self.S = np.concatenate((self.axis, np.zeros(3, dtype = self.axis.dtype)))
         elif self.jtype == 'fixed':
             self.dof = 0
             self.Xmat_sp_free = sp.eye(6)
@@ -104,8 +112,7 @@ class Joint:
         elif self.jtype == 'floating':
             self.dof = 6
             if self.using_quaternion:
-                self.qt = Quaternion_Tools()
-                rot = self.origin.rotation.rot(self.qt.quat_to_rot_sp(self.q1_fb,self.q2_fb,self.q3_fb,self.q4_fb))
+                rot = self.origin.rotation.rot(Quaternion_Tools().quat_to_rot_sp(self.q1_fb,self.q2_fb,self.q3_fb,self.q4_fb))
             else:
                 rot = self.origin.rotation.rot(self.origin.rotation.rx(self.roll_fb) * \
                                                self.origin.rotation.ry(self.pitch_fb) * \
@@ -123,12 +130,59 @@ class Joint:
             # homogenous transform needs to "sum" translation and rotation
             self.Xmat_sp_hom = sp.eye(4)
             self.Xmat_sp_hom[:3,:3] = (self.Xmat_sp_hom_free[:3,:3] * self.origin.Xmat_sp_hom_fixed[:3,:3]).transpose()
-            self.Xmat_sp_hom[:3,3] = self.Xmat_sp_hom_free[:3,3] + self.origin.Xmat_sp_hom_fixed[:3,3]
+            # (the free translation of prismatic joints is along the axis in the joint frame, i.e., after the origin rotation)
+            self.Xmat_sp_hom[:3,3] = self.origin.Xmat_sp_hom_fixed[:3,:3].transpose() * self.Xmat_sp_hom_free[:3,3] + self.origin.Xmat_sp_hom_fixed[:3,3]
             self.Xmat_sp_hom = sp.nsimplify(self.Xmat_sp_hom, tolerance=1e-6, rational=True).evalf()
-            # and derivative
-            self.dXmat_sp_hom = sp.diff(self.Xmat_sp_hom,self.theta)
-            # and second derivative
-            self.d2Xmat_sp_hom = sp.diff(self.dXmat_sp_hom,self.theta)
+        # the derivatives are rebuilt lazily from Xmat_sp_hom
+        self.dXmat_sp_hom = None
+        self.d2Xmat_sp_hom = None
+        # the free and fixed parts are only intermediates, release them (the origin is rebuilt if needed)
+        self.Xmat_sp_free = None
+        self.Xmat_sp_hom_free = None
+        self.origin.release_symbolic()
+
+    def set_axis(self, axis = None):
+        # unit axis of motion (URDF joints without an axis move along x), kept as integers if axis aligned
+        axis = np.array([1,0,0] if axis is None else axis, dtype = float).reshape(3)
+        norm = np.linalg.norm(axis)
+        if norm == 0:
+            raise ValueError("Joint [" + str(self.name) + "] has a zero axis")
+        axis = axis / norm
+        if np.count_nonzero(np.abs(axis) > 1e-9) == 1:
+            axis = np.round(axis).astype(int)
+        self.axis = axis
+
+    def get_axis(self):
+        return self.axis
+
+    def get_free_rotation(self):
+        # rotation of the free motion (the axis aligned and negated cases use rx, ry, and rz)
+        for ind, rot in enumerate((self.origin.rotation.rx, self.origin.rotation.ry, self.origin.rotation.rz)):
+            if self.axis[ind] == 1:
+                return rot(self.theta)
+            if self.axis[ind] == -1:
+                return rot(-self.theta)
+        return self.origin.rotation.raxis(*[float(value) for value in self.axis], self.theta)
+
+    def lock(self, value = 0):
+        # turn a revolute/prismatic joint into a fixed joint at the given position
+        # (the matrices are replaced so clones sharing them are not affected)
+        self.Xmat_sp = self.Xmat_sp.subs(self.theta, value)
+        if self.Xmat_sp_hom is not None:
+            self.Xmat_sp_hom = self.Xmat_sp_hom.subs(self.theta, value)
+        self.dXmat_sp_hom = None
+        self.d2Xmat_sp_hom = None
+        self.jtype = "fixed"
+        self.dof = 0
+        self.S = np.array([0,0,0,0,0,0])
+        self.joint_limits = []
+
+    def clone(self):
+        # shallow copy that shares the (replaced, never mutated) matrices but not the containers
+        new_joint = copy.copy(self)
+        new_joint.origin = copy.copy(self.origin)
+        new_joint.joint_limits = list(self.joint_limits)
+        return new_joint
 
     def get_transformation_matrix_function(self):
         if self.jtype == "floating":
@@ -149,15 +203,19 @@ class Joint:
         return self.Xmat_sp_hom
 
     def get_dtransformation_matrix_hom_function(self):
-        return sp.utilities.lambdify(self.theta, self.dXmat_sp_hom, 'numpy')
+        return sp.utilities.lambdify(self.theta, self.get_dtransformation_matrix_hom(), 'numpy')
 
     def get_d2transformation_matrix_hom_function(self):
-        return sp.utilities.lambdify(self.theta, self.d2Xmat_sp_hom, 'numpy')
+        return sp.utilities.lambdify(self.theta, self.get_d2transformation_matrix_hom(), 'numpy')
 
     def get_dtransformation_matrix_hom(self):
+        if self.dXmat_sp_hom is None and self.Xmat_sp_hom is not None:
+            self.dXmat_sp_hom = sp.diff(self.Xmat_sp_hom,self.theta)
         return self.dXmat_sp_hom
 
     def get_d2transformation_matrix_hom(self):
+        if self.d2Xmat_sp_hom is None and self.Xmat_sp_hom is not None:
+            self.d2Xmat_sp_hom = sp.diff(self.get_dtransformation_matrix_hom(),self.theta)
         return self.d2Xmat_sp_hom
 
     def get_joint_subspace(self):
@@ -190,12 +248,26 @@ class Joint:
     def get_joint_limits(self):
         return self.joint_limits
 
+    def set_velocity_limit(self, limit):
+        self.velocity_limit = limit
+
+    def set_effort_limit(self, limit):
+        self.effort_limit = limit
+
+    def get_velocity_limit(self):
+        return self.velocity_limit
+
+    def get_effort_limit(self):
+        return self.effort_limit
+
 # Need to retain fixed joints for possible kinematic use later
 class Fixed_Joint:
+    __slots__ = ("jid", "name", "parent_name", "Xmat_hom")
+
     def __init__(self, jid_in, name, parent_name, hom_xfrm):
         self.jid = jid_in                    # original ID
         self.name = name                # name
-        self.parent_name = parent_name  # parent joint name
+        self.parent_name = parent_name  # parent joint name (None if attached to the base link)
         self.Xmat_hom = hom_xfrm
 
     def set_id(self, jid_in):
@@ -207,6 +279,9 @@ class Fixed_Joint:
     def set_transformation_matrix_hom(self, hom_xfrm):
         self.Xmat_hom = hom_xfrm
 
+    def clone(self):
+        return copy.copy(self)
+
     def get_id(self):
         return self.jid
 
@@ -0,0 +1,20 @@
+import importlib
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access.
+    Keeps heavy optional-at-startup dependencies (sympy, bs4) out of the
+    package import so numeric-only users do not pay for them.
+    """
+    def __init__(self, module_name):
+        self._module_name = module_name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # only called for attributes not found on the stand-in itself
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return getattr(self._module, attr)
+
+    def is_loaded(self):
+        return self._module is not None
@@ -1,20 +1,31 @@
 import numpy as np
-import sympy as sp
+import copy
+from .LazyModule import LazyModule
 from .InertiaSet import InertiaSet
+from .GeometrySet import GeometrySet
 from .SpatialAlgebra import Origin, Translation, Rotation
 
+sp = LazyModule("sympy") # only imported on first symbolic use
+
 class Link:
+    __slots__ = ("name", "lid", "urdf_lid", "bfs_lid", "bfs_id", "bfs_level", "parent_id", "origin", \
+                 "mass", "inertia", "spatial_ineratia", "subtree", "collision", "visual")
+
     def __init__(self, name, lid):
         self.name = name        # name
         self.lid = lid          # temporary ID (replaced by standard DFS parse ordering)
         self.urdf_lid = lid     # URDF ordered ID
         self.bfs_lid = lid      # temporary ID (replaced by BFS parse ordering)
+        self.bfs_id = lid       # temporary ID (replaced by BFS parse ordering)
         self.bfs_level = 0      # temporary level (replaced by BFS parse ordering)
         self.parent_id = None   # temporary ID (replaced later)
         self.origin = Origin()  # Fixed origin location
         self.mass = None
         self.inertia = None
         self.spatial_ineratia = None
+        self.subtree = None     # placeholder (replaced by subtree list)
+        self.collision = GeometrySet() # collision geometry (in the link frame)
+        self.visual = GeometrySet()    # visual geometry (in the link frame)
 
     def set_id(self, id_in):
         self.lid = id_in
@@ -42,6 +53,12 @@ class Link:
         self.inertia = InertiaSet(ixx,ixy,ixz,iyy,iyz,izz)
         self.build_spatial_inertia()
 
+    def set_collision_geometry(self, geometry_in):
+        self.collision = geometry_in
+
+    def set_visual_geometry(self, geometry_in):
+        self.visual = geometry_in
+
     def set_spatial_inertia(self, inertia_in):
         self.spatial_ineratia = inertia_in
 
@@ -51,7 +68,8 @@ class Link:
         # I6x6 = I3x3 + mccT   mc    I3x3 = Ixx   Ixy   Ixz    c =   0 -cz  cy
         #         mcT          mI           Ixy   Iyy   Iyz         cz   0 -cx
         #                                   Ixz   Iyz   Izz        -cy  cx  0
-        rx = sp.nsimplify(self.origin.translation.rx, tolerance=1e-12, rational=True)
+        translation = self.origin.translation
+        rx = sp.nsimplify(translation.skew(translation.x, translation.y, translation.z), tolerance=1e-12, rational=True)
         com_trans = np.reshape(np.array([expr.evalf() for expr in rx]),(3,3))
         
         mc = self.mass*com_trans
@@ -63,10 +81,28 @@ class Link:
         self.spatial_ineratia = np.vstack((top,bottom)).astype(float)
         # remove numerical noise (e.g., URDF's often specify angles as 3.14 or 3.14159 but that isn't exactly PI)
         self.spatial_ineratia[np.isclose(self.spatial_ineratia, np.zeros((6,6)), 1e-10, 1e-10)] = 0
+        # the symbolic origin is not needed once the numeric inertia exists
+        self.origin.release_symbolic()
+
+    def clone(self):
+        # shallow copy that shares the (replaced, never mutated) matrices but not the containers
+        new_link = copy.copy(self)
+        new_link.origin = copy.copy(self.origin)
+        if self.subtree is not None:
+            new_link.subtree = list(self.subtree)
+        new_link.collision = self.collision.clone()
+        new_link.visual = self.visual.clone()
+        return new_link
 
     def get_spatial_inertia(self):
         return self.spatial_ineratia
 
+    def get_collision_geometry(self):
+        return self.collision
+
+    def get_visual_geometry(self):
+        return self.visual
+
     def get_name(self):
         return self.name
 
@@ -0,0 +1,299 @@
+import numpy as np
+from numba import njit, prange
+
+# Compiled loop kernels for the NumericModel batched routines (see NumericModel.set_backend).
+# Every kernel loops over the batch with prange and over the joints in id (DFS) order
+# within a sample, so no (N, num_joints, ...) temporaries are created. Joint transforms
+# are kept as (R, p), the pose of each link in its parent, and applied without forming
+# the 6x6 spatial transforms:
+#     X v   = [R^T w; R^T (v - p x w)]
+#     X^T f = [R n + p x (R f); R f]
+# The floating base pose is computed by NumPy (NumericModel.floating_base_pose) and passed in.
+
+@njit(cache = True)
+def local_transform(jid, q, jtypes, axis_kinds, axes, T_origin, T_float, R, p):
+    # R, p = T_origin * T_free(q) of one joint (or the floating base pose)
+    if jtypes[jid] == 2:
+        for i in range(3):
+            for k in range(3):
+                R[i, k] = T_float[i, k]
+            p[i] = T_float[i, 3]
+        return
+    if jtypes[jid] == 1:
+        # prismatic: T_origin * [I q*axis; 0 1]
+        for i in range(3):
+            p[i] = T_origin[jid, i, 3]
+            for k in range(3):
+                R[i, k] = T_origin[jid, i, k]
+                p[i] += T_origin[jid, i, k] * q * axes[jid, k]
+        return
+    kind = axis_kinds[jid]
+    if kind < 6:
+        # revolute about +-x, +-y, or +-z: only the two columns of the origin rotation orthogonal to the axis change
+        i = kind % 3
+        j = (i + 1) % 3
+        k = (i + 2) % 3
+        s = np.sin(q) if kind < 3 else -np.sin(q)
+        c = np.cos(q)
+        for r in range(3):
+            p[r] = T_origin[jid, r, 3]
+            oj = T_origin[jid, r, j]
+            ok = T_origin[jid, r, k]
+            R[r, i] = T_origin[jid, r, i]
+            R[r, j] = c*oj + s*ok
+            R[r, k] = c*ok - s*oj
+        return
+    # revolute about a general axis: T_origin * [Rodrigues(axis, q) 0; 0 1]
+    x = axes[jid, 0]
+    y = axes[jid, 1]
+    z = axes[jid, 2]
+    s = np.sin(q)
+    c = 1 - np.cos(q)
+    # F = I + s K + c K^2 with K = skew(axis)
+    f00 = 1 - c*(y*y + z*z)
+    f01 = -s*z + c*x*y
+    f02 = s*y + c*x*z
+    f10 = s*z + c*x*y
+    f11 = 1 - c*(x*x + z*z)
+    f12 = -s*x + c*y*z
+    f20 = -s*y + c*x*z
+    f21 = s*x + c*y*z
+    f22 = 1 - c*(x*x + y*y)
+    for i in range(3):
+        p[i] = T_origin[jid, i, 3]
+        o0 = T_origin[jid, i, 0]
+        o1 = T_origin[jid, i, 1]
+        o2 = T_origin[jid, i, 2]
+        R[i, 0] = o0*f00 + o1*f10 + o2*f20
+        R[i, 1] = o0*f01 + o1*f11 + o2*f21
+        R[i, 2] = o0*f02 + o1*f12 + o2*f22
+
+@njit(cache = True)
+def apply_X(R, p, m, out):
+    # out = X m for a spatial motion vector m
+    w0 = m[0]
+    w1 = m[1]
+    w2 = m[2]
+    l0 = m[3] - (p[1]*w2 - p[2]*w1)
+    l1 = m[4] - (p[2]*w0 - p[0]*w2)
+    l2 = m[5] - (p[0]*w1 - p[1]*w0)
+    for i in range(3):
+        out[i] = R[0, i]*w0 + R[1, i]*w1 + R[2, i]*w2
+        out[3 + i] = R[0, i]*l0 + R[1, i]*l1 + R[2, i]*l2
+
+@njit(cache = True)
+def apply_XT(R, p, f, out):
+    # out = X^T f for a spatial force vector f
+    n0 = R[0, 0]*f[0] + R[0, 1]*f[1] + R[0, 2]*f[2]
+    n1 = R[1, 0]*f[0] + R[1, 1]*f[1] + R[1, 2]*f[2]
+    n2 = R[2, 0]*f[0] + R[2, 1]*f[1] + R[2, 2]*f[2]
+    f0 = R[0, 0]*f[3] + R[0, 1]*f[4] + R[0, 2]*f[5]
+    f1 = R[1, 0]*f[3] + R[1, 1]*f[4] + R[1, 2]*f[5]
+    f2 = R[2, 0]*f[3] + R[2, 1]*f[4] + R[2, 2]*f[5]
+    out[0] = n0 + p[1]*f2 - p[2]*f1
+    out[1] = n1 + p[2]*f0 - p[0]*f2
+    out[2] = n2 + p[0]*f1 - p[1]*f0
+    out[3] = f0
+    out[4] = f1
+    out[5] = f2
+
+@njit(cache = True)
+def motion_cross(v, m, out):
+    # out = v x m
+    out[0] = v[1]*m[2] - v[2]*m[1]
+    out[1] = v[2]*m[0] - v[0]*m[2]
+    out[2] = v[0]*m[1] - v[1]*m[0]
+    out[3] = v[1]*m[5] - v[2]*m[4] + v[4]*m[2] - v[5]*m[1]
+    out[4] = v[2]*m[3] - v[0]*m[5] + v[5]*m[0] - v[3]*m[2]
+    out[5] = v[0]*m[4] - v[1]*m[3] + v[3]*m[1] - v[4]*m[0]
+
+@njit(cache = True)
+def force_cross(v, f, out):
+    # out = v x* f
+    out[0] = v[1]*f[2] - v[2]*f[1] + v[4]*f[5] - v[5]*f[4]
+    out[1] = v[2]*f[0] - v[0]*f[2] + v[5]*f[3] - v[3]*f[5]
+    out[2] = v[0]*f[1] - v[1]*f[0] + v[3]*f[4] - v[4]*f[3]
+    out[3] = v[1]*f[5] - v[2]*f[4]
+    out[4] = v[2]*f[3] - v[0]*f[5]
+    out[5] = v[0]*f[4] - v[1]*f[3]
+
+@njit(parallel = True, cache = True)
+def forward_kinematics_kernel(Q, parent_ids, jtypes, axis_kinds, axes, q_index, T_origin, T_float, T):
+    # T[s, i] = T[s, parent] * T_local[s, i] (the world pose of every link)
+    num_joints = parent_ids.shape[0]
+    for s in prange(Q.shape[0]):
+        R = np.empty((3, 3), dtype = T.dtype)
+        p = np.empty(3, dtype = T.dtype)
+        for jid in range(num_joints):
+            local_transform(jid, Q[s, q_index[jid]], jtypes, axis_kinds, axes, T_origin, T_float[s], R, p)
+            parent = parent_ids[jid]
+            for i in range(3):
+                for k in range(3):
+                    if parent == -1:
+                        T[s, jid, i, k] = R[i, k]
+                    else:
+                        T[s, jid, i, k] = T[s, parent, i, 0]*R[0, k] + T[s, parent, i, 1]*R[1, k] + T[s, parent, i, 2]*R[2, k]
+                if parent == -1:
+                    T[s, jid, i, 3] = p[i]
+                else:
+                    T[s, jid, i, 3] = T[s, parent, i, 0]*p[0] + T[s, parent, i, 1]*p[1] + T[s, parent, i, 2]*p[2] + T[s, parent, i, 3]
+            T[s, jid, 3, 3] = 1
+
+@njit(parallel = True, cache = True)
+def inverse_dynamics_kernel(Q, QD, QDD, parent_ids, jtypes, axis_kinds, axes, S, q_index, v_index, T_origin, T_float, I, gravity, tau):
+    # RNEA: forward pass of the link velocities, accelerations, and net forces, backward pass of the forces
+    num_joints = parent_ids.shape[0]
+    for s in prange(Q.shape[0]):
+        R = np.empty((num_joints, 3, 3), dtype = tau.dtype)
+        p = np.empty((num_joints, 3), dtype = tau.dtype)
+        v = np.zeros((num_joints, 6), dtype = tau.dtype)
+        a = np.zeros((num_joints, 6), dtype = tau.dtype)
+        f = np.zeros((num_joints, 6), dtype = tau.dtype)
+        vJ = np.empty(6, dtype = tau.dtype)
+        aJ = np.empty(6, dtype = tau.dtype)
+        tmp = np.empty(6, dtype = tau.dtype)
+        Iv = np.empty(6, dtype = tau.dtype)
+        a_base = np.zeros(6, dtype = tau.dtype)
+        a_base[5] = gravity
+        for jid in range(num_joints):
+            local_transform(jid, Q[s, q_index[jid]], jtypes, axis_kinds, axes, T_origin, T_float[s], R[jid], p[jid])
+            vi = v_index[jid]
+            for k in range(6):
+                if jtypes[jid] == 2:
+                    vJ[k] = QD[s, vi + k]
+                    aJ[k] = QDD[s, vi + k]
+                else:
+                    vJ[k] = S[jid, k]*QD[s, vi]
+                    aJ[k] = S[jid, k]*QDD[s, vi]
+            parent = parent_ids[jid]
+            if parent == -1:
+                apply_X(R[jid], p[jid], a_base, a[jid])
+                for k in range(6):
+                    v[jid, k] = vJ[k]
+                    a[jid, k] += aJ[k]
+            else:
+                apply_X(R[jid], p[jid], v[parent], v[jid])
+                for k in range(6):
+                    v[jid, k] += vJ[k]
+                apply_X(R[jid], p[jid], a[parent], a[jid])
+                motion_cross(v[jid], vJ, tmp)
+                for k in range(6):
+                    a[jid, k] += aJ[k] + tmp[k]
+            # f = I a + v x* I v
+            for i in range(6):
+                Iv[i] = 0
+                f[jid, i] = 0
+                for k in range(6):
+                    Iv[i] += I[jid, i, k]*v[jid, k]
+                    f[jid, i] += I[jid, i, k]*a[jid, k]
+            force_cross(v[jid], Iv, tmp)
+            for k in range(6):
+                f[jid, k] += tmp[k]
+        for jid in range(num_joints - 1, -1, -1):
+            vi = v_index[jid]
+            if jtypes[jid] == 2:
+                for k in range(6):
+                    tau[s, vi + k] = f[jid, k]
+            else:
+                total = 0.0
+                for k in range(6):
+                    total += S[jid, k]*f[jid, k]
+                tau[s, vi] = total
+            parent = parent_ids[jid]
+            if parent != -1:
+                apply_XT(R[jid], p[jid], f[jid], tmp)
+                for k in range(6):
+                    f[parent, k] += tmp[k]
+
+@njit(parallel = True, cache = True)
+def mass_matrix_kernel(Q, parent_ids, jtypes, axis_kinds, axes, q_index, v_index, dofs, col_S, T_origin, T_float, I, H):
+    # CRBA: composite inertias in a backward pass, then F = Ic s of every column moved up through the ancestors
+    num_joints = parent_ids.shape[0]
+    for s in prange(Q.shape[0]):
+        R = np.empty((num_joints, 3, 3), dtype = H.dtype)
+        p = np.empty((num_joints, 3), dtype = H.dtype)
+        Ic = I.copy()
+        A = np.empty((6, 6), dtype = H.dtype)
+        column = np.empty(6, dtype = H.dtype)
+        F = np.empty(6, dtype = H.dtype)
+        tmp = np.empty(6, dtype = H.dtype)
+        for jid in range(num_joints):
+            local_transform(jid, Q[s, q_index[jid]], jtypes, axis_kinds, axes, T_origin, T_float[s], R[jid], p[jid])
+        for jid in range(num_joints - 1, -1, -1):
+            parent = parent_ids[jid]
+            if parent == -1:
+                continue
+            # Ic[parent] += X^T Ic X with A = X^T Ic (column by column) and X^T Ic X = X^T A^T (Ic is symmetric)
+            for k in range(6):
+                apply_XT(R[jid], p[jid], Ic[jid, :, k], A[:, k])
+            for k in range(6):
+                apply_XT(R[jid], p[jid], A[k], column)
+                for i in range(6):
+                    Ic[parent, i, k] += column[i]
+        for jid in range(num_joints):
+            for dof in range(dofs[jid]):
+                col = v_index[jid] + dof
+                for i in range(6):
+                    F[i] = 0
+                    for k in range(6):
+                        F[i] += Ic[jid, i, k]*col_S[col, k]
+                ancestor = jid
+                while ancestor != -1:
+                    for dof_a in range(dofs[ancestor]):
+                        row = v_index[ancestor] + dof_a
+                        total = 0.0
+                        for k in range(6):
+                            total += col_S[row, k]*F[k]
+                        H[s, row, col] = total
+                        H[s, col, row] = total
+                    if parent_ids[ancestor] != -1:
+                        apply_XT(R[ancestor], p[ancestor], F, tmp)
+                        for k in range(6):
+                            F[k] = tmp[k]
+                    ancestor = parent_ids[ancestor]
+
+class NumbaBackend:
+    """
+    Runs NumericModel.forward_kinematics_hom, inverse_dynamics, and mass_matrix with
+    the compiled kernels above on the model's arrays (kernels are compiled on first
+    use and cached on disk by numba).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.jtypes = np.ascontiguousarray(model.jtypes)
+        self.q_index = np.array([model.q_index[jid] if model.dofs[jid] == 1 else 0 for jid in range(model.num_joints)], dtype = np.int64)
+        self.v_index = np.asarray(model.v_index, dtype = np.int64)
+        self.parent_ids = np.asarray(model.parent_ids, dtype = np.int64)
+        self.dofs = np.asarray(model.dofs, dtype = np.int64)
+        self.I = np.ascontiguousarray(model.Imats[1:])
+        self.col_S = model.velocity_columns()[1]
+
+    def floating_poses(self, Q):
+        # (N, 4, 4) floating base pose (unused if the robot has a fixed base)
+        if len(self.model.floating_jids) > 0:
+            return np.ascontiguousarray(self.model.floating_base_pose(Q))
+        return np.zeros((Q.shape[0], 4, 4), dtype = self.model.dtype)
+
+    def forward_kinematics_hom(self, Q, T):
+        # fills the link poses T[:, :num_joints]
+        model = self.model
+        Q = np.ascontiguousarray(Q)
+        forward_kinematics_kernel(Q, self.parent_ids, self.jtypes, model.axis_kinds, model.axes, self.q_index, model.T_origin, self.floating_poses(Q), T)
+        return T
+
+    def inverse_dynamics(self, Q, QD, QDD, gravity):
+        model = self.model
+        tau = np.zeros((Q.shape[0], model.num_vel), dtype = model.dtype)
+        Q = np.ascontiguousarray(Q)
+        inverse_dynamics_kernel(Q, np.ascontiguousarray(QD), np.ascontiguousarray(QDD), self.parent_ids, self.jtypes, model.axis_kinds, model.axes, model.S, \
+                                self.q_index, self.v_index, model.T_origin, self.floating_poses(Q), self.I, model.dtype.type(gravity), tau)
+        return tau
+
+    def mass_matrix(self, Q):
+        model = self.model
+        H = np.zeros((Q.shape[0], model.num_vel, model.num_vel), dtype = model.dtype)
+        Q = np.ascontiguousarray(Q)
+        mass_matrix_kernel(Q, self.parent_ids, self.jtypes, model.axis_kinds, model.axes, self.q_index, self.v_index, self.dofs, self.col_S, \
+                           model.T_origin, self.floating_poses(Q), self.I, H)
+        return H
@@ -0,0 +1,1058 @@
+import importlib.util
+import numpy as np
+from .SpatialAlgebra import Transform_Tools
+from .GeometrySet import GeometrySet
+from .TraversalSchedule import TraversalSchedule
+
+class NumericModel:
+    """
+    Flat NumPy arrays describing a parsed robot for batched (vectorized over
+    samples) kinematics and dynamics. Every joint transform is split into a
+    constant part and a free motion along the joint's axis:
+
+        ^iX_parent(q) = X_free(q) * X_origin    (spatial, 6x6)
+        T_parent_i(q) = T_origin * T_free(q)    (homogenous pose, 4x4)
+
+    Joints are stored in id (DFS) order so parents always come before children,
+    and link i is the child of joint i (the base link is the parent, -1, of the roots).
+    """
+    REVOLUTE = 0
+    PRISMATIC = 1
+    FLOATING = 2
+    # axis kinds of revolute and prismatic joints (+x, +y, +z, -x, -y, -z, or a general unit axis)
+    AXIS_X, AXIS_Y, AXIS_Z = 0, 1, 2
+    AXIS_NEG_X, AXIS_NEG_Y, AXIS_NEG_Z = 3, 4, 5
+    AXIS_GENERAL = 6
+
+    def __init__(self, robot, dtype = np.float64):
+        self.robot_name = robot.get_name()
+        self.dtype = np.dtype(dtype)
+        self.floating_base = robot.floating_base
+        self.using_quaternion = robot.using_quaternion
+        self.num_pos = robot.get_num_pos()
+        self.num_vel = robot.get_num_vel()
+        joints = robot.get_joints_ordered_by_id()
+        self.num_joints = len(joints)
+        self.joint_names = [joint.get_name() for joint in joints]
+        self.link_names = [link.get_name() for link in robot.get_links_ordered_by_id()]
+        # topology
+        self.parent_ids = np.array([robot.get_link_by_name(joint.get_parent()).get_id() for joint in joints], dtype = int)
+        # joint types, axes, and motion subspaces
+        self.jtypes = np.array([NumericModel.FLOATING if joint.jtype == "floating" else \
+                                (NumericModel.PRISMATIC if joint.jtype == "prismatic" else NumericModel.REVOLUTE) \
+                                for joint in joints], dtype = int)
+        self.S = np.zeros((self.num_joints, 6), dtype = self.dtype)
+        self.axes = np.zeros((self.num_joints, 3), dtype = self.dtype)
+        for jid, joint in enumerate(joints):
+            if self.jtypes[jid] != NumericModel.FLOATING:
+                self.S[jid] = np.reshape(joint.get_joint_subspace(), 6)
+                self.axes[jid] = self.S[jid, :3] if self.jtypes[jid] == NumericModel.REVOLUTE else self.S[jid, 3:]
+        # axis aligned joints use specialized transforms (the floating base joint is marked general, it has no axis)
+        self.axis_kinds = np.array([NumericModel.classify_axis(axis) for axis in self.axes], dtype = np.int64)
+        # level synchronous schedule of the joints and the joints grouped by kind
+        self.schedule = TraversalSchedule(robot)
+        self.moving_jids = np.flatnonzero(self.jtypes != NumericModel.FLOATING) # single dof joints
+        self.floating_jids = np.flatnonzero(self.jtypes == NumericModel.FLOATING)
+        self.quaternion_jids = self.floating_jids if self.using_quaternion else np.zeros(0, dtype = int)
+        # ancestor_mask[i, j] is True if joint j is joint i or one of its ancestors (j supports link i)
+        self.ancestor_mask = np.zeros((self.num_joints, self.num_joints), dtype = bool)
+        for jid in range(self.num_joints):
+            if self.parent_ids[jid] != -1:
+                self.ancestor_mask[jid] = self.ancestor_mask[self.parent_ids[jid]]
+            self.ancestor_mask[jid, jid] = True
+        # state indices of each joint (the floating base joint uses the first 6/7 positions and 6 velocities)
+        index_maps = robot.get_index_maps()
+        self.q_index = index_maps["q_start"]
+        self.v_index = index_maps["v_start"]
+        # joint limits aligned with the state vectors (the floating base is only bounded by the quaternion norm)
+        self.pos_lower = np.full(self.num_pos, -np.inf, dtype = self.dtype)
+        self.pos_upper = np.full(self.num_pos, np.inf, dtype = self.dtype)
+        self.vel_limits = np.full(self.num_vel, np.inf, dtype = self.dtype)
+        self.effort_limits = np.full(self.num_vel, np.inf, dtype = self.dtype)
+        self.pos_is_angle = np.zeros(self.num_pos, dtype = bool) # used to sample unbounded positions
+        for jid, joint in enumerate(joints):
+            if self.jtypes[jid] == NumericModel.FLOATING:
+                if self.using_quaternion:
+                    self.pos_lower[3:7] = -1
+                    self.pos_upper[3:7] = 1
+                else:
+                    self.pos_is_angle[3:6] = True
+                continue
+            if len(joint.get_joint_limits()) == 2:
+                self.pos_lower[self.q_index[jid]], self.pos_upper[self.q_index[jid]] = joint.get_joint_limits()
+            self.pos_is_angle[self.q_index[jid]] = self.jtypes[jid] == NumericModel.REVOLUTE
+            self.vel_limits[self.v_index[jid]] = joint.get_velocity_limit()
+            self.effort_limits[self.v_index[jid]] = joint.get_effort_limit()
+        # constant parts of the transforms (the free motion is the identity at zero)
+        tools = Transform_Tools()
+        self.X_origin = np.zeros((self.num_joints, 6, 6), dtype = self.dtype)
+        for jid, joint in enumerate(joints):
+            if self.jtypes[jid] == NumericModel.FLOATING:
+                self.X_origin[jid] = np.eye(6)
+            else:
+                self.X_origin[jid] = np.array(joint.get_transformation_matrix().subs(joint.theta, 0)).astype(float)
+        self.T_origin = tools.spatial_to_hom(self.X_origin).astype(self.dtype)
+        # spatial inertias of each link (in link id order, the base link first)
+        self.Imats = np.array([link.get_spatial_inertia() for link in robot.get_links_ordered_by_id()], dtype = self.dtype)
+        # mass and center of mass (in the link frame, from the m*cx block of the spatial inertia) of each link
+        self.link_masses = self.Imats[:, 3, 3].copy()
+        self.total_mass = float(np.sum(self.link_masses))
+        mc = np.stack((self.Imats[:, 2, 4], self.Imats[:, 0, 5], self.Imats[:, 1, 3]), axis = -1)
+        self.link_coms = np.divide(mc, self.link_masses[:, None], out = np.zeros_like(mc), where = self.link_masses[:, None] > 0)
+        # number of velocities of each joint
+        self.dofs = np.where(self.jtypes == NumericModel.FLOATING, 6, 1)
+        # fixed joint frames (relative to their parent joint's link)
+        fixed_joints = robot.get_fixed_joints_ordered_by_id()
+        self.fixed_joint_names = [fixed_joint.get_name() for fixed_joint in fixed_joints]
+        self.fixed_parent_ids = np.array([robot.get_joint_by_name(fixed_joint.get_parent()).get_id() \
+                                          if fixed_joint.get_parent() is not None else -1 \
+                                          for fixed_joint in fixed_joints], dtype = int) # -1 is the base link
+        self.fixed_T = np.array([fixed_joint.get_transformation_matrix_hom() for fixed_joint in fixed_joints], \
+                                dtype = self.dtype).reshape((-1, 4, 4))
+        # compiled kernels used by forward_kinematics_hom, inverse_dynamics, and mass_matrix (see set_backend)
+        self.backend = "numpy"
+        self.kernels = None
+        # collision and visual geometry (per geometry arrays, grouped by link)
+        self.geometry = {"collision": self.pack_geometry([link.get_collision_geometry() for link in robot.get_links_ordered_by_id()]), \
+                         "visual": self.pack_geometry([link.get_visual_geometry() for link in robot.get_links_ordered_by_id()])}
+
+    @staticmethod
+    def classify_axis(axis):
+        # AXIS_X, AXIS_Y, AXIS_Z, AXIS_NEG_X, AXIS_NEG_Y, AXIS_NEG_Z, or AXIS_GENERAL for a (3,) unit axis
+        axis = np.asarray(axis)
+        for ind in range(3):
+            if axis[ind] in (1, -1) and np.count_nonzero(axis) == 1:
+                return ind if axis[ind] == 1 else ind + 3
+        return NumericModel.AXIS_GENERAL
+
+    def get_axis_kinds(self):
+        # (num_joints,) axis kind of every joint
+        return self.axis_kinds
+
+    @staticmethod
+    def from_models(models):
+        """
+        Packs the NumericModels of several robots into a single model of a forest with
+        a padded layout: robot r owns the joint slots [r*J, r*J + num_joints_r), the positions
+        [r*P, r*P + num_pos_r), and the velocities [r*V, r*V + num_vel_r) with J, P, and V the
+        largest sizes over the robots. Unused slots are left out of the schedule (they stay
+        zero) and joints of the same kind are grouped across robots, so one call of
+        forward_kinematics_hom or inverse_dynamics evaluates every robot (see RobotScene).
+
+        Inputs:
+        - [NumericModel] models - the models of the robots (with the same dtype)
+
+        Output:
+        - (NumericModel) - the packed model (fixed joint frames and geometry are not packed)
+        """
+        dtype = models[0].dtype
+        R = len(models)
+        J = max(model.num_joints for model in models)
+        P = max(model.num_pos for model in models)
+        V = max(model.num_vel for model in models)
+        scene = NumericModel.__new__(NumericModel)
+        scene.robot_name = "scene"
+        scene.dtype = dtype
+        scene.floating_base = any(model.floating_base for model in models)
+        scene.num_pos = R*P
+        scene.num_vel = R*V
+        scene.num_joints = R*J
+        scene.joint_names = [""] * (R*J)
+        scene.link_names = ["base"] + [""] * (R*J)
+        # unused slots are single dof joints with no motion, no mass, and no state
+        scene.parent_ids = np.full(R*J, -1, dtype = int)
+        scene.jtypes = np.full(R*J, NumericModel.REVOLUTE, dtype = int)
+        scene.S = np.zeros((R*J, 6), dtype = dtype)
+        scene.axes = np.zeros((R*J, 3), dtype = dtype)
+        scene.axis_kinds = np.full(R*J, NumericModel.AXIS_GENERAL, dtype = np.int64)
+        scene.q_index = np.zeros(R*J, dtype = int)
+        scene.v_index = np.zeros(R*J, dtype = int)
+        scene.dofs = np.zeros(R*J, dtype = int)
+        scene.X_origin = np.broadcast_to(np.eye(6, dtype = dtype), (R*J, 6, 6)).copy()
+        scene.T_origin = np.broadcast_to(np.eye(4, dtype = dtype), (R*J, 4, 4)).copy()
+        scene.Imats = np.zeros((1 + R*J, 6, 6), dtype = dtype)
+        scene.pos_lower = np.zeros(R*P, dtype = dtype)
+        scene.pos_upper = np.zeros(R*P, dtype = dtype)
+        scene.pos_is_angle = np.zeros(R*P, dtype = bool)
+        scene.vel_limits = np.zeros(R*V, dtype = dtype)
+        scene.effort_limits = np.zeros(R*V, dtype = dtype)
+        depths = np.zeros(R*J, dtype = int)
+        kinds = [None] * (R*J)
+        quaternion_jids = []
+        for r, model in enumerate(models):
+            jids = r*J + np.arange(model.num_joints)
+            scene.parent_ids[jids] = np.where(model.parent_ids == -1, -1, r*J + model.parent_ids)
+            for name in ("jtypes", "S", "axes", "axis_kinds", "dofs", "X_origin", "T_origin"):
+                getattr(scene, name)[jids] = getattr(model, name)
+            scene.q_index[jids] = r*P + model.q_index
+            scene.v_index[jids] = r*V + model.v_index
+            scene.Imats[1 + jids] = model.Imats[1:]
+            for name, width, size in (("pos_lower", P, model.num_pos), ("pos_upper", P, model.num_pos), ("pos_is_angle", P, model.num_pos), \
+                                      ("vel_limits", V, model.num_vel), ("effort_limits", V, model.num_vel)):
+                getattr(scene, name)[r*width:r*width + size] = getattr(model, name)
+            for jid in range(model.num_joints):
+                depths[r*J + jid] = 0 if model.parent_ids[jid] == -1 else depths[r*J + model.parent_ids[jid]] + 1
+                kinds[r*J + jid] = ("floating", None) if model.jtypes[jid] == NumericModel.FLOATING else \
+                                   ("prismatic" if model.jtypes[jid] == NumericModel.PRISMATIC else "revolute", \
+                                    tuple(float(value) for value in model.S[jid]))
+            quaternion_jids.extend(r*J + model.quaternion_jids)
+        scene.schedule = TraversalSchedule.from_arrays(scene.parent_ids, depths, kinds)
+        active = np.array([kind is not None for kind in kinds], dtype = bool)
+        scene.moving_jids = np.flatnonzero(active & (scene.jtypes != NumericModel.FLOATING))
+        scene.floating_jids = np.flatnonzero(scene.jtypes == NumericModel.FLOATING)
+        scene.quaternion_jids = np.array(quaternion_jids, dtype = int)
+        scene.using_quaternion = len(quaternion_jids) > 0
+        scene.ancestor_mask = np.zeros((R*J, R*J), dtype = bool)
+        for jid in np.flatnonzero(active):
+            if scene.parent_ids[jid] != -1:
+                scene.ancestor_mask[jid] = scene.ancestor_mask[scene.parent_ids[jid]]
+            scene.ancestor_mask[jid, jid] = True
+        scene.link_masses = scene.Imats[:, 3, 3].copy()
+        scene.total_mass = float(np.sum(scene.link_masses))
+        scene.link_coms = np.zeros((1 + R*J, 3), dtype = dtype)
+        scene.link_coms[1:] = np.concatenate([np.pad(model.link_coms[1:], ((0, J - model.num_joints), (0, 0))) for model in models])
+        scene.fixed_joint_names = []
+        scene.fixed_parent_ids = np.zeros(0, dtype = int)
+        scene.fixed_T = np.zeros((0, 4, 4), dtype = dtype)
+        scene.backend = "numpy"
+        scene.kernels = None
+        scene.geometry = None
+        return scene
+
+    def set_backend(self, backend):
+        """
+        Selects the implementation of forward_kinematics_hom, inverse_dynamics, and mass_matrix:
+        - "numpy" - the level by level vectorized NumPy passes (default)
+        - "numba" - compiled loop kernels running in parallel over the batch (requires numba)
+        - "auto"  - numba if it is installed, NumPy otherwise
+
+        Inputs:
+        - (str) backend - "numpy", "numba", or "auto"
+
+        Output:
+        - (str) - the backend in use
+        """
+        if backend not in ("numpy", "numba", "auto"):
+            raise ValueError("Unknown backend [" + str(backend) + "], use numpy, numba, or auto")
+        self.backend = "numpy"
+        self.kernels = None
+        if backend != "numpy":
+            if importlib.util.find_spec("numba") is not None:
+                from .NumbaKernels import NumbaBackend # (numba is only imported when selected)
+                self.kernels = NumbaBackend(self)
+                self.backend = "numba"
+            elif backend == "numba":
+                raise ImportError("The numba backend requires numba (pip install numba)")
+        return self.backend
+
+    def pack_geometry(self, geometry_sets):
+        # concatenate every link's geometry and remember which link (index into link id order) it belongs to
+        link_inds = np.concatenate([np.full(geometry.get_num_geometries(), ind, dtype = int) \
+                                    for ind, geometry in enumerate(geometry_sets)] + [np.zeros(0, dtype = int)])
+        packed = {"link_inds": link_inds, \
+                  "types": np.concatenate([geometry.types for geometry in geometry_sets] + [np.zeros(0, dtype = int)]), \
+                  "origins": np.concatenate([geometry.origins for geometry in geometry_sets] + [np.zeros((0, 4, 4))]).astype(self.dtype), \
+                  "half_extents": np.concatenate([geometry.get_half_extents() for geometry in geometry_sets] + [np.zeros((0, 3))]).astype(self.dtype), \
+                  "params": np.concatenate([geometry.params for geometry in geometry_sets] + [np.zeros((0, 3))]).astype(self.dtype), \
+                  "spheres": np.array([geometry.get_bounding_sphere() for geometry in geometry_sets], dtype = self.dtype)}
+        return packed
+
+    def get_frame(self, name):
+        """
+        Returns the joint a named frame moves with and its offset from that joint's link.
+
+        Inputs:
+        - (str) name - a link, joint (its child link), or fixed joint name
+
+        Output:
+        - (int, np.array) - joint id (-1 for the base link) and 4x4 offset (None for link frames)
+        """
+        if name in self.link_names:
+            return self.link_names.index(name) - 1, None
+        if name in self.joint_names:
+            return self.joint_names.index(name), None
+        if name in self.fixed_joint_names:
+            ind = self.fixed_joint_names.index(name)
+            return self.fixed_parent_ids[ind], self.fixed_T[ind]
+        raise ValueError("Unknown frame [" + str(name) + "]")
+
+    ################
+    #    Limits    #
+    ################
+
+    def within_limits(self, Q, tolerance = 0):
+        """
+        Returns whether each configuration is within the position limits.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - (float) tolerance - allowed violation
+
+        Output:
+        - (N,) bool array
+        """
+        Q = self.as_batch(Q, self.num_pos)
+        return np.all((Q >= self.pos_lower - tolerance) & (Q <= self.pos_upper + tolerance), axis = -1)
+
+    def within_velocity_limits(self, V, tolerance = 0):
+        # (N,) bool array of whether |v| <= the velocity limit for all joints
+        V = self.as_batch(V, self.num_vel)
+        return np.all(np.abs(V) <= self.vel_limits + tolerance, axis = -1)
+
+    def clamp(self, Q, out = None):
+        # (N, num_pos) positions clipped to the position limits
+        return np.clip(self.as_batch(Q, self.num_pos), self.pos_lower, self.pos_upper, out = out)
+
+    def distance_to_limits(self, Q):
+        """
+        Returns the signed distance of every position to its closest limit.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+
+        Output:
+        - (N, num_pos) array (negative if violated, inf if unbounded)
+        """
+        Q = self.as_batch(Q, self.num_pos)
+        return np.minimum(Q - self.pos_lower, self.pos_upper - Q)
+
+    def sample_uniform(self, N, rng = None):
+        """
+        Samples configurations uniformly within the position limits. Unbounded
+        angles are sampled in [-pi, pi], other unbounded positions (the floating
+        base translation) are 0, and floating base quaternions are uniform unit quaternions.
+
+        Inputs:
+        - (int) N - the number of samples
+        - rng - numpy Generator or seed (optional)
+
+        Output:
+        - (N, num_pos) array
+        """
+        rng = np.random.default_rng(rng)
+        lower = np.where(np.isfinite(self.pos_lower), self.pos_lower, np.where(self.pos_is_angle, -np.pi, 0))
+        upper = np.where(np.isfinite(self.pos_upper), self.pos_upper, np.where(self.pos_is_angle, np.pi, 0))
+        Q = rng.uniform(lower, upper, (N, self.num_pos)).astype(self.dtype)
+        for jid in self.quaternion_jids:
+            quat = rng.standard_normal((N, 4)).astype(self.dtype)
+            Q[:, self.q_index[jid] + 3:self.q_index[jid] + 7] = quat / np.linalg.norm(quat, axis = -1, keepdims = True)
+        return Q
+
+    ###################
+    #    Transforms   #
+    ###################
+
+    def as_batch(self, Q, width):
+        # (width,) or (N, width) -> (N, width) in the model's dtype
+        Q = np.asarray(Q, dtype = self.dtype)
+        return np.reshape(Q, (-1, width))
+
+    def free_rotations(self, jid, Q):
+        # (N, 3, 3) rotation of the child relative to the joint frame for a revolute joint
+        return Transform_Tools().axis_angle_to_rot(self.axes[jid], Q[:, self.q_index[jid]])
+
+    def floating_base_pose(self, Q, jid = None):
+        # (N, 4, 4) pose of the floating base (of the floating joint jid, the first one if None) in the world
+        # (matching the floating joint's Xmat_sp)
+        tools = Transform_Tools()
+        jid = self.floating_jids[0] if jid is None else jid
+        start = self.q_index[jid]
+        if jid in self.quaternion_jids:
+            R = np.swapaxes(tools.quat_to_rot_batched(Q[:, start + 3:start + 7]), -1, -2)
+        else:
+            # rx(roll)*ry(pitch)*rz(yaw) in the Featherstone convention is R_rpy^T
+            R = np.moveaxis(tools.rpy_to_rot(Q[:, start + 3], Q[:, start + 4], Q[:, start + 5]), -1, 0)
+        T = np.zeros((Q.shape[0], 4, 4), dtype = self.dtype)
+        T[:, :3, :3] = R
+        T[:, :3, 3] = Q[:, start:start + 3]
+        T[:, 3, 3] = 1
+        return T
+
+    def joint_transforms_hom(self, Q, jids = None):
+        """
+        Returns the pose of each link in its parent link's frame.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - jids - (k,) joint ids to compute (all joints if None)
+
+        Output:
+        - (N, num_joints, 4, 4) array (or (N, k, 4, 4) in jids order)
+        """
+        Q = self.as_batch(Q, self.num_pos)
+        N = Q.shape[0]
+        # column of each joint in the output (-1 if not requested)
+        if jids is None:
+            columns = np.arange(self.num_joints)
+        else:
+            jids = np.asarray(jids, dtype = int)
+            columns = np.full(self.num_joints, -1, dtype = int)
+            columns[jids] = np.arange(len(jids))
+        T_free = np.zeros((N, self.num_joints if jids is None else len(jids), 4, 4), dtype = self.dtype)
+        T_free[..., 3, 3] = 1
+        # all joints of a kind (type and axis) at once
+        for jtype, S, group in self.schedule.get_groups():
+            if jtype == "floating":
+                continue
+            if jids is not None:
+                group = group[columns[group] >= 0]
+                if len(group) == 0:
+                    continue
+            angles = Q[:, self.q_index[group]]
+            group = columns[group]
+            if jtype == "prismatic":
+                T_free[:, group, :3, :3] = np.eye(3)
+                T_free[:, group, :3, 3:] = angles[..., None, None] * S[3:, None]
+            elif NumericModel.classify_axis(S[:3]) != NumericModel.AXIS_GENERAL:
+                # rotation about +-x, +-y, or +-z (cos and sin written directly)
+                kind = NumericModel.classify_axis(S[:3])
+                i, j, k = kind % 3, (kind + 1) % 3, (kind + 2) % 3
+                sin = np.sin(angles) if kind < 3 else -np.sin(angles)
+                cos = np.cos(angles)
+                T_free[:, group, i, i] = 1
+                T_free[:, group, j, j] = cos
+                T_free[:, group, k, k] = cos
+                T_free[:, group, k, j] = sin
+                T_free[:, group, j, k] = -sin
+            else:
+                T_free[:, group, :3, :3] = Transform_Tools().axis_angle_to_rot(S[:3].astype(self.dtype), angles)
+        T = (self.T_origin if jids is None else self.T_origin[jids]) @ T_free
+        for jid in self.floating_jids:
+            if columns[jid] >= 0:
+                T[:, columns[jid]] = self.floating_base_pose(Q, jid)
+        return T
+
+    def joint_transforms(self, Q, jids = None):
+        """
+        Returns the spatial transform ^iX_parent of each joint (Featherstone convention).
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - jids - (k,) joint ids to compute (all joints if None)
+
+        Output:
+        - (N, num_joints, 6, 6) array (or (N, k, 6, 6) in jids order)
+        """
+        return Transform_Tools().hom_to_spatial(self.joint_transforms_hom(Q, jids))
+
+    def forward_kinematics_hom(self, Q, include_fixed_joints = False):
+        """
+        Returns the world pose of every link (and optionally every fixed joint frame).
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - (bool) include_fixed_joints - append the fixed joint frames after the links
+
+        Output:
+        - (N, num_joints [+ num_fixed_joints], 4, 4) array (link i is the child of joint i)
+        """
+        Q = self.as_batch(Q, self.num_pos)
+        N = Q.shape[0]
+        num_frames = self.num_joints + (len(self.fixed_joint_names) if include_fixed_joints else 0)
+        T = np.zeros((N, num_frames, 4, 4), dtype = self.dtype)
+        if self.kernels is not None:
+            self.kernels.forward_kinematics_hom(Q, T)
+        else:
+            self.forward_poses(T, self.joint_transforms_hom(Q), self.schedule.get_levels())
+        if include_fixed_joints:
+            self.fixed_joint_poses(T)
+        return T
+
+    def forward_poses(self, T, T_local, levels):
+        # T[:, i] = T[:, parent] T_local[:, i] one level (see TraversalSchedule.get_levels) at a time
+        for jids, parent_ids, _ in levels:
+            if self.schedule.is_root_level(parent_ids):
+                T[:, jids] = T_local[:, jids]
+            else:
+                T[:, jids] = T[:, parent_ids] @ T_local[:, jids]
+
+    def fixed_joint_poses(self, T):
+        # fills the fixed joint frames of T (after the links) from the link poses
+        if len(self.fixed_joint_names) > 0:
+            on_base = self.fixed_parent_ids == -1
+            T[:, self.num_joints:][:, ~on_base] = T[:, self.fixed_parent_ids[~on_base]] @ self.fixed_T[~on_base]
+            T[:, self.num_joints:][:, on_base] = self.fixed_T[on_base]
+
+    def link_poses(self, Q):
+        # (N, num_links, 4, 4) world pose of every link in link id order (the base link first)
+        T = self.forward_kinematics_hom(Q)
+        base = np.broadcast_to(np.eye(4, dtype = self.dtype), (T.shape[0], 1, 4, 4))
+        return np.concatenate((base, T), axis = 1)
+
+    ##################
+    #    Dynamics    #
+    ##################
+
+    def motion_cross(self, v, m):
+        # v x m for (..., 6) spatial motion vectors [angular; linear]
+        return np.concatenate((np.cross(v[..., :3], m[..., :3]), \
+                               np.cross(v[..., :3], m[..., 3:]) + np.cross(v[..., 3:], m[..., :3])), axis = -1)
+
+    def force_cross(self, v, f):
+        # v x* f for (..., 6) spatial motion v and force f
+        return np.concatenate((np.cross(v[..., :3], f[..., :3]) + np.cross(v[..., 3:], f[..., 3:]), \
+                               np.cross(v[..., :3], f[..., 3:])), axis = -1)
+
+    def joint_motions(self, QV):
+        # (N, num_joints, 6) S_i qv_i of every joint for a (N, num_vel) velocity-like array
+        motions = np.zeros((QV.shape[0], self.num_joints, 6), dtype = self.dtype)
+        motions[:, self.moving_jids] = QV[:, self.v_index[self.moving_jids], None] * self.S[self.moving_jids]
+        for jid in self.floating_jids:
+            motions[:, jid] = QV[:, self.v_index[jid]:self.v_index[jid] + 6]
+        return motions
+
+    def project_forces(self, f):
+        # (N, num_vel) S_i^T f_i of every joint for (N, num_joints, 6) forces
+        tau = np.zeros((f.shape[0], self.num_vel), dtype = self.dtype)
+        tau[:, self.v_index[self.moving_jids]] = np.einsum("nji,ji->nj", f[:, self.moving_jids], self.S[self.moving_jids])
+        for jid in self.floating_jids:
+            tau[:, self.v_index[jid]:self.v_index[jid] + 6] = f[:, jid]
+        return tau
+
+    def link_velocities_accelerations(self, X, QD, QDD, gravity):
+        # forward pass (one level at a time) of the spatial velocities and accelerations (including -gravity) of every link
+        N = X.shape[0]
+        vJ = self.joint_motions(QD)
+        v = np.zeros((N, self.num_joints, 6), dtype = self.dtype)
+        a = self.joint_motions(QDD)
+        self.forward_motions(X, vJ, v, a, self.base_acceleration(gravity), self.schedule.get_levels())
+        return v, a
+
+    def base_acceleration(self, gravity):
+        # (6,) spatial acceleration of the base link (gravity is modeled as an upwards base acceleration)
+        a_base = np.zeros(6, dtype = self.dtype)
+        a_base[5] = gravity
+        return a_base
+
+    def forward_motions(self, X, vJ, v, a, a_base, levels):
+        # v[:, i] = X_i v[:, parent] + vJ_i and a[:, i] += X_i a[:, parent] + v_i x vJ_i one level at a time
+        # (only the velocities if a is None)
+        for jids, parent_ids, _ in levels:
+            X_level = X[:, jids]
+            if self.schedule.is_root_level(parent_ids):
+                v[:, jids] = vJ[:, jids]
+                if a is not None:
+                    a[:, jids] += X_level @ a_base
+            else:
+                v[:, jids] = (X_level @ v[:, parent_ids, :, None])[..., 0] + vJ[:, jids]
+                if a is not None:
+                    a[:, jids] += (X_level @ a[:, parent_ids, :, None])[..., 0] + self.motion_cross(v[:, jids], vJ[:, jids])
+
+    def spatial_velocities_accelerations(self, Q, QD, QDD = None, frame = "local", include_fixed_joints = False, \
+                                         classical = False, gravity = 0):
+        """
+        Returns the spatial velocity and acceleration of every link (and optionally
+        every fixed joint frame) for a batch of states.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - QD - (N, num_vel) or (num_vel,) joint velocities
+        - QDD - (N, num_vel) or (num_vel,) joint accelerations (None skips the acceleration pass)
+        - (str) frame - the coordinates of the [angular; linear] vectors
+            "local"         - each frame's own coordinates (linear part at the frame origin)
+            "world"         - world coordinates (linear part of the body point at the world origin)
+            "world_aligned" - world axes with the linear part at the frame origin
+        - (bool) include_fixed_joints - append the fixed joint frames after the links
+        - (bool) classical - replace the linear accelerations with classical ones (a + w x v) of
+                             the reference point (the frame origin, or the world origin for "world")
+        - (float) gravity - acceleration of gravity (along -z of the base frame), 0 for true accelerations
+
+        Output:
+        - (N, num_links [+ num_fixed_joints], 6) velocities in link id order (the base link first)
+        - (N, num_links [+ num_fixed_joints], 6) accelerations (None if QDD is None)
+        """
+        if frame not in ("local", "world", "world_aligned"):
+            raise ValueError("Unknown frame [" + str(frame) + "], use local, world, or world_aligned")
+        Q = self.as_batch(Q, self.num_pos)
+        N = Q.shape[0]
+        n = self.num_joints
+        num_fixed = len(self.fixed_joint_names) if include_fixed_joints else 0
+        T_local = self.joint_transforms_hom(Q)
+        X = Transform_Tools().hom_to_spatial(T_local)
+        a_base = self.base_acceleration(gravity)
+        # the base link (at rest) first, then the links, then the fixed joint frames
+        V = np.zeros((N, 1 + n + num_fixed, 6), dtype = self.dtype)
+        A = None
+        if QDD is not None:
+            A = np.zeros((N, 1 + n + num_fixed, 6), dtype = self.dtype)
+            A[:, 1:n + 1] = self.joint_motions(np.broadcast_to(self.as_batch(QDD, self.num_vel), (N, self.num_vel)))
+            A[:, 0] = a_base
+        vJ = self.joint_motions(np.broadcast_to(self.as_batch(QD, self.num_vel), (N, self.num_vel)))
+        self.forward_motions(X, vJ, V[:, 1:n + 1], None if A is None else A[:, 1:n + 1], a_base, self.schedule.get_levels())
+        if num_fixed > 0:
+            # fixed joint frames move with their parent link
+            X_fixed = Transform_Tools().hom_to_spatial(self.fixed_T)
+            rows = self.fixed_parent_ids + 1
+            for M in (V, A) if A is not None else (V,):
+                M[:, n + 1:] = (X_fixed @ M[:, rows, :, None])[..., 0]
+        if frame != "local":
+            T = np.zeros((N, n + num_fixed, 4, 4), dtype = self.dtype)
+            self.forward_poses(T, T_local, self.schedule.get_levels())
+            if num_fixed > 0:
+                self.fixed_joint_poses(T)
+            R = T[..., :3, :3]
+            p = T[..., :3, 3] if frame == "world" else np.zeros(T.shape[:-2] + (3,), dtype = self.dtype)
+            for M in (V, A) if A is not None else (V,):
+                # ^0X_i m = [R w; p x R w + R v]
+                w = (R @ M[:, 1:, :3, None])[..., 0]
+                M[:, 1:, 3:] = np.cross(p, w) + (R @ M[:, 1:, 3:, None])[..., 0]
+                M[:, 1:, :3] = w
+        if classical and A is not None:
+            A[..., 3:] += np.cross(V[..., :3], V[..., 3:])
+        return V, A
+
+    def link_forces(self, v, a, jids = slice(None)):
+        # (N, k, 6) net force I a + v x* I v of the links of jids
+        I = self.Imats[1:][jids]
+        return (I @ a[..., None])[..., 0] + self.force_cross(v, (I @ v[..., None])[..., 0])
+
+    def backward_forces(self, X, f, levels):
+        # f[:, parent] += X_i^T f[:, i] one level (leaves first, see TraversalSchedule.get_levels) at a time
+        for jids, parent_ids, unique_parents in levels:
+            if not self.schedule.is_root_level(parent_ids):
+                f_parent = (f[:, jids, None, :] @ X[:, jids])[..., 0, :] # X^T f
+                self.schedule.add_to_parents(f, f_parent, parent_ids, unique_parents)
+
+    def inverse_dynamics(self, Q, QD, QDD, gravity = 9.81):
+        """
+        Returns the joint forces / torques (RNEA, without joint damping) for a batch of states.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - QD, QDD - (N, num_vel) or (num_vel,) joint velocities and accelerations
+        - (float) gravity - acceleration of gravity (along -z of the base frame)
+
+        Output:
+        - (N, num_vel) array
+        """
+        Q = self.as_batch(Q, self.num_pos)
+        N = Q.shape[0]
+        QD = np.broadcast_to(self.as_batch(QD, self.num_vel), (N, self.num_vel))
+        QDD = np.broadcast_to(self.as_batch(QDD, self.num_vel), (N, self.num_vel))
+        if self.kernels is not None:
+            return self.kernels.inverse_dynamics(Q, QD, QDD, gravity)
+        X = self.joint_transforms(Q)
+        v, a = self.link_velocities_accelerations(X, QD, QDD, gravity)
+        f = self.link_forces(v, a)
+        # backward pass: pass the forces to the parents one level at a time
+        self.backward_forces(X, f, self.schedule.get_levels(reverse = True))
+        return self.project_forces(f)
+
+    def velocity_columns(self):
+        # joint id and (6,) motion subspace column of every velocity (the floating base joint owns 6 unit columns)
+        col_jids = np.zeros(self.num_vel, dtype = int)
+        col_S = np.zeros((self.num_vel, 6), dtype = self.dtype)
+        for jid in range(self.num_joints):
+            for dof in range(self.dofs[jid]):
+                col_jids[self.v_index[jid] + dof] = jid
+                col_S[self.v_index[jid] + dof] = self.S[jid] if self.dofs[jid] == 1 else np.eye(6)[dof]
+        return col_jids, col_S
+
+    def mass_matrix(self, Q):
+        """
+        Returns the joint space mass matrix (CRBA) for a batch of positions.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+
+        Output:
+        - (N, num_vel, num_vel) symmetric array
+        """
+        Q = self.as_batch(Q, self.num_pos)
+        if self.kernels is not None:
+            return self.kernels.mass_matrix(Q)
+        X = self.joint_transforms(Q)
+        N = X.shape[0]
+        # composite rigid body inertias (backward pass one level at a time)
+        Ic = np.array(np.broadcast_to(self.Imats[1:], X.shape))
+        for jids, parent_ids, unique_parents in self.schedule.get_levels(reverse = True):
+            if not self.schedule.is_root_level(parent_ids):
+                X_level = X[:, jids]
+                self.schedule.add_to_parents(Ic, np.swapaxes(X_level, -1, -2) @ Ic[:, jids] @ X_level, parent_ids, unique_parents)
+        # F = Ic_i s for every velocity column, moved up one ancestor at a time: H[ancestor column, column] = s_ancestor^T F
+        col_jids, col_S = self.velocity_columns()
+        F = (Ic[:, col_jids] @ col_S[..., None])[..., 0]
+        H = np.zeros((N, self.num_vel, self.num_vel), dtype = self.dtype)
+        cols = np.arange(self.num_vel)
+        jids = col_jids.copy()
+        while len(cols) > 0:
+            single = self.dofs[jids] == 1
+            H[:, self.v_index[jids[single]], cols[single]] = np.einsum("nki,ki->nk", F[:, cols[single]], self.S[jids[single]])
+            for jid in self.floating_jids:
+                on_floating = jids == jid
+                H[:, self.v_index[jid]:self.v_index[jid] + 6, cols[on_floating]] = np.swapaxes(F[:, cols[on_floating]], -1, -2)
+            F[:, cols] = (F[:, cols, None, :] @ X[:, jids])[..., 0, :] # X^T F
+            jids = self.parent_ids[jids]
+            cols = cols[jids != -1]
+            jids = jids[jids != -1]
+        # the upper triangle (ancestor rows) is filled
+        return np.triu(H) + np.swapaxes(np.triu(H, 1), -1, -2)
+
+    ###################
+    #    Regressor    #
+    ###################
+
+    def inertial_parameters(self):
+        """
+        Returns the inertial parameters of every (moving) link, in link id order, as
+        [m, m cx, m cy, m cz, Ixx, Ixy, Ixz, Iyy, Iyz, Izz] with the rotational
+        inertia about the link frame origin (the InertiaSet order).
+
+        Output:
+        - (num_joints*10,) array
+        """
+        I = self.Imats[1:]
+        params = np.stack((I[:, 3, 3], I[:, 2, 4], I[:, 0, 5], I[:, 1, 3], \
+                           I[:, 0, 0], I[:, 0, 1], I[:, 0, 2], I[:, 1, 1], I[:, 1, 2], I[:, 2, 2]), axis = -1)
+        return params.reshape(-1)
+
+    def spatial_inertia_basis(self):
+        # (10, 6, 6) derivatives of a spatial inertia with respect to its inertial parameters
+        basis = np.zeros((10, 6, 6), dtype = self.dtype)
+        basis[0, 3:, 3:] = np.eye(3)
+        for k, (row, col) in enumerate(((2, 1), (0, 2), (1, 0))):
+            # m c appears as m cx in the top right and m cx^T in the bottom left block
+            basis[1 + k, row, 3 + col] = 1
+            basis[1 + k, col, 3 + row] = -1
+            basis[1 + k, 3 + col, row] = 1
+            basis[1 + k, 3 + row, col] = -1
+        for k, (row, col) in enumerate(((0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2))):
+            basis[4 + k, row, col] = 1
+            basis[4 + k, col, row] = 1
+        return basis
+
+    def spatial_inertias_from_parameters(self, params):
+        # (num_joints, 6, 6) spatial inertias of the moving links from (num_joints*10,) inertial parameters
+        return np.einsum("lk,kij->lij", np.reshape(params, (-1, 10)), self.spatial_inertia_basis())
+
+    def regressor(self, Q, QD, QDD, gravity = 9.81):
+        """
+        Returns the dynamics regressor Y with inverse_dynamics(Q, QD, QDD) = Y pi
+        for the inertial parameters pi (see inertial_parameters).
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - QD, QDD - (N, num_vel) or (num_vel,) joint velocities and accelerations
+        - (float) gravity - acceleration of gravity (along -z of the base frame)
+
+        Output:
+        - (N, num_vel, num_joints*10) array
+        """
+        X = self.joint_transforms(Q)
+        N = X.shape[0]
+        QD = np.broadcast_to(self.as_batch(QD, self.num_vel), (N, self.num_vel))
+        QDD = np.broadcast_to(self.as_batch(QDD, self.num_vel), (N, self.num_vel))
+        v, a = self.link_velocities_accelerations(X, QD, QDD, gravity)
+        # f = I a + v x* I v is linear in the parameters: (N, num_joints, 6, 10)
+        basis = self.spatial_inertia_basis()
+        Ia = np.einsum("kab,njb->njka", basis, a)
+        Iv = np.einsum("kab,njb->njka", basis, v)
+        F = np.swapaxes(Ia + self.force_cross(v[:, :, None], Iv), -1, -2)
+        # every link's force reaches all of its supporting joints, move all of them up one joint at a time
+        Y = np.zeros((N, self.num_vel, self.num_joints, 10), dtype = self.dtype)
+        links = np.arange(self.num_joints)
+        supports = links.copy()
+        while len(links) > 0:
+            moving = self.jtypes[supports] != NumericModel.FLOATING
+            Y[:, self.v_index[supports[moving]], links[moving]] = np.einsum("ja,njak->njk", self.S[supports[moving]], F[:, moving])
+            for ind in np.flatnonzero(~moving):
+                Y[:, self.v_index[supports[ind]]:self.v_index[supports[ind]] + 6, links[ind]] = F[:, ind]
+            has_parent = self.parent_ids[supports] != -1
+            F = np.swapaxes(X[:, supports[has_parent]], -1, -2) @ F[:, has_parent]
+            links = links[has_parent]
+            supports = self.parent_ids[supports[has_parent]]
+        return Y.reshape(N, self.num_vel, self.num_joints*10)
+
+    def stacked_regressor(self, Q, QD, QDD, gravity = 9.81, out = None):
+        # (N*num_vel, num_joints*10) regressor rows of all samples stacked for least squares (optionally written into out)
+        Y = self.regressor(Q, QD, QDD, gravity).reshape(-1, self.num_joints*10)
+        if out is None:
+            return Y
+        out[...] = Y
+        return out
+
+    def regressor_normal_equations(self, Q, QD, QDD, TAU, gravity = 9.81):
+        """
+        Returns the least squares normal equations (Y^T Y, Y^T tau) of a batch of
+        samples. Sums over chunks give the normal equations of the whole log.
+
+        Inputs:
+        - Q, QD, QDD - batched joint positions, velocities, and accelerations
+        - TAU - (N, num_vel) measured joint forces / torques
+
+        Outputs:
+        - (num_joints*10, num_joints*10) array Y^T Y
+        - (num_joints*10,) array Y^T tau
+        """
+        Y = self.stacked_regressor(Q, QD, QDD, gravity)
+        return Y.T @ Y, Y.T @ np.reshape(TAU, -1)
+
+    ####################
+    #    Centroidal    #
+    ####################
+
+    def motion_subspaces_world(self, T):
+        """
+        Returns the motion subspace of every joint in world coordinates
+        (Plucker coordinates about the world origin).
+
+        Inputs:
+        - T - (N, num_joints, 4, 4) world poses (from forward_kinematics_hom)
+
+        Output:
+        - (N, 6, num_vel) array
+        """
+        N = T.shape[0]
+        S_world = np.zeros((N, 6, self.num_vel), dtype = self.dtype)
+        # all single dof joints at once
+        jids = self.moving_jids
+        cols = self.v_index[jids]
+        w = np.einsum("njab,jb->nja", T[:, jids, :3, :3], self.S[jids, :3])
+        S_world[:, :3, cols] = np.swapaxes(w, 1, 2)
+        S_world[:, 3:, cols] = np.swapaxes(np.einsum("njab,jb->nja", T[:, jids, :3, :3], self.S[jids, 3:]) + \
+                                           np.cross(T[:, jids][..., :3, 3], w), 1, 2)
+        for jid in self.floating_jids:
+            cols = slice(self.v_index[jid], self.v_index[jid] + 6)
+            R = T[:, jid, :3, :3]
+            S_world[:, :3, cols] = 0
+            S_world[:, :3, cols.start:cols.start + 3] = R
+            S_world[:, 3:, cols.start:cols.start + 3] = np.cross(T[:, jid, :3, 3][:, :, None], R, axis = 1)
+            S_world[:, 3:, cols.start + 3:cols.stop] = R
+        return S_world
+
+    def subtree_sums(self, values):
+        # sums (N, num_joints, ...) per link values over each joint's subtree (one level at a time from the leaves)
+        sums = values.copy()
+        for jids, parent_ids, unique_parents in self.schedule.get_levels(reverse = True):
+            self.schedule.accumulate_to_parents(sums, jids, parent_ids, unique_parents)
+        return sums
+
+    def force_cross_matrix(self, v):
+        # (..., 6, 6) matrix of v x* for (..., 6) spatial motion vectors
+        tools = Transform_Tools()
+        M = np.zeros(v.shape[:-1] + (6, 6), dtype = self.dtype)
+        M[..., :3, :3] = tools.skew(v[..., :3])
+        M[..., :3, 3:] = tools.skew(v[..., 3:])
+        M[..., 3:, 3:] = M[..., :3, :3]
+        return M
+
+    def coriolis_matrix(self, Q, QD):
+        """
+        Returns the Coriolis matrix C(q, qd): C qd is the velocity product term of
+        inverse_dynamics and dM/dt - 2C is skew symmetric. In world coordinates, with
+        the composite inertias Ic_i and Bc_i = sum over the subtree of (v_k x*) I_k:
+            C[i, j] = S_i^T (Ic_i dS_j + Bc_i S_j)    joint j supports joint i (or is joint i)
+            C[i, j] = S_i^T (Ic_j dS_j + Bc_j S_j)    joint i supports joint j
+            C[i, j] = 0                               otherwise (different branches)
+        where dS_j = v_j x S_j, and only the non zero (ancestor / descendant) entries are computed.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - QD - (N, num_vel) or (num_vel,) joint velocities
+
+        Output:
+        - (N, num_vel, num_vel) array
+        """
+        Q = self.as_batch(Q, self.num_pos)
+        N = Q.shape[0]
+        QD = np.broadcast_to(self.as_batch(QD, self.num_vel), (N, self.num_vel))
+        T = self.forward_kinematics_hom(Q)
+        S = np.swapaxes(self.motion_subspaces_world(T), 1, 2) # (N, num_vel, 6) world motion subspace columns
+        col_jids, _ = self.velocity_columns()
+        # world velocity of every link (the sum over the columns supporting it) and dS = v x S
+        support = self.ancestor_mask[:, col_jids]
+        v = np.einsum("kc,nca,nc->nka", support, S, QD)
+        dS = self.motion_cross(v[:, col_jids], S)
+        # composite inertias and velocity product terms over each joint's subtree
+        X = Transform_Tools().hom_to_spatial(T)
+        I_world = np.swapaxes(X, -1, -2) @ self.Imats[1:] @ X
+        Ic = self.subtree_sums(I_world)[:, col_jids]
+        Bc = self.subtree_sums(self.force_cross_matrix(v) @ I_world)[:, col_jids]
+        C = np.zeros((N, self.num_vel, self.num_vel), dtype = self.dtype)
+        # column j supports column i: (Ic_i S_i)^T dS_j + (Bc_i^T S_i)^T S_j
+        rows, cols = np.nonzero(support[col_jids])
+        IcS = (Ic @ S[..., None])[..., 0]
+        BcS = (np.swapaxes(Bc, -1, -2) @ S[..., None])[..., 0]
+        C[:, rows, cols] = np.einsum("nka,nka->nk", IcS[:, rows], dS[:, cols]) + np.einsum("nka,nka->nk", BcS[:, rows], S[:, cols])
+        # column i strictly supports column j: S_i^T (Ic_j dS_j + Bc_j S_j)
+        rows, cols = np.nonzero(support[col_jids].T & (col_jids[:, None] != col_jids[None, :]))
+        F = (Ic @ dS[..., None])[..., 0] + (Bc @ S[..., None])[..., 0]
+        C[:, rows, cols] = np.einsum("nka,nka->nk", S[:, rows], F[:, cols])
+        return C
+
+    def mass_matrix_derivative(self, Q, QD):
+        # (N, num_vel, num_vel) dM/dt = C + C^T (as dM/dt - 2C is skew symmetric)
+        C = self.coriolis_matrix(Q, QD)
+        return C + np.swapaxes(C, -1, -2)
+
+    def link_coms_world(self, T):
+        # (N, num_links, 3) world position of each link's center of mass (the base link first)
+        coms = np.empty(T.shape[:1] + (self.num_joints + 1, 3), dtype = self.dtype)
+        coms[:, 0] = self.link_coms[0]
+        coms[:, 1:] = np.einsum("njab,jb->nja", T[:, :, :3, :3], self.link_coms[1:]) + T[:, :, :3, 3]
+        return coms
+
+    def center_of_mass(self, Q):
+        """
+        Returns the whole body center of mass.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+
+        Output:
+        - (N, 3) array in the world frame
+        """
+        coms = self.link_coms_world(self.forward_kinematics_hom(Q))
+        return np.einsum("l,nla->na", self.link_masses, coms) / self.total_mass
+
+    def center_of_mass_jacobian(self, Q):
+        """
+        Returns the Jacobian of the whole body center of mass (d com = J qd).
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+
+        Output:
+        - (N, 3, num_vel) array
+        """
+        T = self.forward_kinematics_hom(Q)
+        S_world = self.motion_subspaces_world(T)
+        # mass and first moment (sum of m c) of every subtree
+        first_moments = self.link_masses[1:, None] * self.link_coms_world(T)[:, 1:]
+        subtree_moments = self.subtree_sums(first_moments)
+        subtree_masses = self.subtree_sums(np.broadcast_to(self.link_masses[1:], T.shape[:2]))
+        J = np.zeros((T.shape[0], 3, self.num_vel), dtype = self.dtype)
+        for jid in range(self.num_joints):
+            cols = slice(self.v_index[jid], self.v_index[jid] + self.dofs[jid])
+            # the subtree moves with v + w x c for every point c
+            J[:, :, cols] = subtree_masses[:, jid, None, None] * S_world[:, 3:, cols] + \
+                            np.cross(S_world[:, :3, cols], subtree_moments[:, jid, :, None], axis = 1)
+        return J / self.total_mass
+
+    def centroidal_momentum_matrix(self, Q):
+        """
+        Returns the centroidal momentum matrix A_G (h_G = A_G qd) where h_G is the
+        spatial momentum [angular; linear] about the center of mass in world orientation.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+
+        Output:
+        - (N, 6, num_vel) array
+        """
+        T = self.forward_kinematics_hom(Q)
+        S_world = self.motion_subspaces_world(T)
+        # world frame spatial inertias I_0 = ^iX_0^T I_i ^iX_0 and their subtree (composite) sums
+        X = Transform_Tools().hom_to_spatial(T)
+        I_world = np.swapaxes(X, -1, -2) @ self.Imats[1:] @ X
+        I_composite = self.subtree_sums(I_world)
+        A = np.zeros((T.shape[0], 6, self.num_vel), dtype = self.dtype)
+        for jid in range(self.num_joints):
+            cols = slice(self.v_index[jid], self.v_index[jid] + self.dofs[jid])
+            A[:, :, cols] = I_composite[:, jid] @ S_world[:, :, cols]
+        # move the angular momentum from the world origin to the center of mass (k_G = k_0 - c x l)
+        com = np.einsum("l,nla->na", self.link_masses, self.link_coms_world(T)) / self.total_mass
+        A[:, :3] -= np.cross(com[:, :, None], A[:, 3:], axis = 1)
+        return A
+
+    def centroidal_momentum(self, Q, QD):
+        # (N, 6) centroidal momentum [angular; linear] for positions Q and velocities QD
+        QD = self.as_batch(QD, self.num_vel)
+        return np.einsum("nij,nj->ni", self.centroidal_momentum_matrix(Q), QD)
+
+    def frame_poses(self, Q, name, T = None):
+        # (N, 4, 4) world pose of a named frame (see get_frame), T are the joint world poses if already computed
+        jid, offset = self.get_frame(name)
+        T = self.forward_kinematics_hom(Q) if T is None else T
+        pose = T[:, jid] if jid != -1 else np.broadcast_to(np.eye(4, dtype = self.dtype), (T.shape[0], 4, 4))
+        return pose if offset is None else pose @ offset
+
+    def frame_jacobian(self, Q, name, T = None):
+        """
+        Returns the geometric Jacobian of a named frame (see get_frame) with
+        rows [angular; linear] velocity of the frame origin in world coordinates.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - (str) name - the frame name
+        - T - (N, num_joints, 4, 4) joint world poses (optional, if already computed)
+
+        Output:
+        - (N, 6, num_vel) array
+        """
+        jid, offset = self.get_frame(name)
+        T = self.forward_kinematics_hom(Q) if T is None else T
+        J = np.zeros((T.shape[0], 6, self.num_vel), dtype = self.dtype)
+        if jid == -1:
+            return J
+        position = self.frame_poses(None, name, T)[:, :3, 3]
+        supports = np.flatnonzero(self.ancestor_mask[jid])
+        cols = np.concatenate([np.arange(self.v_index[ind], self.v_index[ind] + self.dofs[ind]) for ind in supports])
+        S_world = self.motion_subspaces_world(T)[:, :, cols]
+        # the velocity of the point p is v + w x p
+        J[:, :3, cols] = S_world[:, :3]
+        J[:, 3:, cols] = S_world[:, 3:] + np.cross(S_world[:, :3], position[:, :, None], axis = 1)
+        return J
+
+    ################
+    #    Bounds    #
+    ################
+
+    def bounding_spheres(self, Q, geometry = "collision"):
+        """
+        Returns a world space sphere containing each link's (primitive) geometry.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - (str) geometry - "collision" or "visual"
+
+        Output:
+        - (N, num_links, 4) array of center xyz and radius (nan for links without primitive geometry)
+        """
+        spheres = self.geometry[geometry]["spheres"]
+        T = self.link_poses(Q)
+        out = np.empty(T.shape[:2] + (4,), dtype = self.dtype)
+        out[..., :3] = np.einsum("nlij,lj->nli", T[..., :3, :3], spheres[:, :3]) + T[..., :3, 3]
+        out[..., 3] = spheres[:, 3]
+        return out
+
+    def bounding_boxes(self, Q, geometry = "collision"):
+        """
+        Returns the world space axis aligned bounding box of each link's (primitive) geometry.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+        - (str) geometry - "collision" or "visual"
+
+        Output:
+        - (N, num_links, 2, 3) array of min and max corners (nan for links without primitive geometry)
+        """
+        packed = self.geometry[geometry]
+        T = self.link_poses(Q)
+        N = T.shape[0]
+        out = np.full((N, T.shape[1], 2, 3), np.nan, dtype = self.dtype)
+        known = ~np.isnan(packed["half_extents"][:, 0])
+        if not np.any(known):
+            return out
+        link_inds = packed["link_inds"][known]
+        types = packed["types"][known]
+        params = packed["params"][known]
+        # world pose of every geometry
+        T_geom = T[:, link_inds] @ packed["origins"][known]
+        R = T_geom[..., :3, :3]
+        center = T_geom[..., :3, 3]
+        # boxes are bounded by |R| h
+        extents = np.einsum("ngij,gj->ngi", np.abs(R), packed["half_extents"][known])
+        # spheres are rotation invariant
+        spheres = types == GeometrySet.SPHERE
+        extents[:, spheres] = params[spheres, :1]
+        # cylinders (along their z axis a) are bounded by |a_i| l/2 + r sqrt(1 - a_i^2)
+        cylinders = types == GeometrySet.CYLINDER
+        if np.any(cylinders):
+            axis = R[:, cylinders][..., 2]
+            extents[:, cylinders] = np.abs(axis)*(0.5*params[cylinders, 1])[:, None] + \
+                                    np.sqrt(np.clip(1 - axis*axis, 0, None))*params[cylinders, 0][:, None]
+        # combine the geometries of each link
+        np.fmin.at(out[:, :, 0], (slice(None), link_inds), center - extents)
+        np.fmax.at(out[:, :, 1], (slice(None), link_inds), center + extents)
+        return out
@@ -1,6 +1,13 @@
+import copy
+import numpy as np
 from .Link import Link
+from .InertiaSet import InertiaSet
 from .Joint import Joint, Fixed_Joint
 from .SpatialAlgebra import Quaternion_Tools
+from .NumericModel import NumericModel
+from .InverseKinematics import InverseKinematics
+from .BranchParallel import BranchParallelExecutor
+from .SharedMemoryPool import SharedMemoryPool
 
 class Robot:
     # initialization
@@ -11,6 +18,180 @@ class Robot:
         self.joints = []
         self.fixed_joints = []
         self.using_quaternion = using_quaternion
+        self.parse_cache = None # pre fixed joint removal links/joints used by URDFParser.update
+        self.numeric_models = {} # cached NumericModels by dtype (and backend)
+        self.index_maps = None # cached state index arrays (see get_index_maps)
+
+    def clone(self):
+        """
+        Returns a copy-on-write clone of the robot. Links and joints are copied
+        but their sympy/numpy matrices are shared, as every setter replaces
+        (rather than modifies) the stored matrix. Much cheaper than a deepcopy.
+
+        Output:
+        - (Robot) - the cloned robot
+        """
+        new_robot = copy.copy(self)
+        new_robot.links = [link.clone() for link in self.links]
+        new_robot.joints = [joint.clone() for joint in self.joints]
+        new_robot.fixed_joints = [fixed_joint.clone() for fixed_joint in self.fixed_joints]
+        new_robot.numeric_models = {}
+        return new_robot
+
+    def extract(self, root_link, tip_links = None, joint_values = None):
+        """
+        Returns a new renumbered robot made of the subtree rooted at root_link (or
+        only the chains from root_link to each of the tip_links). The root link
+        becomes the (fixed) base. Excluded descendants are locked (at joint_values,
+        default 0) and their inertia and geometry are lumped into the links they
+        attach to, exactly like fixed joints.
+
+        Inputs:
+        - (str) root_link - name of the new base link
+        - ([str]) tip_links - names of the links to keep the chains to (the whole subtree if None)
+        - ({str: float}) joint_values - positions of the excluded joints (optional)
+
+        Output:
+        - (Robot) - the extracted robot
+        """
+        from .URDFParser import URDFParser # (URDFParser imports Robot)
+        root = self.get_link_by_name(root_link)
+        if root is None:
+            raise ValueError("Unknown link [" + str(root_link) + "]")
+        joint_values = {} if joint_values is None else joint_values
+        new_robot = self.clone()
+        kept_link_names = set(link.get_name() for link in self.links if link.get_id() in root.get_subtree())
+        # links on the chains from the root to the tips
+        chain_link_names = kept_link_names
+        if tip_links is not None:
+            chain_link_names = set([root_link])
+            for tip_link in tip_links:
+                if tip_link not in kept_link_names:
+                    raise ValueError("Link [" + str(tip_link) + "] is not in the subtree of [" + str(root_link) + "]")
+                curr_name = tip_link
+                while curr_name != root_link:
+                    chain_link_names.add(curr_name)
+                    curr_name = self.get_joints_by_child_name(curr_name)[0].get_parent()
+        # drop everything outside of the subtree and lock the joints off the chains
+        root_joints = self.get_joints_by_child_name(root_link)
+        root_joint_name = root_joints[0].get_name() if len(root_joints) > 0 else None
+        for joint in list(new_robot.joints):
+            if joint.get_child() not in kept_link_names or joint.get_child() == root_link:
+                new_robot.remove_joint(joint)
+            elif joint.get_child() not in chain_link_names:
+                if joint.jtype == "floating":
+                    raise ValueError("The floating base joint cannot be excluded")
+                joint.lock(joint_values.get(joint.get_name(), 0))
+        for link in list(new_robot.links):
+            if link.get_name() not in kept_link_names:
+                new_robot.remove_link(link)
+        kept_joint_names = set(joint.get_name() for joint in new_robot.joints)
+        for fixed_joint in list(new_robot.fixed_joints):
+            if fixed_joint.get_parent() is None:
+                if root.get_id() != -1:
+                    new_robot.fixed_joints.remove(fixed_joint)
+            elif fixed_joint.get_parent() == root_joint_name:
+                fixed_joint.set_parent(None) # now attached to the base link
+            elif fixed_joint.get_parent() not in kept_joint_names:
+                new_robot.fixed_joints.remove(fixed_joint)
+        new_robot.floating_base = self.floating_base and root.get_id() == -1
+        return URDFParser().reduce(new_robot, root_link)
+
+    def lock_joints(self, joint_values):
+        """
+        Returns a reduced robot with the given joints turned into fixed joints at the
+        given positions. Their links are merged into their parents (inertia and
+        geometry) and their frames are kept as Fixed_Joints, like URDF fixed joints.
+
+        Inputs:
+        - ({str: float}) joint_values - position of each joint to lock by name
+
+        Output:
+        - (Robot) - the reduced robot (with fewer positions / velocities)
+        """
+        from .URDFParser import URDFParser # (URDFParser imports Robot)
+        new_robot = self.clone()
+        for name, value in joint_values.items():
+            joint = new_robot.get_joint_by_name(name)
+            if joint is None:
+                raise ValueError("Unknown joint [" + str(name) + "]")
+            if joint.jtype == "floating":
+                raise ValueError("The floating base joint cannot be locked")
+            joint.lock(value)
+        return URDFParser().reduce(new_robot)
+
+    def make_read_only(self):
+        # lock the shared numpy arrays so in place edits of a shared robot fail loudly
+        for link in self.links:
+            if link.get_spatial_inertia() is not None:
+                link.get_spatial_inertia().setflags(write = False)
+        for joint in self.joints:
+            if getattr(joint, "S", None) is not None:
+                joint.S.setflags(write = False)
+        for fixed_joint in self.fixed_joints:
+            fixed_joint.get_transformation_matrix_hom().setflags(write = False)
+
+    def get_numeric_model(self, dtype = np.float64, backend = None):
+        """
+        Returns the (cached) NumericModel used by the batched kinematics and dynamics.
+        Call clear_numeric_models() after modifying the robot.
+
+        Inputs:
+        - dtype - floating point type of the model's arrays
+        - (str) backend - "numpy", "numba", or "auto" for a separate (cached) model using that backend
+                          (see NumericModel.set_backend), None for the shared NumPy model used by the Robot routines
+
+        Output:
+        - (NumericModel) - the numeric model
+        """
+        key = np.dtype(dtype).str
+        if backend is not None:
+            # a separate model per backend so the shared model keeps the NumPy passes
+            key = (key, backend)
+        if key not in self.numeric_models:
+            model = NumericModel(self, dtype)
+            if backend is not None:
+                model.set_backend(backend)
+            self.numeric_models[key] = model
+        return self.numeric_models[key]
+
+    def get_batch_model(self, *arrays):
+        # the NumericModel in the floating point type of the batched inputs (float32 inputs stay in float32,
+        # lists, scalars, and any other type use float64)
+        dtypes = [array.dtype for array in arrays if isinstance(array, np.ndarray) and np.issubdtype(array.dtype, np.floating)]
+        dtype = np.result_type(*dtypes) if len(dtypes) > 0 else np.float64
+        return self.get_numeric_model(dtype if dtype in (np.float32, np.float64) else np.float64)
+
+    def get_precision_error(self, dtype = np.float32, N = 1024, rng = None):
+        """
+        Measures the error of the batched routines in a lower precision floating point
+        type against float64 on the same random states (positions within the limits,
+        standard normal velocities and accelerations, all representable in dtype).
+
+        Inputs:
+        - dtype - floating point type to evaluate
+        - (int) N - batch size
+        - rng - numpy Generator or seed (optional)
+
+        Output:
+        - {str: dict} - per routine (forward_kinematics_hom, inverse_dynamics, mass_matrix):
+                        max_error and relative_error (max_error over the largest float64 magnitude)
+        """
+        model = self.get_numeric_model(dtype)
+        reference = self.get_numeric_model(np.float64)
+        rng = np.random.default_rng(rng)
+        Q = model.sample_uniform(N, rng)
+        QD = rng.standard_normal((N, model.num_vel)).astype(dtype)
+        QDD = rng.standard_normal((N, model.num_vel)).astype(dtype)
+        errors = {}
+        for name, inputs in (("forward_kinematics_hom", (Q,)), ("inverse_dynamics", (Q, QD, QDD)), ("mass_matrix", (Q,))):
+            expected = getattr(reference, name)(*[array.astype(np.float64) for array in inputs])
+            max_error = float(np.max(np.abs(getattr(model, name)(*inputs) - expected)))
+            errors[name] = {"max_error": max_error, "relative_error": max_error / max(float(np.max(np.abs(expected))), 1e-300)}
+        return errors
+
+    def clear_numeric_models(self):
+        self.numeric_models = {}
 
     def next_none(self, iterable):
         try:
@@ -18,32 +199,158 @@ class Robot:
         except:
             return None
         
+    def get_index_maps(self):
+        """
+        Returns the (cached) state index tables. With a floating base joint 0 owns
+        the first 7 (6 without quaternions) positions and the first 6 velocities.
+
+        Output:
+        - (dict) - read only int arrays
+            q_start, q_stop, v_start, v_stop - (num_joints,) slice bounds of each joint
+            q_joint_ids                      - (num_pos,) joint owning each position
+            v_joint_ids                      - (num_vel,) joint owning each velocity
+        """
+        key = (len(self.joints), self.floating_base, self.using_quaternion)
+        if self.index_maps is None or self.index_maps["key"] != key:
+            num_joints = len(self.joints)
+            q_size = np.ones(num_joints, dtype = int)
+            v_size = np.ones(num_joints, dtype = int)
+            if self.floating_base and num_joints > 0:
+                q_size[0] = 7 if self.using_quaternion else 6
+                v_size[0] = 6
+            maps = {"key": key, \
+                    "q_stop": np.cumsum(q_size), "v_stop": np.cumsum(v_size)}
+            maps["q_start"] = maps["q_stop"] - q_size
+            maps["v_start"] = maps["v_stop"] - v_size
+            maps["q_joint_ids"] = np.repeat(np.arange(num_joints), q_size)
+            maps["v_joint_ids"] = np.repeat(np.arange(num_joints), v_size)
+            for name in ("q_start", "q_stop", "v_start", "v_stop", "q_joint_ids", "v_joint_ids"):
+                maps[name].setflags(write = False)
+            self.index_maps = maps
+        return self.index_maps
+
     def get_joint_index_q(self, joint_id):
-        if self.floating_base:
-            if joint_id == 0:
-                return [0,1,2,3,4,5,6] if self.using_quaternion else [0,1,2,3,4,5]
-            else:
-                return joint_id + (6 if self.using_quaternion else 5)
-        else:
-            return joint_id
+        maps = self.get_index_maps()
+        if self.floating_base and joint_id == 0:
+            return list(range(maps["q_start"][0], maps["q_stop"][0]))
+        return int(maps["q_start"][joint_id])
 
     def get_joint_index_v(self, joint_id):
-        if self.floating_base:
-            if joint_id == 0:
-                return [0,1,2,3,4,5]
-            else:
-                return joint_id + 5
-        else:
-            return joint_id
+        maps = self.get_index_maps()
+        if self.floating_base and joint_id == 0:
+            return list(range(maps["v_start"][0], maps["v_stop"][0]))
+        return int(maps["v_start"][joint_id])
 
     def get_joint_index_f(self, joint_id):
-        if self.floating_base:
-            if joint_id == 0:
-                return [0, 1, 2, 3, 4, 5]
-            else:
-                return joint_id + 5
-        else:
-            return joint_id
+        # forces/torques are aligned with the velocities
+        return self.get_joint_index_v(joint_id)
+
+    def get_joint_slice_q(self, joint_id):
+        maps = self.get_index_maps()
+        return slice(int(maps["q_start"][joint_id]), int(maps["q_stop"][joint_id]))
+
+    def get_joint_slice_v(self, joint_id):
+        maps = self.get_index_maps()
+        return slice(int(maps["v_start"][joint_id]), int(maps["v_stop"][joint_id]))
+
+    def get_joint_slice_f(self, joint_id):
+        return self.get_joint_slice_v(joint_id)
+
+    def get_joint_slices_q(self):
+        return [self.get_joint_slice_q(jid) for jid in range(len(self.joints))]
+
+    def get_joint_slices_v(self):
+        return [self.get_joint_slice_v(jid) for jid in range(len(self.joints))]
+
+    def get_joint_slices_f(self):
+        return self.get_joint_slices_v()
+
+    def get_index_array_q(self, jids = None):
+        """
+        Returns the position (q) indices of the given joints, concatenated in the
+        given order (the floating base joint contributes its whole block).
+
+        Inputs:
+        - jids - list of joint ids (all joints in id order if None)
+
+        Output:
+        - (np.array) - int indices into the position array
+        """
+        maps = self.get_index_maps()
+        if jids is None:
+            return np.arange(maps["q_stop"][-1] if len(self.joints) > 0 else 0)
+        return self.expand_index_ranges(maps["q_start"], maps["q_stop"], jids)
+
+    def get_index_array_v(self, jids = None):
+        # velocity (qd) indices of the given joints (see get_index_array_q)
+        maps = self.get_index_maps()
+        if jids is None:
+            return np.arange(maps["v_stop"][-1] if len(self.joints) > 0 else 0)
+        return self.expand_index_ranges(maps["v_start"], maps["v_stop"], jids)
+
+    def get_index_array_f(self, jids = None):
+        return self.get_index_array_v(jids)
+
+    def expand_index_ranges(self, starts, stops, jids):
+        jids = np.asarray(jids, dtype = int).reshape(-1)
+        sizes = stops[jids] - starts[jids]
+        # start of each joint repeated over its block plus the offset within the block
+        offsets = np.arange(np.sum(sizes)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        return np.repeat(starts[jids], sizes) + offsets
+
+    def gather_q(self, Q, jids = None):
+        """
+        Gathers the positions of the given joints from a batch of position arrays.
+
+        Inputs:
+        - Q - (..., num_pos) positions
+        - jids - list of joint ids (all joints if None)
+
+        Output:
+        - (..., k) array with k the total positions of the joints (in the given joint order)
+        """
+        return np.asarray(Q)[..., self.get_index_array_q(jids)]
+
+    def gather_v(self, V, jids = None):
+        # velocities (or forces) of the given joints from (..., num_vel) arrays
+        return np.asarray(V)[..., self.get_index_array_v(jids)]
+
+    def gather_f(self, F, jids = None):
+        return self.gather_v(F, jids)
+
+    def scatter_q(self, values, jids = None, out = None, normalize_quaternion = False):
+        """
+        Scatters per joint positions into a batch of position arrays.
+
+        Inputs:
+        - values - (..., k) positions of the given joints (as returned by gather_q)
+        - jids - list of joint ids (all joints if None)
+        - out - (..., num_pos) array to write into (zeros, or the identity quaternion for the floating base, if None)
+        - normalize_quaternion - renormalize the floating base quaternion after writing
+
+        Output:
+        - (..., num_pos) array
+        """
+        values = np.asarray(values)
+        if out is None:
+            out = np.zeros(values.shape[:-1] + (self.get_num_pos(),), dtype = np.result_type(values.dtype, float))
+            if self.floating_base and self.using_quaternion:
+                out[..., 4] = 1 # identity rotation (the scalar part is the second quaternion entry, see quat_to_rot_sp)
+        out[..., self.get_index_array_q(jids)] = values
+        if normalize_quaternion and self.floating_base and self.using_quaternion:
+            out[..., 3:7] /= np.linalg.norm(out[..., 3:7], axis = -1, keepdims = True)
+        return out
+
+    def scatter_v(self, values, jids = None, out = None):
+        # scatters per joint velocities (or forces) into (..., num_vel) arrays (see scatter_q)
+        values = np.asarray(values)
+        if out is None:
+            out = np.zeros(values.shape[:-1] + (self.get_num_vel(),), dtype = np.result_type(values.dtype, float))
+        out[..., self.get_index_array_v(jids)] = values
+        return out
+
+    def scatter_f(self, values, jids = None, out = None):
+        return self.scatter_v(values, jids, out)
 
     #################
     #    Setters    #
@@ -159,6 +466,10 @@ class Robot:
     def get_max_bfs_width(self):
         return max([len(self.get_ids_by_bfs_level(level)) for level in range(self.get_max_bfs_level() + 1)])
 
+    def get_traversal_schedule(self):
+        # compiled level synchronous schedule (see TraversalSchedule) used by the batched tree passes
+        return self.get_numeric_model().schedule
+
     def get_is_leaf_node(self, jid):
         return len(self.get_subtree_by_id(jid)) == 1
 
@@ -168,6 +479,216 @@ class Robot:
     def get_total_leaf_nodes(self):
         return len(self.get_leaf_nodes())
 
+    ######################
+    #    Joint Limits    #
+    ######################
+
+    def get_position_limits(self):
+        """
+        Returns the lower and upper position limits aligned with the position (q)
+        array (see get_joint_index_q). Floating base positions are unbounded
+        except for the quaternion entries which are in [-1, 1].
+
+        Output:
+        - (np.array, np.array) - (num_pos,) lower and upper limits
+        """
+        model = self.get_numeric_model()
+        return model.pos_lower, model.pos_upper
+
+    def get_velocity_limits(self):
+        # (num_vel,) velocity limits aligned with the velocity (qd) array (inf if not given)
+        return self.get_numeric_model().vel_limits
+
+    def get_effort_limits(self):
+        # (num_vel,) effort limits aligned with the velocity (qd) array (inf if not given)
+        return self.get_numeric_model().effort_limits
+
+    def within_limits(self, Q, tolerance = 0):
+        return self.get_batch_model(Q).within_limits(Q, tolerance)
+
+    def within_velocity_limits(self, V, tolerance = 0):
+        return self.get_batch_model(V).within_velocity_limits(V, tolerance)
+
+    def clamp(self, Q, out = None):
+        return self.get_batch_model(Q).clamp(Q, out)
+
+    def distance_to_limits(self, Q):
+        return self.get_batch_model(Q).distance_to_limits(Q)
+
+    def sample_uniform(self, N, rng = None):
+        return self.get_numeric_model().sample_uniform(N, rng)
+
+    ##################
+    #    Dynamics    #
+    ##################
+
+    def inverse_dynamics(self, Q, QD, QDD, gravity = 9.81):
+        """
+        Returns the batched inverse dynamics (RNEA, without joint damping).
+
+        Inputs:
+        - Q - (N, num_pos) joint positions
+        - QD, QDD - (N, num_vel) joint velocities and accelerations
+        - (float) gravity - acceleration of gravity (along -z of the base frame)
+
+        Output:
+        - (N, num_vel) joint forces / torques
+        """
+        return self.get_batch_model(Q, QD, QDD).inverse_dynamics(Q, QD, QDD, gravity)
+
+    def get_branch_parallel_executor(self, num_threads = None, dtype = np.float64):
+        """
+        Returns an executor running the batched forward kinematics and inverse
+        dynamics with independent subtrees on a thread pool (see BranchParallelExecutor).
+
+        Inputs:
+        - (int) num_threads - number of threads (one per core if None)
+        - dtype - floating point type of the numeric model
+
+        Output:
+        - (BranchParallelExecutor) - the executor (close() it or use it as a context manager)
+        """
+        return BranchParallelExecutor(self, num_threads, dtype)
+
+    def get_shared_memory_pool(self, num_processes = None, chunk_size = None, dtype = np.float64, backend = None):
+        """
+        Returns a process pool evaluating large batches over all cores with the
+        inputs and outputs in shared memory (see SharedMemoryPool).
+
+        Inputs:
+        - (int) num_processes - number of worker processes (one per core if None)
+        - (int) chunk_size - rows per task (about 4 tasks per process if None)
+        - dtype - floating point type of the numeric model
+        - (str) backend - backend of the workers' numeric model (see get_numeric_model)
+
+        Output:
+        - (SharedMemoryPool) - the pool (close() it or use it as a context manager)
+        """
+        return SharedMemoryPool(self, num_processes, chunk_size, dtype, backend = backend)
+
+    def get_spatial_velocities_accelerations(self, Q, QD, QDD = None, frame = "local", include_fixed_joints = False, classical = False):
+        """
+        Returns the batched spatial velocity and (true, without gravity) acceleration of
+        every link and optionally every fixed joint frame (see NumericModel.spatial_velocities_accelerations).
+
+        Inputs:
+        - Q - (N, num_pos) joint positions
+        - QD, QDD - (N, num_vel) joint velocities and accelerations (QDD None skips the accelerations)
+        - (str) frame - "local", "world", or "world_aligned"
+        - (bool) include_fixed_joints - append the fixed joint frames after the links
+        - (bool) classical - classical linear accelerations (a + w x v) of the frame origins
+
+        Output:
+        - (N, num_links [+ num_fixed_joints], 6) [angular; linear] velocities (the base link first)
+        - (N, num_links [+ num_fixed_joints], 6) accelerations (None if QDD is None)
+        """
+        return self.get_batch_model(Q, QD, QDD).spatial_velocities_accelerations(Q, QD, QDD, frame, include_fixed_joints, classical)
+
+    def get_mass_matrix(self, Q):
+        # (N, num_vel, num_vel) joint space mass matrix (CRBA)
+        return self.get_batch_model(Q).mass_matrix(Q)
+
+    def get_coriolis_matrix(self, Q, QD):
+        # (N, num_vel, num_vel) Coriolis matrix C with C QD the velocity product term of inverse_dynamics
+        return self.get_batch_model(Q, QD).coriolis_matrix(Q, QD)
+
+    def get_mass_matrix_derivative(self, Q, QD):
+        # (N, num_vel, num_vel) time derivative of the mass matrix (C + C^T)
+        return self.get_batch_model(Q, QD).mass_matrix_derivative(Q, QD)
+
+    def get_regressor(self, Q, QD, QDD, gravity = 9.81):
+        # (N, num_vel, num_joints*10) dynamics regressor Y with inverse_dynamics = Y * get_inertial_parameters()
+        return self.get_batch_model(Q, QD, QDD).regressor(Q, QD, QDD, gravity)
+
+    def get_inertial_parameters(self):
+        """
+        Returns the 10 inertial parameters [m, m cx, m cy, m cz, Ixx, Ixy, Ixz, Iyy, Iyz, Izz]
+        (inertia about the link frame origin) of every moving link in link id order
+        (the links merged through fixed joints are included in their parents).
+
+        Output:
+        - (num_joints*10,) array
+        """
+        return self.get_numeric_model().inertial_parameters()
+
+    def set_inertial_parameters(self, params):
+        """
+        Writes (e.g., identified) inertial parameters back into the moving links.
+        Each link's mass, inertia (about its center of mass), origin, and spatial
+        inertia are replaced, and the cached numeric models are cleared.
+
+        Inputs:
+        - params - (num_joints*10,) inertial parameters (see get_inertial_parameters)
+        """
+        params = np.reshape(np.asarray(params, dtype = float), (-1, 10))
+        Imats = self.get_numeric_model().spatial_inertias_from_parameters(params)
+        for link in self.get_links_ordered_by_id()[1:]:
+            link_params = params[link.get_id()]
+            mass = link_params[0]
+            com = link_params[1:4] / mass if mass != 0 else np.zeros(3)
+            # the inertia about the center of mass: I_c = I_o - m cx cx^T
+            cx = np.array([[0, -com[2], com[1]], [com[2], 0, -com[0]], [-com[1], com[0], 0]])
+            inertia = Imats[link.get_id(), :3, :3] - mass*np.matmul(cx, cx.transpose())
+            link.mass = mass
+            link.inertia = InertiaSet(inertia[0,0], inertia[0,1], inertia[0,2], inertia[1,1], inertia[1,2], inertia[2,2])
+            link.set_origin_xyz(com[0], com[1], com[2])
+            link.set_origin_rpy(0, 0, 0)
+            link.set_spatial_inertia(np.array(Imats[link.get_id()], dtype = float))
+        self.clear_numeric_models()
+
+    ####################
+    #    Centroidal    #
+    ####################
+
+    def get_total_mass(self):
+        # total mass of all links (cached with the numeric model)
+        return self.get_numeric_model().total_mass
+
+    def get_center_of_mass(self, Q):
+        """
+        Returns the whole body center of mass for a batch of positions.
+
+        Inputs:
+        - Q - (N, num_pos) or (num_pos,) joint positions
+
+        Output:
+        - (N, 3) array in the world frame
+        """
+        return self.get_batch_model(Q).center_of_mass(Q)
+
+    def get_center_of_mass_jacobian(self, Q):
+        # (N, 3, num_vel) Jacobian of the center of mass
+        return self.get_batch_model(Q).center_of_mass_jacobian(Q)
+
+    def get_centroidal_momentum_matrix(self, Q):
+        # (N, 6, num_vel) centroidal momentum matrix A_G ([angular; linear] momentum about the center of mass = A_G qd)
+        return self.get_batch_model(Q).centroidal_momentum_matrix(Q)
+
+    def get_centroidal_momentum(self, Q, QD):
+        # (N, 6) centroidal momentum [angular; linear]
+        return self.get_batch_model(Q, QD).centroidal_momentum(Q, QD)
+
+    ############################
+    #    Inverse Kinematics    #
+    ############################
+
+    def inverse_kinematics(self, frame_name, targets, Q0 = None, num_restarts = 0, rng = None, **options):
+        """
+        Solves the batched inverse kinematics of a link, joint, or fixed joint frame
+        (see InverseKinematics for the solver options).
+
+        Inputs:
+        - (str) frame_name - the frame to place at the targets
+        - targets - (N, 4, 4) target poses or (N, 3) target positions
+        - Q0 - (N, num_pos) initial positions (optional)
+        - (int) num_restarts - random restarts for targets that did not converge
+        - rng - numpy Generator or seed (optional)
+
+        Output:
+        - (dict) - solutions Q, converged, iterations, restarts, position_error, orientation_error
+        """
+        return InverseKinematics(self, frame_name, **options).solve(targets, Q0, num_restarts, rng)
+
     ###############
     #    Joint    #
     ###############
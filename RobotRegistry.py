@@ -0,0 +1,132 @@
+import os
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from .URDFParser import URDFParser
+
+class RobotRegistry:
+    """
+    Process-local LRU cache of parsed robots.
+
+    Entries are keyed by the URDF's path and modification time (or by a hash of
+    its contents) together with the parse options. Cached robots are shared and
+    read-only; use the copy getters for a cheap copy-on-write clone that can be
+    modified. Cached robots do not keep the parser's update cache (parse_cache),
+    so URDFParser.update on them reparses every element.
+    """
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, max_entries = 32, max_bytes = None, use_content_hash = False):
+        self.max_entries = max_entries      # max number of cached robots
+        self.max_bytes = max_bytes          # max (estimated) total size of cached robots (None = unbounded)
+        self.use_content_hash = use_content_hash # key files by a hash of their contents instead of mtime/size
+        self.entries = OrderedDict()        # key -> (robot, size in bytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls):
+        # process wide registry shared by all callers
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = RobotRegistry()
+            return cls._default
+
+    #################
+    #    Getters    #
+    #################
+
+    def get(self, filename, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
+        """
+        Returns the shared (read-only) robot for a URDF file, parsing it on a miss.
+
+        Inputs:
+        - (str) filename - path to the URDF file
+        - the remaining inputs match URDFParser.parse
+
+        Output:
+        - (Robot) - the shared robot (or None if the URDF could not be parsed)
+        """
+        path = os.path.realpath(filename)
+        try:
+            if self.use_content_hash:
+                with open(path, "rb") as urdf_file:
+                    source_key = ("sha256", hashlib.sha256(urdf_file.read()).hexdigest())
+            else:
+                stat = os.stat(path)
+                source_key = (path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+        key = (source_key, floating_base, using_quaternion, alpha_tie_breaker)
+        return self._get_or_parse(key, lambda parser: parser.parse(path, floating_base, using_quaternion, alpha_tie_breaker))
+
+    def get_from_string(self, urdf_string, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
+        # in-memory URDFs (str or bytes) are always keyed by content hash
+        urdf_bytes = urdf_string.encode() if isinstance(urdf_string, str) else bytes(urdf_string)
+        key = (("sha256", hashlib.sha256(urdf_bytes).hexdigest()), floating_base, using_quaternion, alpha_tie_breaker)
+        return self._get_or_parse(key, lambda parser: parser.parse_bytes(urdf_bytes, floating_base, using_quaternion, alpha_tie_breaker))
+
+    def get_copy(self, filename, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
+        # a copy-on-write clone of the shared robot that the caller is free to modify
+        robot = self.get(filename, floating_base, using_quaternion, alpha_tie_breaker)
+        return None if robot is None else robot.clone()
+
+    def get_copy_from_string(self, urdf_string, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
+        robot = self.get_from_string(urdf_string, floating_base, using_quaternion, alpha_tie_breaker)
+        return None if robot is None else robot.clone()
+
+    def get_stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "total_bytes": self.total_bytes, \
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    ##################
+    #    Updaters    #
+    ##################
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def _get_or_parse(self, key, parse_func):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+        # parse outside of the registry lock so hits on other models are not blocked
+        robot = parse_func(URDFParser())
+        if robot is None:
+            return None
+        # the update cache holds a clone of every link and joint from before the fixed joint removal
+        robot.parse_cache = None
+        robot.make_read_only()
+        size = self._estimate_size(robot)
+        with self.lock:
+            if key in self.entries: # another thread parsed the same model first
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+            self.entries[key] = (robot, size)
+            self.total_bytes += size
+            self._evict()
+        return robot
+
+    def _evict(self):
+        # drop least recently used entries (always keeping the newest one)
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or \
+                (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            _, (_, size) = self.entries.popitem(last = False)
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def _estimate_size(self, robot):
+        # the pickled size is a good proxy for the memory held by the sympy/numpy objects
+        # (parsed robots always pickle, so a failure is a bug rather than a free entry)
+        return len(pickle.dumps(robot, pickle.HIGHEST_PROTOCOL))
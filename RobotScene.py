@@ -0,0 +1,107 @@
+import numpy as np
+from .NumericModel import NumericModel
+
+class RobotScene:
+    """
+    Several different robots (e.g., the arms, mobile bases, and grippers of a fleet)
+    evaluated together. The robots' NumericModels are packed into one padded
+    structure of arrays (see NumericModel.from_models) so a single batched call runs
+    every robot and configuration, with the joints of the same kind (type and axis)
+    of all robots transformed at once. With J, P, and V the largest number of joints,
+    positions, and velocities over the robots, states and results are laid out as:
+    - positions      - (N, num_robots, P)        (robot r uses [:, r, :num_pos_r])
+    - velocities     - (N, num_robots, V)        (robot r uses [:, r, :num_vel_r])
+    - per joint data - (N, num_robots, J, ...)   (robot r uses [:, r, :num_joints_r])
+    Unused (padding) entries are ignored on input and zero on output, and the per
+    robot results are returned as views of the padded arrays.
+    """
+
+    def __init__(self, robots, dtype = np.float64):
+        self.robots = list(robots)
+        self.models = [robot.get_numeric_model(dtype) for robot in self.robots]
+        self.model = NumericModel.from_models(self.models)
+        self.num_robots = len(self.robots)
+        self.max_joints = max(model.num_joints for model in self.models)
+        self.max_pos = max(model.num_pos for model in self.models)
+        self.max_vel = max(model.num_vel for model in self.models)
+
+    def get_num_robots(self):
+        return self.num_robots
+
+    def get_robots(self):
+        return self.robots
+
+    def get_model(self):
+        # the packed NumericModel (joint slot r*J + jid is joint jid of robot r)
+        return self.model
+
+    def get_padded_sizes(self):
+        # (J, P, V) largest number of joints, positions, and velocities
+        return self.max_joints, self.max_pos, self.max_vel
+
+    def pack(self, arrays, width, sizes):
+        # per robot (N, size_r) or (size_r,) arrays -> (N, num_robots, width) zero padded array
+        arrays = [np.reshape(np.asarray(array, dtype = self.model.dtype), (-1, size)) for array, size in zip(arrays, sizes)]
+        N = max(array.shape[0] for array in arrays)
+        packed = np.zeros((N, self.num_robots, width), dtype = self.model.dtype)
+        for r, array in enumerate(arrays):
+            packed[:, r, :sizes[r]] = array
+        return packed
+
+    def pack_positions(self, Qs):
+        # [(N, num_pos_r) or (num_pos_r,)] per robot positions -> (N, num_robots, P)
+        return self.pack(Qs, self.max_pos, [model.num_pos for model in self.models])
+
+    def pack_velocities(self, QDs):
+        # [(N, num_vel_r) or (num_vel_r,)] per robot velocities (or accelerations) -> (N, num_robots, V)
+        return self.pack(QDs, self.max_vel, [model.num_vel for model in self.models])
+
+    def as_packed(self, Q, width, sizes):
+        # a list of per robot arrays or a (N, num_robots, width) / (num_robots, width) packed array -> (N, num_robots*width)
+        if isinstance(Q, (list, tuple)):
+            Q = self.pack(Q, width, sizes)
+        Q = np.asarray(Q, dtype = self.model.dtype)
+        return np.reshape(Q, (-1, self.num_robots*width))
+
+    def split(self, packed, sizes):
+        # [(N, size_r, ...)] views of a (N, num_robots, padded size, ...) array
+        return [packed[:, r, :size] for r, size in enumerate(sizes)]
+
+    def sample_uniform(self, N, rng = None):
+        # (N, num_robots, P) positions sampled within each robot's limits (see NumericModel.sample_uniform)
+        return self.model.sample_uniform(N, rng).reshape(N, self.num_robots, self.max_pos)
+
+    def forward_kinematics_hom(self, Q, padded = False):
+        """
+        Returns the world pose of every link of every robot.
+
+        Inputs:
+        - Q - [(N, num_pos_r)] per robot positions or (N, num_robots, P) packed positions
+        - (bool) padded - return the padded array instead of the per robot views
+
+        Output:
+        - [(N, num_joints_r, 4, 4)] views per robot (or the (N, num_robots, J, 4, 4) array)
+        """
+        Q = self.as_packed(Q, self.max_pos, [model.num_pos for model in self.models])
+        T = self.model.forward_kinematics_hom(Q).reshape(Q.shape[0], self.num_robots, self.max_joints, 4, 4)
+        return T if padded else self.split(T, [model.num_joints for model in self.models])
+
+    def inverse_dynamics(self, Q, QD, QDD, gravity = 9.81, padded = False):
+        """
+        Returns the joint forces / torques (RNEA, without joint damping) of every robot.
+
+        Inputs:
+        - Q - [(N, num_pos_r)] per robot positions or (N, num_robots, P) packed positions
+        - QD, QDD - [(N, num_vel_r)] per robot or (N, num_robots, V) packed velocities and accelerations
+        - (float) gravity - acceleration of gravity (along -z of each robot's base frame)
+        - (bool) padded - return the padded array instead of the per robot views
+
+        Output:
+        - [(N, num_vel_r)] views per robot (or the (N, num_robots, V) array)
+        """
+        sizes = [model.num_vel for model in self.models]
+        Q = self.as_packed(Q, self.max_pos, [model.num_pos for model in self.models])
+        QD = self.as_packed(QD, self.max_vel, sizes)
+        QDD = self.as_packed(QDD, self.max_vel, sizes)
+        tau = self.model.inverse_dynamics(Q, QD, QDD, gravity).reshape(-1, self.num_robots, self.max_vel)
+        return tau if padded else self.split(tau, sizes)
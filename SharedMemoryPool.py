@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+# per worker process state (set once by the pool initializer)
+_worker_model = None
+_worker_buffers = {}
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+    _worker_buffers.clear()
+
+def _attach(specs):
+    # views of the (name, shape, dtype) shared memory buffers (closing buffers the pool has replaced)
+    names = set(name for name, _, _ in specs)
+    for name in list(_worker_buffers.keys()):
+        if name not in names:
+            _worker_buffers.pop(name).close()
+    views = []
+    for name, shape, dtype in specs:
+        if name not in _worker_buffers:
+            _worker_buffers[name] = shared_memory.SharedMemory(name = name)
+        views.append(np.ndarray(shape, dtype = dtype, buffer = _worker_buffers[name].buf))
+    return views
+
+def _numba_threads_started():
+    # numba's parallel threading layer (tbb, omp, or workqueue) is started by the first prange kernel
+    # of the process (of any model or backend) and forked children inherit it in a locked state
+    parallel = sys.modules.get("numba.np.ufunc.parallel")
+    return parallel is not None and bool(getattr(parallel, "_is_initialized", False))
+
+def _run_chunk(function_name, input_specs, output_spec, kwargs, start, stop):
+    # evaluates rows [start, stop) of the inputs into the output buffer
+    views = _attach(input_specs + [output_spec])
+    inputs = [view[start:stop] for view in views[:-1]]
+    views[-1][start:stop] = getattr(_worker_model, function_name)(*inputs, **kwargs)
+    return stop - start
+
+class SharedMemoryPool:
+    """
+    Evaluates very large batches of the NumericModel routines over all cores.
+    Every worker process receives the model once (when the pool starts) and the
+    input and output batches are exchanged through multiprocessing.shared_memory
+    buffers, so a task only sends the buffer names and its row range. Buffers are
+    kept between calls and grown as needed.
+
+    Any NumericModel method taking (N, k) batches and returning an (N, ...) array
+    can be evaluated with map (e.g., forward_kinematics_hom, inverse_dynamics,
+    center_of_mass, centroidal_momentum, regressor). Workers are started on the
+    first map, with spawn instead of the platform default if the pool's model
+    uses the numba backend or numba's threads already run in this process
+    (unless mp_context is given).
+    """
+
+    def __init__(self, robot, num_processes = None, chunk_size = None, dtype = np.float64, mp_context = None, backend = None):
+        self.model = robot.get_numeric_model(dtype, backend)
+        self.num_processes = max(1, int(num_processes or os.cpu_count() or 1))
+        self.mp_context = mp_context
+        self.chunk_size = chunk_size
+        self.buffers = {} # slot name -> SharedMemory
+        self.pool = None # started on the first map (see get_pool)
+
+    def get_pool(self):
+        # the worker processes (started after the first row probe of map has run in this process)
+        if self.pool is None:
+            mp_context = self.mp_context
+            if mp_context is None and (self.model.kernels is not None or _numba_threads_started()):
+                # forked workers would inherit numba's started thread pool in a locked state and
+                # hang the interpreter at exit, so start fresh worker processes instead
+                mp_context = multiprocessing.get_context("spawn")
+            self.pool = ProcessPoolExecutor(max_workers = self.num_processes, mp_context = mp_context, \
+                                            initializer = _init_worker, initargs = (self.model,))
+        return self.pool
+
+    def get_chunk_size(self, N):
+        # rows per task (about 4 tasks per process if not set, for load balancing)
+        if self.chunk_size is not None:
+            return int(self.chunk_size)
+        return max(64, -(-N // (4*self.num_processes)))
+
+    def get_buffer(self, slot, shape, dtype):
+        # an array view of the shared memory buffer of a slot (replaced if too small)
+        num_bytes = max(1, int(np.prod(shape, dtype = int)) * np.dtype(dtype).itemsize)
+        buffer = self.buffers.get(slot)
+        if buffer is None or buffer.size < num_bytes:
+            if buffer is not None:
+                buffer.close()
+                buffer.unlink()
+            buffer = shared_memory.SharedMemory(create = True, size = num_bytes)
+            self.buffers[slot] = buffer
+        return np.ndarray(shape, dtype = dtype, buffer = buffer.buf), (buffer.name, tuple(shape), np.dtype(dtype).str)
+
+    def map(self, function_name, *arrays, **kwargs):
+        """
+        Evaluates a NumericModel method over a batch split into chunks across the worker processes.
+
+        Inputs:
+        - (str) function_name - the NumericModel method (e.g., "inverse_dynamics")
+        - arrays - (N, k) or (k,) batched inputs (rows are split into chunks, (k,) inputs are broadcast)
+        - kwargs - other (non batched) arguments of the method
+
+        Output:
+        - (N, ...) array - the same as getattr(model, function_name)(*arrays, **kwargs)
+        """
+        model = self.model
+        arrays = [np.asarray(array, dtype = model.dtype) for array in arrays]
+        N = max([array.shape[0] if array.ndim > 1 else 1 for array in arrays])
+        arrays = [np.broadcast_to(np.reshape(array, (-1, array.shape[-1])), (N, array.shape[-1])) for array in arrays]
+        # output shape and type from the first row
+        first = getattr(model, function_name)(*[array[:1] for array in arrays], **kwargs)
+        if N <= 1:
+            return first
+        input_specs = []
+        for ind, array in enumerate(arrays):
+            view, spec = self.get_buffer("input" + str(ind), array.shape, model.dtype)
+            view[...] = array
+            input_specs.append(spec)
+        output, output_spec = self.get_buffer("output", (N,) + first.shape[1:], first.dtype)
+        chunk_size = self.get_chunk_size(N)
+        pool = self.get_pool()
+        futures = [pool.submit(_run_chunk, function_name, input_specs, output_spec, kwargs, start, min(start + chunk_size, N)) \
+                   for start in range(0, N, chunk_size)]
+        for future in futures:
+            future.result()
+        return np.array(output)
+
+    def forward_kinematics_hom(self, Q, include_fixed_joints = False):
+        # (N, num_joints [+ num_fixed_joints], 4, 4) world poses (see NumericModel.forward_kinematics_hom)
+        return self.map("forward_kinematics_hom", Q, include_fixed_joints = include_fixed_joints)
+
+    def inverse_dynamics(self, Q, QD, QDD, gravity = 9.81):
+        # (N, num_vel) RNEA joint forces / torques (see NumericModel.inverse_dynamics)
+        return self.map("inverse_dynamics", Q, QD, QDD, gravity = gravity)
+
+    def center_of_mass(self, Q):
+        # (N, 3) center of mass in the world frame
+        return self.map("center_of_mass", Q)
+
+    def centroidal_momentum(self, Q, QD):
+        # (N, 6) centroidal momentum
+        return self.map("centroidal_momentum", Q, QD)
+
+    def regressor(self, Q, QD, QDD, gravity = 9.81):
+        # (N, num_vel, num_joints*10) dynamics regressor
+        return self.map("regressor", Q, QD, QDD, gravity = gravity)
+
+    def close(self):
+        # stop the worker processes and free the shared memory buffers
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        for buffer in self.buffers.values():
+            buffer.close()
+            buffer.unlink()
+        self.buffers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def benchmark_scaling(robot, function_name = "inverse_dynamics", N = 65536, process_counts = None, repeats = 3, \
+                          dtype = np.float64, rng = None):
+        """
+        Measures the throughput of a NumericModel method for several process counts
+        against single process execution (the best of repeats runs on random states
+        within the limits, after a warm up run that starts the workers).
+
+        Inputs:
+        - (Robot) robot - the robot
+        - (str) function_name - "forward_kinematics_hom", "inverse_dynamics", "center_of_mass", "centroidal_momentum", or "regressor"
+        - (int) N - batch size
+        - process_counts - [int] process counts (powers of two up to the number of cores if None)
+        - (int) repeats - timed runs per process count
+        - dtype - floating point type
+        - rng - numpy Generator or seed (optional)
+
+        Output:
+        - [dict] - per process count: num_processes, seconds, samples_per_second,
+                   speedup (over single process execution), and max_error
+        """
+        model = robot.get_numeric_model(dtype)
+        if process_counts is None:
+            num_cores = os.cpu_count() or 1
+            process_counts = sorted(set([2**power for power in range(num_cores.bit_length()) if 2**power <= num_cores] + [num_cores]))
+        rng = np.random.default_rng(rng)
+        Q = model.sample_uniform(N, rng)
+        QD = rng.standard_normal((N, model.num_vel)).astype(dtype)
+        QDD = rng.standard_normal((N, model.num_vel)).astype(dtype)
+        inputs = {"forward_kinematics_hom": (Q,), "center_of_mass": (Q,), "centroidal_momentum": (Q, QD), \
+                  "inverse_dynamics": (Q, QD, QDD), "regressor": (Q, QD, QDD)}[function_name]
+        def best_time(function):
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                function()
+                times.append(time.perf_counter() - start)
+            return min(times)
+        serial_seconds = best_time(lambda: getattr(model, function_name)(*inputs))
+        expected = getattr(model, function_name)(*inputs)
+        results = [{"num_processes": 0, "seconds": serial_seconds, "samples_per_second": N / serial_seconds, \
+                    "speedup": 1.0, "max_error": 0.0}] # single process execution (no pool)
+        for num_processes in process_counts:
+            with SharedMemoryPool(robot, num_processes, dtype = dtype) as pool:
+                output = pool.map(function_name, *inputs) # warm up (starts the workers)
+                seconds = best_time(lambda: pool.map(function_name, *inputs))
+                results.append({"num_processes": num_processes, "seconds": seconds, "samples_per_second": N / seconds, \
+                                "speedup": serial_seconds / seconds, "max_error": float(np.max(np.abs(output - expected), initial = 0))})
+        return results
@@ -1,8 +1,12 @@
-import sympy as sp
 import numpy as np
 import copy
+from .LazyModule import LazyModule
+
+sp = LazyModule("sympy") # only imported on first symbolic use
 
 class Translation:
+    __slots__ = ("x", "y", "z", "rx", "Xmat_sp_fixed")
+
     def __init__(self, x, y = None, z = None):
         if y == None: # passed in as tuple
             self.y = x[1]
@@ -30,6 +34,8 @@ class Translation:
             return sp.Matrix([[1,0,0,x],[0,1,0,y],[0,0,1,z],[0,0,0,1]])
 
 class Rotation:
+    __slots__ = ("r", "p", "y", "E", "Xmat_sp_fixed")
+
     def __init__(self, r, p = None, y = None):
         if p == None: # passed in as tuple
             self.p = r[1]
@@ -64,6 +70,16 @@ class Rotation:
         E = sp.Matrix([[c, s, 0], [-s, c, 0], [0, 0, 1]])
         return E
 
+    def raxis(self, x, y, z, theta):
+        # rotation about a unit axis (x, y, z) in the same convention as rx, ry, and rz
+        c = sp.cos(theta)
+        s = sp.sin(theta)
+        d = 1 - c
+        E = sp.Matrix([[c + d*x*x, d*x*y + s*z, d*x*z - s*y], \
+                       [d*x*y - s*z, c + d*y*y, d*y*z + s*x], \
+                       [d*x*z + s*y, d*y*z - s*x, c + d*z*z]])
+        return E
+
     def rot(self, E):
         z = sp.zeros(3, 3)
         col1 = sp.Matrix.vstack(E, z)
@@ -75,11 +91,14 @@ class Rotation:
         return sp.Matrix.hstack(left,sp.Matrix([[0],[0],[0],[1]]))
 
 class Origin:
+    __slots__ = ("translation", "rotation", "Xmat_sp_fixed", "Xmat_sp_hom_fixed", "Xmat_sp_hom_fixed_inv")
+
     def __init__(self):
         self.translation = None
         self.rotation = None
         self.Xmat_sp_fixed = None
         self.Xmat_sp_hom_fixed = None
+        self.Xmat_sp_hom_fixed_inv = None
 
     def set_translation(self, x, y = None, z = None):
         self.translation = Translation(x,y,z)
@@ -87,10 +106,27 @@ class Origin:
     def set_rotation(self, r, p = None, y = None):
         self.rotation = Rotation(r,p,y)
 
+    def release_symbolic(self):
+        # drop the derived sympy matrices once they have been consumed (only x,y,z and r,p,y are kept)
+        self.Xmat_sp_fixed = None
+        self.Xmat_sp_hom_fixed = None
+        self.Xmat_sp_hom_fixed_inv = None
+        if self.translation is not None:
+            self.translation.rx = None
+            self.translation.Xmat_sp_fixed = None
+        if self.rotation is not None:
+            self.rotation.E = None
+            self.rotation.Xmat_sp_fixed = None
+
     def build_fixed_transform(self):
         if self.translation is None or self.rotation is None:
             print("[!Error] First set the origin translation and rotation!")
         else:
+            # rebuild the translation and rotation if they were released
+            if self.translation.Xmat_sp_fixed is None:
+                self.set_translation(self.translation.x, self.translation.y, self.translation.z)
+            if self.rotation.Xmat_sp_fixed is None:
+                self.set_rotation(self.rotation.r, self.rotation.p, self.rotation.y)
             self.Xmat_sp_fixed =  self.rotation.Xmat_sp_fixed * self.translation.Xmat_sp_fixed
             # now build the homogenous [R | xyz
             #                           0 | 1 ]
@@ -172,3 +208,82 @@ class Quaternion_Tools:
     def rpy_to_quat(self, r, p, y):
         pass
 
+
+
+class Transform_Tools:
+    # numpy (batched) helpers, all functions accept arrays with arbitrary leading batch dimensions
+    def __init__(self):
+        pass
+
+    def rpy_to_rot(self, r, p, y):
+        # standard URDF fixed axis roll-pitch-yaw: R = Rz(y) Ry(p) Rx(r)
+        cr, sr = np.cos(r), np.sin(r)
+        cp, sp_ = np.cos(p), np.sin(p)
+        cy, sy = np.cos(y), np.sin(y)
+        return np.array([[cy*cp, cy*sp_*sr - sy*cr, cy*sp_*cr + sy*sr],
+                         [sy*cp, sy*sp_*sr + cy*cr, sy*sp_*cr - cy*sr],
+                         [-sp_,  cp*sr,             cp*cr]])
+
+    def xyz_rpy_to_hom(self, xyz, rpy):
+        hom = np.eye(4)
+        hom[:3,:3] = self.rpy_to_rot(*rpy)
+        hom[:3,3] = xyz
+        return hom
+
+    def axis_angle_to_rot(self, axis, angle):
+        # Rodrigues' formula R = I + sin(a) K + (1 - cos(a)) K^2 for (..., ) angles about a unit axis
+        K = self.skew(axis)
+        s = np.sin(angle)[..., None, None]
+        c = np.cos(angle)[..., None, None]
+        return np.eye(3, dtype = K.dtype) + s*K + (1 - c)*(K @ K)
+
+    def skew(self, v):
+        v = np.asarray(v)
+        out = np.zeros(v.shape[:-1] + (3, 3), dtype = v.dtype)
+        out[..., 0, 1] = -v[..., 2]
+        out[..., 0, 2] = v[..., 1]
+        out[..., 1, 0] = v[..., 2]
+        out[..., 1, 2] = -v[..., 0]
+        out[..., 2, 0] = -v[..., 1]
+        out[..., 2, 1] = v[..., 0]
+        return out
+
+    def spatial_to_hom(self, X):
+        # ^BX_A = [E 0; -E rx E] -> pose of B in A [E^T r; 0 1]
+        X = np.asarray(X)
+        E = X[..., :3, :3]
+        rx = -np.swapaxes(E, -1, -2) @ X[..., 3:, :3]
+        hom = np.zeros(X.shape[:-2] + (4, 4), dtype = X.dtype)
+        hom[..., :3, :3] = np.swapaxes(E, -1, -2)
+        hom[..., 0, 3] = rx[..., 2, 1]
+        hom[..., 1, 3] = rx[..., 0, 2]
+        hom[..., 2, 3] = rx[..., 1, 0]
+        hom[..., 3, 3] = 1
+        return hom
+
+    def hom_to_spatial(self, hom):
+        # pose of B in A [R r; 0 1] -> ^BX_A = [R^T 0; -R^T rx R^T]
+        hom = np.asarray(hom)
+        E = np.swapaxes(hom[..., :3, :3], -1, -2)
+        X = np.zeros(hom.shape[:-2] + (6, 6), dtype = hom.dtype)
+        X[..., :3, :3] = E
+        X[..., 3:, 3:] = E
+        X[..., 3:, :3] = -E @ self.skew(hom[..., :3, 3])
+        return X
+
+    def quat_to_rot_batched(self, quat):
+        # batched numpy version of Quaternion_Tools.quat_to_rot_sp (same ordering and formula)
+        # (..., 4) quaternions -> (..., 3, 3) E matrices
+        quat = quat / np.linalg.norm(quat, axis = -1, keepdims = True)
+        q3, q0, q1, q2 = quat[..., 0], quat[..., 1], quat[..., 2], quat[..., 3]
+        E = np.empty(quat.shape[:-1] + (3, 3), dtype = quat.dtype)
+        E[..., 0, 0] = 2*(q0*q0 + q1*q1) - 1
+        E[..., 0, 1] = 2*(q1*q2 + q0*q3)
+        E[..., 0, 2] = 2*(q1*q3 - q0*q2)
+        E[..., 1, 0] = 2*(q1*q2 - q0*q3)
+        E[..., 1, 1] = 2*(q0*q0 + q2*q2) - 1
+        E[..., 1, 2] = 2*(q2*q3 + q0*q1)
+        E[..., 2, 0] = 2*(q1*q3 + q0*q2)
+        E[..., 2, 1] = 2*(q2*q3 - q0*q1)
+        E[..., 2, 2] = 2*(q0*q0 + q3*q3) - 1
+        return E
@@ -0,0 +1,252 @@
+import os
+import zipfile
+import itertools
+import numpy as np
+
+class TrajectoryReader:
+    """
+    Reads a trajectory chunk by chunk with bounded memory. Sources can be:
+    - a .npy file of (T, k) rows (memory mapped)
+    - a .npz file of (T, k) arrays (each member is streamed, compressed or not)
+    - a .csv file of (T, k) rows (an optional header of k column names on the first line is
+      checked against the start of column_names, if given, and skipped)
+    - a dict of (T, k) arrays (e.g., np.memmaps)
+
+    All arrays of a source must have the same number of rows (T).
+
+    Every chunk is a dict of arrays of at most chunk_size rows. Single array
+    sources (.npy and .csv) are returned under the key "data".
+    """
+
+    def __init__(self, source, chunk_size = 65536, delimiter = ",", column_names = None):
+        self.source = source
+        self.chunk_size = int(chunk_size)
+        self.delimiter = delimiter
+        self.column_names = column_names
+
+    def __iter__(self):
+        if isinstance(self.source, dict):
+            self.check_num_samples({key: len(array) for key, array in self.source.items()})
+            return self.iter_arrays(self.source)
+        extension = os.path.splitext(str(self.source))[1].lower()
+        if extension == ".npy":
+            return self.iter_arrays({"data": np.load(self.source, mmap_mode = "r")})
+        if extension == ".npz":
+            return self.iter_npz()
+        if extension == ".csv":
+            return self.iter_csv()
+        raise ValueError("Unsupported trajectory source [" + str(self.source) + "]")
+
+    def get_num_samples(self):
+        # number of rows (a pass over the file for csv sources)
+        if isinstance(self.source, dict):
+            return self.check_num_samples({key: len(array) for key, array in self.source.items()})
+        extension = os.path.splitext(str(self.source))[1].lower()
+        if extension == ".npy":
+            return np.load(self.source, mmap_mode = "r").shape[0]
+        if extension == ".npz":
+            with zipfile.ZipFile(self.source) as archive:
+                names, members, headers = self.open_npz_members(archive)
+                for member in members:
+                    member.close()
+                return headers[0][0][0]
+        return sum(1 for _ in self.iter_csv_lines())
+
+    def check_num_samples(self, num_samples):
+        # the common number of rows of {key: rows} (raises if the arrays differ or there are none)
+        if len(num_samples) == 0:
+            raise ValueError("Trajectory source [" + str(self.source) + "] has no arrays")
+        if len(set(num_samples.values())) > 1:
+            raise ValueError("Trajectory arrays of [" + str(self.source) + "] have different numbers of rows " + str(num_samples))
+        return next(iter(num_samples.values()))
+
+    def iter_arrays(self, arrays):
+        num_samples = len(next(iter(arrays.values())))
+        for start in range(0, num_samples, self.chunk_size):
+            # np.array copies only this chunk out of memory mapped arrays
+            yield {key: np.array(array[start:start + self.chunk_size]) for key, array in arrays.items()}
+
+    def read_npy_header(self, member):
+        version = np.lib.format.read_magic(member)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(member)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(member)
+        if fortran_order and len(shape) > 1:
+            raise ValueError("Fortran ordered arrays cannot be streamed")
+        return shape, dtype
+
+    def open_npz_members(self, archive):
+        # the .npy members of the archive opened after their headers (and row counts) are checked
+        names = [name for name in archive.namelist() if name.endswith(".npy")]
+        members = [archive.open(name) for name in names]
+        try:
+            headers = [self.read_npy_header(member) for member in members]
+            self.check_num_samples({name[:-4]: shape[0] if len(shape) > 0 else 0 for name, (shape, _) in zip(names, headers)})
+        except:
+            for member in members:
+                member.close()
+            raise
+        return names, members, headers
+
+    def iter_npz(self):
+        with zipfile.ZipFile(self.source) as archive:
+            names, members, headers = self.open_npz_members(archive)
+            try:
+                num_samples = headers[0][0][0]
+                for start in range(0, num_samples, self.chunk_size):
+                    rows = min(self.chunk_size, num_samples - start)
+                    chunk = {}
+                    for name, member, (shape, dtype) in zip(names, members, headers):
+                        row_shape = tuple(shape[1:])
+                        num_bytes = rows * int(np.prod(row_shape, dtype = int)) * dtype.itemsize
+                        chunk[name[:-4]] = np.frombuffer(member.read(num_bytes), dtype = dtype).reshape((rows,) + row_shape)
+                    yield chunk
+            finally:
+                for member in members:
+                    member.close()
+
+    def iter_csv_lines(self):
+        with open(self.source) as csv_file:
+            first = True
+            header = None
+            for line_number, line in enumerate(csv_file, 1):
+                if line.strip() == "":
+                    continue
+                fields = [field.strip() for field in line.split(self.delimiter)]
+                try:
+                    float(fields[0])
+                except ValueError:
+                    # only the first line can be a header
+                    if first:
+                        first = False
+                        header = self.check_header(fields)
+                        continue
+                    raise ValueError("Malformed row at line " + str(line_number) + " of [" + str(self.source) + "]: " + line.strip())
+                # the first row must have a column for every header name
+                if header is not None and len(fields) != len(header):
+                    raise ValueError("The header of [" + str(self.source) + "] names " + str(len(header)) + \
+                                     " columns but the rows have " + str(len(fields)))
+                first = False
+                header = None
+                yield line
+
+    def check_header(self, fields):
+        # a header names every column (matching the start of column_names if given)
+        if self.column_names is not None and fields != list(self.column_names[:len(fields)]):
+            raise ValueError("Unexpected header " + str(fields) + " of [" + str(self.source) + "], expected the columns " + \
+                             str(list(self.column_names)) + " (or the first of them)")
+        return fields
+
+    def iter_csv(self):
+        lines = self.iter_csv_lines()
+        while True:
+            chunk_lines = list(itertools.islice(lines, self.chunk_size))
+            if len(chunk_lines) == 0:
+                return
+            yield {"data": np.loadtxt(chunk_lines, delimiter = self.delimiter, ndmin = 2)}
+
+class TrajectoryPipeline:
+    """
+    Evaluates kinematics and dynamics quantities over a trajectory chunk by chunk
+    (see TrajectoryReader for the sources), so memory is bounded by the chunk size.
+
+    Single array sources are split into columns [q, qd, qdd] (qd and qdd are
+    optional). Dict / npz sources use the keys "q", "qd", and "qdd".
+
+    Quantities are names from TrajectoryPipeline.QUANTITIES or (name, function)
+    pairs where function(model, chunk) returns an (n, ...) array for the chunk.
+    """
+    QUANTITIES = {
+        "poses":    lambda model, chunk: model.forward_kinematics_hom(chunk["q"], include_fixed_joints = True),
+        "com":      lambda model, chunk: model.center_of_mass(chunk["q"]),
+        "momentum": lambda model, chunk: model.centroidal_momentum(chunk["q"], chunk["qd"]),
+        "torques":  lambda model, chunk: model.inverse_dynamics(chunk["q"], chunk["qd"], chunk["qdd"]),
+        "within_limits": lambda model, chunk: model.within_limits(chunk["q"]),
+    }
+    # the trajectory keys each built in quantity needs (custom quantities need at least "q")
+    REQUIRED_KEYS = {"poses": ("q",), "com": ("q",), "momentum": ("q", "qd"), "torques": ("q", "qd", "qdd"), "within_limits": ("q",)}
+
+    def __init__(self, robot, quantities = ("poses", "torques"), chunk_size = 65536, dtype = np.float64):
+        self.model = robot.get_numeric_model(dtype)
+        self.chunk_size = int(chunk_size)
+        self.quantities = [(quantity, TrajectoryPipeline.QUANTITIES[quantity]) if isinstance(quantity, str) else quantity \
+                           for quantity in quantities]
+        self.column_names = self.get_column_names()
+        self.required_keys = ["q"]
+        for quantity in quantities:
+            if isinstance(quantity, str):
+                self.required_keys += [key for key in TrajectoryPipeline.REQUIRED_KEYS[quantity] if key not in self.required_keys]
+
+    def get_column_names(self):
+        # csv header names of the [q, qd, qdd] columns of single array sources (q0, q1, ..., qd0, ..., qdd0, ...)
+        return ["q" + str(ind) for ind in range(self.model.num_pos)] + \
+               [prefix + str(ind) for prefix in ("qd", "qdd") for ind in range(self.model.num_vel)]
+
+    def split_chunk(self, chunk):
+        # single array chunks are split into [q, qd, qdd] columns (raises if the quantities need missing keys)
+        num_pos = self.model.num_pos
+        num_vel = self.model.num_vel
+        if "data" in chunk:
+            data = chunk["data"]
+            widths = (num_pos, num_pos + num_vel, num_pos + 2*num_vel)
+            if data.ndim != 2 or data.shape[1] not in widths:
+                raise ValueError("Trajectory rows have " + str(data.shape[1:]) + " columns, expected " + \
+                                 " or ".join(str(width) for width in widths) + " ([q], [q, qd], or [q, qd, qdd])")
+            chunk = {"q": data[:, :num_pos]}
+            if data.shape[1] >= widths[1]:
+                chunk["qd"] = data[:, num_pos:widths[1]]
+            if data.shape[1] >= widths[2]:
+                chunk["qdd"] = data[:, widths[1]:widths[2]]
+        missing = [key for key in self.required_keys if key not in chunk]
+        if len(missing) > 0:
+            raise ValueError("Trajectory is missing " + ", ".join(missing) + " needed by the quantities " + \
+                             str([name for name, _ in self.quantities]))
+        return chunk
+
+    def run(self, source):
+        """
+        Evaluates every quantity chunk by chunk.
+
+        Inputs:
+        - source - a trajectory source or TrajectoryReader
+
+        Output:
+        - generator of (int, dict) - the first sample index of the chunk and {name: (n, ...) array}
+        """
+        reader = source if isinstance(source, TrajectoryReader) else \
+                 TrajectoryReader(source, self.chunk_size, column_names = self.column_names)
+        start = 0
+        for chunk in reader:
+            chunk = self.split_chunk(chunk)
+            results = {name: function(self.model, chunk) for name, function in self.quantities}
+            yield start, results
+            start += len(chunk["q"])
+
+    def write(self, source, output_dir):
+        """
+        Evaluates every quantity and writes each one incrementally to
+        output_dir/<name>.npy (memory mapped, so only a chunk is held at a time).
+
+        Inputs:
+        - source - a trajectory source or TrajectoryReader
+        - (str) output_dir - the output directory
+
+        Output:
+        - {str: str} - the path written for each quantity (none for an empty trajectory)
+        """
+        reader = source if isinstance(source, TrajectoryReader) else \
+                 TrajectoryReader(source, self.chunk_size, column_names = self.column_names)
+        num_samples = reader.get_num_samples()
+        os.makedirs(output_dir, exist_ok = True)
+        paths = {name: os.path.join(output_dir, name + ".npy") for name, _ in self.quantities}
+        outputs = {}
+        for start, results in self.run(reader):
+            for name, values in results.items():
+                if name not in outputs:
+                    outputs[name] = np.lib.format.open_memmap(paths[name], mode = "w+", dtype = values.dtype, \
+                                                              shape = (num_samples,) + values.shape[1:])
+                outputs[name][start:start + len(values)] = values
+                outputs[name].flush()
+        # nothing is written for an empty trajectory (the output shapes are only known from a chunk)
+        return {name: paths[name] for name in outputs}
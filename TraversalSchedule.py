@@ -0,0 +1,124 @@
+import numpy as np
+
+class TraversalSchedule:
+    """
+    A compiled level synchronous execution schedule of a robot's joints (by DFS id).
+    Joints of the same BFS level only depend on the previous level, so a whole
+    level can be processed in one NumPy operation in forward (root to leaves)
+    and backward (leaves to root) tree passes.
+
+    For every BFS level l (the root joints first):
+    - level_jids[l]            - (k,) joint ids of the level
+    - level_parent_ids[l]      - (k,) parent joint ids (-1 for the base link)
+    - level_unique_parents[l]  - True if no two joints of the level share a parent
+                                 (backward passes can then accumulate without np.add.at)
+    And every joint grouped by kind (joint type and motion subspace):
+    - groups                   - [(jtype, S, jids)] with S the (6,) motion subspace
+                                 (None for the floating base joint)
+    """
+
+    def __init__(self, robot):
+        joints = robot.get_joints_ordered_by_id()
+        parent_ids = [robot.get_link_by_name(joint.get_parent()).get_id() for joint in joints]
+        kinds = [(joint.jtype, None) if joint.jtype == "floating" else \
+                 (joint.jtype, tuple(float(value) for value in np.reshape(joint.get_joint_subspace(), 6))) for joint in joints]
+        self.build(parent_ids, [joint.get_bfs_level() for joint in joints], kinds)
+
+    @staticmethod
+    def from_arrays(parent_ids, bfs_levels, kinds):
+        """
+        Returns the schedule of joints given as arrays (e.g., the joints of several robots
+        packed into one forest, see RobotScene) instead of a robot.
+
+        Inputs:
+        - parent_ids - (num_joints,) parent joint id of every joint (-1 for the base link)
+        - bfs_levels - (num_joints,) depth of every joint (0 for the root joints)
+        - kinds - [(jtype, S tuple or None)] kind of every joint (None for unused joint slots, left out of the schedule)
+
+        Output:
+        - (TraversalSchedule) - the schedule
+        """
+        schedule = TraversalSchedule.__new__(TraversalSchedule)
+        schedule.build(parent_ids, bfs_levels, kinds)
+        return schedule
+
+    def build(self, parent_ids, bfs_levels, kinds):
+        self.num_joints = len(parent_ids)
+        levels = {}
+        for jid in range(self.num_joints):
+            if kinds[jid] is not None:
+                levels.setdefault(int(bfs_levels[jid]), []).append(jid)
+        self.level_jids = []
+        self.level_parent_ids = []
+        self.level_unique_parents = []
+        for level in sorted(levels.keys()):
+            jids = np.array(sorted(levels[level]), dtype = int)
+            parents = np.array([parent_ids[jid] for jid in jids], dtype = int)
+            self.level_jids.append(jids)
+            self.level_parent_ids.append(parents)
+            self.level_unique_parents.append(len(np.unique(parents)) == len(parents))
+        self.level_jid_indices = [self.as_index(jids) for jids in self.level_jids]
+        self.level_parent_indices = [parents if parents[0] == -1 else self.as_index(parents) for parents in self.level_parent_ids]
+        # joints of the same type and motion subspace
+        groups = {}
+        for jid in range(self.num_joints):
+            if kinds[jid] is not None:
+                groups.setdefault(kinds[jid], []).append(jid)
+        self.groups = [(jtype, None if S is None else np.array(S), np.array(jids, dtype = int)) \
+                       for (jtype, S), jids in groups.items()]
+        for arrays in (self.level_jids, self.level_parent_ids, [jids for _, _, jids in self.groups]):
+            for array in arrays:
+                array.setflags(write = False)
+
+    def get_num_levels(self):
+        return len(self.level_jids)
+
+    def get_max_width(self):
+        # the most joints in a single level
+        return max([len(jids) for jids in self.level_jids] + [0])
+
+    def get_levels(self, reverse = False):
+        # [(jids, parent_ids, unique_parents)] from the root joints (or the leaves if reverse)
+        # contiguous id ranges (e.g., every level of a serial chain) are slices so indexing returns views
+        levels = list(zip(self.level_jid_indices, self.level_parent_indices, self.level_unique_parents))
+        return levels[::-1] if reverse else levels
+
+    def get_sublevels(self, jids, reverse = False):
+        # get_levels restricted to a subset of the joints (e.g., one branch of the tree), empty levels are dropped
+        selected = np.zeros(self.num_joints, dtype = bool)
+        selected[np.asarray(jids, dtype = int)] = True
+        levels = []
+        for level_jids, parent_ids in zip(self.level_jids, self.level_parent_ids):
+            keep = selected[level_jids]
+            if not np.any(keep):
+                continue
+            sub_jids = level_jids[keep]
+            sub_parents = parent_ids[keep]
+            unique_parents = len(np.unique(sub_parents)) == len(sub_parents)
+            levels.append((self.as_index(sub_jids), sub_parents if sub_parents[0] == -1 else self.as_index(sub_parents), unique_parents))
+        return levels[::-1] if reverse else levels
+
+    def as_index(self, ids):
+        # a slice for (non empty, non negative) contiguous increasing ids, the id array otherwise
+        if len(ids) > 0 and ids[0] >= 0 and np.all(np.diff(ids) == 1):
+            return slice(int(ids[0]), int(ids[-1]) + 1)
+        return ids
+
+    def get_groups(self):
+        return self.groups
+
+    def accumulate_to_parents(self, values, jids, parent_ids, unique_parents):
+        # values[:, parent] += values[:, child] for the joints of one level (from get_levels)
+        if not self.is_root_level(parent_ids):
+            self.add_to_parents(values, values[:, jids], parent_ids, unique_parents)
+
+    def is_root_level(self, parent_ids):
+        # the joints of the first level are attached to the base link
+        return not isinstance(parent_ids, slice) and parent_ids[0] == -1
+
+    def add_to_parents(self, values, children_values, parent_ids, unique_parents):
+        # values[:, parent_ids] += children_values (np.add.at handles repeated parents in order, so sums are deterministic)
+        if unique_parents:
+            values[:, parent_ids] += children_values
+        else:
+            np.add.at(values, (slice(None), parent_ids), children_values)
@@ -1,35 +1,135 @@
-from bs4 import BeautifulSoup
+import os
 import numpy as np
-import sympy as sp
 import copy
+import functools
+import threading
+from .LazyModule import LazyModule
 from .Robot import Robot
 from .Link import Link
 from .Joint import Joint, Fixed_Joint
+from .GeometrySet import GeometrySet
+from .SpatialAlgebra import Transform_Tools
+
+# only imported on first XML / symbolic use
+bs4 = LazyModule("bs4")
+sp = LazyModule("sympy")
+
+_parse_lock = threading.Lock()
 
 class URDFParser:
     def __init__(self):
         pass
     
     def parse(self, filename, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
-        Joint.floating_base = floating_base
         try:
-            # parse the file
-            urdf_file = open(filename, "r")
-            self.soup = BeautifulSoup(urdf_file.read(),"xml").find("robot")
-            # set up the robot object
-            self.robot = Robot(self.soup["name"], floating_base, using_quaternion)
-            # collect links
-            self.parse_links()
-            # collect joints
-            self.parse_joints()
-            # remove all fixed joints, renumber links and joints, and build parent and subtree lists
-            self.renumber_linksJoints(using_quaternion, alpha_tie_breaker)
-            # report joint ordering to user
-            self.print_joint_order()
-            # return the robot object
-            return copy.deepcopy(self.robot)
+            with open(filename, "r") as urdf_file:
+                urdf_string = urdf_file.read()
+        except:
+            return None
+        return self.parse_string(urdf_string, floating_base, using_quaternion, alpha_tie_breaker)
+
+    def parse_string(self, urdf_string, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
+        try:
+            soup = bs4.BeautifulSoup(urdf_string,"xml").find("robot")
+        except:
+            return None
+        return self.parse_soup(soup, floating_base, using_quaternion, alpha_tie_breaker)
+
+    def parse_bytes(self, urdf_bytes, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
+        # lxml honours the encoding declared in the XML header so hand the raw bytes straight through
+        return self.parse_string(bytes(urdf_bytes), floating_base, using_quaternion, alpha_tie_breaker)
+
+    def parse_fileobj(self, fileobj, floating_base = False, using_quaternion = True, alpha_tie_breaker = False):
+        # accepts both text and binary file-like objects (the caller keeps ownership of the object)
+        try:
+            contents = fileobj.read()
+        except:
+            return None
+        return self.parse_string(contents, floating_base, using_quaternion, alpha_tie_breaker)
+
+    async def parse_async(self, source, floating_base = False, using_quaternion = True, alpha_tie_breaker = False, executor = None):
+        """
+        Parses a URDF without blocking the running event loop. The XML and sympy
+        stages are run in the given executor (or the loop's default executor).
+
+        Inputs:
+        - source - a file path (str or os.PathLike), URDF XML string, bytes, or file-like object
+        - executor - an optional concurrent.futures executor
+
+        Outputs:
+        - (Robot) - the parsed robot (or None on failure)
+        """
+        import asyncio # imported here as it is slow to import and only needed by event loop users
+        if hasattr(source, "read"):
+            parse_func = URDFParser().parse_fileobj
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            parse_func = URDFParser().parse_bytes
+        elif isinstance(source, str) and source.lstrip().startswith("<"):
+            parse_func = URDFParser().parse_string
+        else:
+            # file paths (str or os.PathLike)
+            source = os.fspath(source)
+            parse_func = URDFParser().parse
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(parse_func, source, floating_base, using_quaternion, alpha_tie_breaker))
+
+    def update(self, robot, filename):
+        """
+        Incrementally re-parses an edited URDF file for a robot returned by this parser.
+        Links and joints whose URDF elements are unchanged are reused (and joints whose
+        kinematics are unchanged keep their symbolic transforms) so only edited
+        elements are rebuilt before the fixed joint merge and renumbering are rerun.
+
+        Inputs:
+        - (Robot) robot - a previously parsed robot (it is not modified)
+        - (str) filename - path to the edited URDF file
+
+        Output:
+        - (Robot) - the updated robot (or None on failure)
+        """
+        try:
+            with open(filename, "r") as urdf_file:
+                urdf_string = urdf_file.read()
+        except:
+            return None
+        return self.update_string(robot, urdf_string)
+
+    def update_string(self, robot, urdf_string):
+        try:
+            soup = bs4.BeautifulSoup(urdf_string,"xml").find("robot")
         except:
             return None
+        parse_cache = robot.parse_cache
+        if parse_cache is None:
+            return self.parse_soup(soup, robot.floating_base, robot.using_quaternion)
+        floating_base, using_quaternion, alpha_tie_breaker = parse_cache["options"]
+        return self.parse_soup(soup, floating_base, using_quaternion, alpha_tie_breaker, parse_cache)
+
+    def parse_soup(self, soup, floating_base = False, using_quaternion = True, alpha_tie_breaker = False, parse_cache = None):
+        # Joint.floating_base is shared class state so only one parse may run at a time
+        with _parse_lock:
+            Joint.floating_base = floating_base
+            try:
+                self.soup = soup
+                # cached link and joint objects (built before fixed joint removal) from a previous parse
+                self.prev_cache = parse_cache if parse_cache is not None else {"links": {}, "joints": {}}
+                self.parse_cache = {"options": (floating_base, using_quaternion, alpha_tie_breaker), "links": {}, "joints": {}}
+                self.num_rebuilt = {"links": 0, "joints": 0}
+                # set up the robot object
+                self.robot = Robot(self.soup["name"], floating_base, using_quaternion)
+                # collect links
+                self.parse_links()
+                # collect joints
+                self.parse_joints()
+                # remove all fixed joints, renumber links and joints, and build parent and subtree lists
+                self.renumber_linksJoints(using_quaternion, alpha_tie_breaker)
+                self.robot.parse_cache = self.parse_cache
+                # report joint ordering to user
+                self.print_joint_order()
+                # return the robot object (a fresh Robot is built on every parse so no copy is needed)
+                return self.robot
+            except:
+                return None
 
     def to_float(self, string_arr):
         try:
@@ -37,84 +137,158 @@ class URDFParser:
         except:
             return string_arr
 
+    def lookup_cache(self, kind, name, key):
+        # returns a clone of the previously built object if its source is unchanged (and records it for next time)
+        cached = self.prev_cache[kind].get(name)
+        if cached is not None and cached[0] == key:
+            self.parse_cache[kind][name] = cached
+            return cached[1].clone()
+        self.num_rebuilt[kind] += 1
+        return None
+
+    def store_cache(self, kind, name, key, obj):
+        # store a snapshot as later stages replace the robot's copy's ids, parents, transforms, and inertias
+        self.parse_cache[kind][name] = (key, obj.clone())
+
     def parse_links(self):
         lid = 0
         for raw_link in self.soup.find_all('link', recursive=False):
-            # construct link object
-            curr_link = Link(raw_link["name"],lid)
-            lid = lid + 1
-            # parse origin
-            raw_origin = raw_link.find("origin")
-            if raw_origin == None:
-                print("Link [" + curr_link.name + "] does not have an origin. Assuming this is the fixed world base frame. Else there is an error with your URDF file.")
-                curr_link.set_origin_xyz([0, 0, 0])
-                curr_link.set_origin_rpy([0, 0, 0])
+            key = str(raw_link)
+            curr_link = self.lookup_cache("links", raw_link["name"], key)
+            if curr_link is None:
+                curr_link = self.parse_link(raw_link, lid)
+                self.store_cache("links", curr_link.name, key, curr_link)
             else:
-                curr_link.set_origin_xyz(self.to_float(raw_origin["xyz"].split(" ")))
-                curr_link.set_origin_rpy(self.to_float(raw_origin["rpy"].split(" ")))
-            # parse inertial properties
-            raw_inertial = raw_link.find("inertial")
-            if raw_inertial == None:
-                print("Link [" + curr_link.name + "] does not have inertial properties. Assuming this is the fixed world base frame. Else there is an error with your URDF file.")
-                curr_link.set_inertia(0, 0, 0, 0, 0, 0, 0)
-            else:
-                # get mass and inertia values
-                raw_inertia = raw_inertial.find("inertia")
-                curr_link.set_inertia(float(raw_inertial.find("mass")["value"]), \
-                                      float(raw_inertia["ixx"]), \
-                                      float(raw_inertia["ixy"]), \
-                                      float(raw_inertia["ixz"]), \
-                                      float(raw_inertia["iyy"]), \
-                                      float(raw_inertia["iyz"]), \
-                                      float(raw_inertia["izz"]))
+                curr_link.set_id(lid)
+                curr_link.urdf_lid = lid
+            lid = lid + 1
             # store
-            self.robot.add_link(copy.deepcopy(curr_link))
+            self.robot.add_link(curr_link)
+
+    def parse_link(self, raw_link, lid):
+        # construct link object
+        curr_link = Link(raw_link["name"],lid)
+        # parse origin (of the inertial frame, the collision/visual elements have their own origins)
+        raw_inertial = raw_link.find("inertial")
+        raw_origin = None if raw_inertial is None else raw_inertial.find("origin")
+        if raw_origin == None:
+            print("Link [" + curr_link.name + "] does not have an origin. Assuming this is the fixed world base frame. Else there is an error with your URDF file.")
+            curr_link.set_origin_xyz([0, 0, 0])
+            curr_link.set_origin_rpy([0, 0, 0])
+        else:
+            curr_link.set_origin_xyz(self.to_float(raw_origin["xyz"].split(" ")))
+            curr_link.set_origin_rpy(self.to_float(raw_origin["rpy"].split(" ")))
+        # parse inertial properties
+        if raw_inertial == None:
+            print("Link [" + curr_link.name + "] does not have inertial properties. Assuming this is the fixed world base frame. Else there is an error with your URDF file.")
+            curr_link.set_inertia(0, 0, 0, 0, 0, 0, 0)
+        else:
+            # get mass and inertia values
+            raw_inertia = raw_inertial.find("inertia")
+            curr_link.set_inertia(float(raw_inertial.find("mass")["value"]), \
+                                  float(raw_inertia["ixx"]), \
+                                  float(raw_inertia["ixy"]), \
+                                  float(raw_inertia["ixz"]), \
+                                  float(raw_inertia["iyy"]), \
+                                  float(raw_inertia["iyz"]), \
+                                  float(raw_inertia["izz"]))
+        # parse collision and visual geometry
+        curr_link.set_collision_geometry(self.parse_geometry(raw_link.find_all("collision", recursive=False)))
+        curr_link.set_visual_geometry(self.parse_geometry(raw_link.find_all("visual", recursive=False)))
+        return curr_link
+
+    def parse_geometry(self, raw_elements):
+        geometry = GeometrySet()
+        for raw_element in raw_elements:
+            raw_geometry = raw_element.find("geometry")
+            if raw_geometry is None:
+                continue
+            raw_origin = raw_element.find("origin", recursive=False)
+            xyz = [0, 0, 0] if raw_origin is None or not raw_origin.has_attr("xyz") else self.to_float(raw_origin["xyz"].split())
+            rpy = [0, 0, 0] if raw_origin is None or not raw_origin.has_attr("rpy") else self.to_float(raw_origin["rpy"].split())
+            origin_hom = Transform_Tools().xyz_rpy_to_hom(xyz, rpy)
+            if raw_geometry.find("box") is not None:
+                geometry.add(GeometrySet.BOX, self.to_float(raw_geometry.find("box")["size"].split()), origin_hom)
+            elif raw_geometry.find("cylinder") is not None:
+                raw_cylinder = raw_geometry.find("cylinder")
+                geometry.add(GeometrySet.CYLINDER, [float(raw_cylinder["radius"]), float(raw_cylinder["length"]), 0], origin_hom)
+            elif raw_geometry.find("sphere") is not None:
+                geometry.add(GeometrySet.SPHERE, [float(raw_geometry.find("sphere")["radius"]), 0, 0], origin_hom)
+            elif raw_geometry.find("mesh") is not None:
+                raw_mesh = raw_geometry.find("mesh")
+                scale = [1, 1, 1] if not raw_mesh.has_attr("scale") else self.to_float(raw_mesh["scale"].split())
+                geometry.add(GeometrySet.MESH, scale, origin_hom, raw_mesh["filename"])
+            else:
+                print("Link geometry type not supported (only box, cylinder, sphere, and mesh)! Skipping it.")
+        return geometry
 
     def parse_joints(self):
         jid = 0
         for raw_joint in self.soup.find_all('joint', recursive=False):
-            # construct joint object
-            curr_joint = Joint(raw_joint["name"], jid, \
-                               raw_joint.find("parent")["link"], \
-                               raw_joint.find("child")["link"])
-            jid += 1
-            # get origin position and rotation
-            curr_joint.set_origin_xyz(self.to_float(raw_joint.find("origin")["xyz"].split(" ")))
-            curr_joint.set_origin_rpy(self.to_float(raw_joint.find("origin")["rpy"].split(" ")))
-            # set joint type and axis of motion for joints if applicable
-            raw_axis = raw_joint.find("axis")
-            if raw_axis is None:
-                curr_joint.set_type(raw_joint["type"])
-            else:
-                curr_joint.set_type(raw_joint["type"],self.to_float(raw_axis["xyz"].split(" ")))
-            raw_dynamics = raw_joint.find("dynamics")
-            if raw_dynamics is None:
-                curr_joint.set_damping(0)
+            # only the type, links, origin, and axis affect the (expensive) symbolic transforms
+            key = str((raw_joint["type"], raw_joint.find("parent"), raw_joint.find("child"), \
+                       raw_joint.find("origin"), raw_joint.find("axis")))
+            curr_joint = self.lookup_cache("joints", raw_joint["name"], key)
+            if curr_joint is None:
+                curr_joint = self.parse_joint_kinematics(raw_joint, jid)
+                self.store_cache("joints", curr_joint.name, key, curr_joint)
             else:
-                curr_joint.set_damping(float(raw_dynamics["damping"]))
+                curr_joint.set_id(jid)
+                curr_joint.urdf_jid = jid
+            jid += 1
+            # damping and limits are cheap so always parse them
+            self.parse_joint_properties(curr_joint, raw_joint)
+            # store
+            self.robot.add_joint(curr_joint)
 
-            # parse limits (upper/lower)
-            raw_limit = raw_joint.find("limit")
-            jtype = raw_joint["type"]
+    def parse_joint_kinematics(self, raw_joint, jid):
+        # construct joint object
+        curr_joint = Joint(raw_joint["name"], jid, \
+                           raw_joint.find("parent")["link"], \
+                           raw_joint.find("child")["link"])
+        # get origin position and rotation
+        curr_joint.set_origin_xyz(self.to_float(raw_joint.find("origin")["xyz"].split(" ")))
+        curr_joint.set_origin_rpy(self.to_float(raw_joint.find("origin")["rpy"].split(" ")))
+        # set joint type and axis of motion for joints if applicable
+        raw_axis = raw_joint.find("axis")
+        if raw_axis is None:
+            curr_joint.set_type(raw_joint["type"])
+        else:
+            curr_joint.set_type(raw_joint["type"],self.to_float(raw_axis["xyz"].split(" ")))
+        return curr_joint
 
-            lower = upper = None
+    def parse_joint_properties(self, curr_joint, raw_joint):
+        raw_dynamics = raw_joint.find("dynamics")
+        if raw_dynamics is None:
+            curr_joint.set_damping(0)
+        else:
+            curr_joint.set_damping(float(raw_dynamics["damping"]))
 
-            if jtype in ("revolute", "prismatic", "continuous"):
-                if raw_limit is not None:
-                    if raw_limit.has_attr("lower"): lower = float(raw_limit["lower"])
-                    if raw_limit.has_attr("upper"): upper = float(raw_limit["upper"])
+        # parse limits (upper/lower)
+        raw_limit = raw_joint.find("limit")
+        jtype = raw_joint["type"]
 
-                if jtype == "continuous":
-                    lower = float("-inf")
-                    upper = float("inf")
+        lower = upper = None
 
-                if lower is None: lower = float("-inf")
-                if upper is None: upper = float("inf")
+        if jtype in ("revolute", "prismatic", "continuous"):
+            if raw_limit is not None:
+                if raw_limit.has_attr("lower"): lower = float(raw_limit["lower"])
+                if raw_limit.has_attr("upper"): upper = float(raw_limit["upper"])
 
-                curr_joint.joint_limits = [lower, upper]
+            if jtype == "continuous":
+                lower = float("-inf")
+                upper = float("inf")
 
-            # store
-            self.robot.add_joint(copy.deepcopy(curr_joint))
+            if lower is None: lower = float("-inf")
+            if upper is None: upper = float("inf")
+
+            curr_joint.joint_limits = [lower, upper]
+
+            # parse velocity and effort limits (unlimited if not given)
+            has_velocity = raw_limit is not None and raw_limit.has_attr("velocity")
+            has_effort = raw_limit is not None and raw_limit.has_attr("effort")
+            curr_joint.set_velocity_limit(float(raw_limit["velocity"]) if has_velocity else float("inf"))
+            curr_joint.set_effort_limit(float(raw_limit["effort"]) if has_effort else float("inf"))
 
     def remove_fixed_joints(self):
         # start at the leaves and work upwards
@@ -126,6 +300,9 @@ class URDFParser:
                 for gcjoint in self.robot.get_joints_by_parent_name(curr_joint.child):
                     gcjoint.set_parent(curr_joint.get_parent())
                     gcjoint.set_transformation_matrix(gcjoint.get_transformation_matrix() * curr_joint.get_transformation_matrix())
+                    # and the homogenous pose (which composes in the opposite order) T_parent_grandchild = T_parent_child * T_child_grandchild
+                    if gcjoint.get_transformation_matrix_hom() is not None:
+                        gcjoint.set_transformation_matrix_hom(curr_joint.get_transformation_matrix_hom() * gcjoint.get_transformation_matrix_hom())
                 # combine inertia tensors of child and parent at parent
                 # note:  if X is the transform from A to B the I_B = X^T I_A X
                 # note2: inertias in the same from add so I_parent_final = I_parent + X^T I_child X
@@ -135,17 +312,26 @@ class URDFParser:
                 curr_Xmat = np.reshape(np.array(curr_joint.get_transformation_matrix()).astype(float),(6,6))
                 transformed_Imat = np.matmul(np.matmul(np.transpose(curr_Xmat),child_I),curr_Xmat)
                 parent_link.set_spatial_inertia(parent_link.get_spatial_inertia() + transformed_Imat)
+                # and move the child's geometry into the parent's frame
+                child_hom = Transform_Tools().spatial_to_hom(curr_Xmat)
+                for (parent_geometry, child_geometry) in [(parent_link.get_collision_geometry(), child_link.get_collision_geometry()), \
+                                                          (parent_link.get_visual_geometry(), child_link.get_visual_geometry())]:
+                    parent_geometry.extend(child_geometry, child_hom)
                 
-                # save the fixed joint for later
-                joint_hom = sp.matrix2numpy(curr_joint.get_transformation_matrix_hom()).astype(float)
-                parent_joint = self.robot.get_joints_by_child_name(parent_link.get_name())[0]
-                fj = Fixed_Joint(curr_joint.get_id(), curr_joint.get_name(), parent_joint.get_name(), joint_hom)
+                # save the fixed joint for later (relative to the parent joint's link or the base link (parent None))
+                if curr_joint.get_transformation_matrix_hom() is not None:
+                    joint_hom = sp.matrix2numpy(curr_joint.get_transformation_matrix_hom()).astype(float)
+                else:
+                    joint_hom = child_hom
+                parent_joints = self.robot.get_joints_by_child_name(parent_link.get_name())
+                parent_joint_name = parent_joints[0].get_name() if len(parent_joints) > 0 else None
+                fj = Fixed_Joint(curr_joint.get_id(), curr_joint.get_name(), parent_joint_name, joint_hom)
                 self.robot.add_fixed_joint(fj)
                 # update any fixed joints that had the current joint as the parent
                 for fixed_joint in self.robot.fixed_joints:
                     if fixed_joint.parent_name == curr_joint.get_name():
-                        fixed_joint.set_parent(parent_joint.get_name())
-                        new_hom = fixed_joint.get_transformation_matrix_hom() @ joint_hom
+                        fixed_joint.set_parent(parent_joint_name)
+                        new_hom = joint_hom @ fixed_joint.get_transformation_matrix_hom()
                         fixed_joint.set_transformation_matrix_hom(new_hom)
 
                 # delete the bypassed fixed joint and link
@@ -230,14 +416,20 @@ class URDFParser:
         world.set_origin_xyz([0, 0, 0])
         world.set_origin_rpy([0, 0, 0])
         world.set_inertia(0, 0, 0, 0, 0, 0, 0)
-        self.robot.add_link(copy.deepcopy(world))
-        # add floating joint
-        floating_joint = Joint("floating_base_joint", -2, "world", root_link_name, using_quaternion)
-        floating_joint.set_origin_xyz([0,0,0])
-        floating_joint.set_origin_rpy([0,0,0])
-        floating_joint.set_type("floating")
+        self.robot.add_link(world)
+        # add floating joint (reusing the symbolic transforms of a previous parse if possible)
+        key = str(("floating", root_link_name))
+        floating_joint = self.lookup_cache("joints", "floating_base_joint", key)
+        if floating_joint is None:
+            floating_joint = Joint("floating_base_joint", -2, "world", root_link_name, using_quaternion)
+            floating_joint.set_origin_xyz([0,0,0])
+            floating_joint.set_origin_rpy([0,0,0])
+            floating_joint.set_type("floating")
+            self.store_cache("joints", "floating_base_joint", key, floating_joint)
+        else:
+            floating_joint.set_id(-2)
         floating_joint.set_damping(0)
-        self.robot.add_joint(copy.deepcopy(floating_joint))
+        self.robot.add_joint(floating_joint)
         return "world" # world link is now the root
 
     def renumber_linksJoints(self, using_quaternion = True, alpha_tie_breaker = False):
@@ -247,6 +439,9 @@ class URDFParser:
         root_link_name = list(link_names.difference(links_that_are_children))[0]
         # adjust for floating base if applicable
         root_link_name = self.floating_base_adjust(root_link_name, using_quaternion)
+        self.renumber_from_root(root_link_name, alpha_tie_breaker)
+
+    def renumber_from_root(self, root_link_name, alpha_tie_breaker = False):
         # start renumbering at -1
         self.robot.get_link_by_name(root_link_name).set_id(-1)
         # generate the standard dfs ordering of joints/links
@@ -259,6 +454,30 @@ class URDFParser:
         self.bfs_order(root_link_name)
         self.build_subtree_lists()
 
+    def reduce(self, robot, root_link_name = None):
+        """
+        Collapses the fixed joints of an already parsed robot (e.g., after joints
+        were locked or links were dropped) and renumbers it in place. Only the
+        robot's fixed type joints are removed (merging inertias and geometry into
+        their parents and adding Fixed_Joint frames).
+
+        Inputs:
+        - (Robot) robot - the robot to reduce
+        - (str) root_link_name - the new root link (the current root if None)
+
+        Output:
+        - (Robot) - the reduced robot
+        """
+        self.robot = robot
+        if root_link_name is None:
+            root_link_name = robot.get_link_by_id(-1).get_name()
+        alpha_tie_breaker = robot.parse_cache["options"][2] if robot.parse_cache is not None else False
+        self.renumber_from_root(root_link_name, alpha_tie_breaker)
+        # the pre removal cache no longer describes this robot
+        robot.parse_cache = None
+        robot.clear_numeric_models()
+        return robot
+
     def print_joint_order(self):
         print("------------------------------------------")
         print("Assumed Input Joint Configuration Ordering")
@@ -274,5 +493,7 @@ class URDFParser:
         print("Fixed Joints Found (if any):")
         print("------------------------------------------")
         for fj in self.robot.fixed_joints:
-            print(fj.get_name() + " (id: " + str(fj.get_id()) + ", parent: " + fj.parent_name + ")")
+            # fixed frames attached to the base link have no parent joint
+            parent_name = fj.parent_name if fj.parent_name is not None else self.robot.get_link_by_id(-1).get_name() + " (base link)"
+            print(fj.get_name() + " (id: " + str(fj.get_id()) + ", parent: " + parent_name + ")")
         print("------------------------------------------")
\ No newline at end of file
@@ -1,6 +1,17 @@
 from .URDFParser import URDFParser
 from .Robot import Robot
+from .RobotRegistry import RobotRegistry
+from .CodeGenerator import CodeGenerator
 from .Link import Link
 from .Joint import Joint, Fixed_Joint
 from .InertiaSet import InertiaSet
-from .SpatialAlgebra import Origin, Translation, Rotation, Quaternion_Tools
\ No newline at end of file
+from .GeometrySet import GeometrySet
+from .NumericModel import NumericModel
+from .TraversalSchedule import TraversalSchedule
+from .RobotScene import RobotScene
+from .BranchParallel import BranchParallelExecutor
+from .SharedMemoryPool import SharedMemoryPool
+from .AccessorProfiler import AccessorProfiler
+from .InverseKinematics import InverseKinematics
+from .TrajectoryPipeline import TrajectoryReader, TrajectoryPipeline
+from .SpatialAlgebra import Origin, Translation, Rotation, Quaternion_Tools, Transform_Tools
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Measures the memory held per joint by a parsed synthetic serial chain (see
+helpers.synthetic_chain_urdf): the traced allocations still alive after the parse
+(with the parser released and sympy's cache cleared) and the pickled size of the joints.
+
+    python tests/benchmark_memory.py [num_joints ...]
+"""
+import gc
+import io
+import sys
+import pickle
+import contextlib
+import tracemalloc
+from helpers import import_package, synthetic_chain_urdf
+
+def benchmark_memory(num_joints = 100, rng = None):
+    package = import_package()
+    import sympy
+    urdf_string = synthetic_chain_urdf(num_joints, rng)
+    # warm up so the lazily imported modules are not counted
+    with contextlib.redirect_stdout(io.StringIO()):
+        package.URDFParser().parse_string(synthetic_chain_urdf(2, 0))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = package.URDFParser()
+        robot = parser.parse_string(urdf_string)
+    del parser
+    sympy.core.cache.clear_cache()
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    robot.parse_cache = None
+    num_joints = robot.get_num_joints()
+    return {"num_joints": num_joints, "traced_bytes_per_joint": traced // num_joints, \
+            "pickled_bytes_per_joint": len(pickle.dumps(robot.joints, pickle.HIGHEST_PROTOCOL)) // num_joints}
+
+if __name__ == "__main__":
+    for num_joints in [int(arg) for arg in sys.argv[1:]] or [100]:
+        print(benchmark_memory(num_joints, rng = 0))
@@ -0,0 +1,11 @@
+import pytest
+from helpers import PARENT_DIR, PACKAGE_NAME, import_package
+
+@pytest.fixture(scope = "session")
+def package_location():
+    # (directory to import from, package name)
+    return PARENT_DIR, PACKAGE_NAME
+
+@pytest.fixture(scope = "session")
+def urdf_package():
+    return import_package()
@@ -0,0 +1,36 @@
+import os
+import sys
+import importlib
+import numpy as np
+
+# the repository is the package (relative imports), so it is imported by its directory name from the parent directory
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARENT_DIR = os.path.dirname(REPO_DIR)
+PACKAGE_NAME = os.path.basename(REPO_DIR)
+if PARENT_DIR not in sys.path:
+    sys.path.insert(0, PARENT_DIR)
+
+def import_package():
+    return importlib.import_module(PACKAGE_NAME)
+
+def synthetic_chain_urdf(num_joints = 100, rng = None):
+    # URDF string of a random serial chain (revolute and prismatic joints about x, y, or z with rotated origins)
+    rng = np.random.default_rng(rng)
+    links = []
+    joints = []
+    for lid in range(num_joints + 1):
+        mass = rng.uniform(0.1, 2.0)
+        com = " ".join("%.3f" % value for value in rng.uniform(-0.1, 0.1, 3))
+        links.append('<link name="l%d"><inertial><origin xyz="%s" rpy="0 0 0"/><mass value="%.3f"/>' % (lid, com, mass) + \
+                     '<inertia ixx="0.015" ixy="0" ixz="0" iyy="0.015" iyz="0" izz="0.015"/></inertial></link>')
+        if lid > 0:
+            jtype = "revolute" if rng.uniform() < 0.75 else "prismatic"
+            xyz = " ".join("%.3f" % value for value in rng.uniform(-0.1, 0.2, 3))
+            # (exact right angles: the parser snaps transform entries within 1e-6 of a rational, so 1.571
+            # would leave rotations that are not orthonormal to about 1e-8)
+            rpy = ["0 0 0", "1.5707963267948966 0 0", "0 -1.5707963267948966 0", "0.3 0 0"][rng.integers(4)]
+            axis = ["1 0 0", "0 1 0", "0 0 1"][rng.integers(3)]
+            joints.append('<joint name="j%d" type="%s"><parent link="l%d"/><child link="l%d"/>' % (lid, jtype, lid - 1, lid) + \
+                          '<origin xyz="%s" rpy="%s"/><axis xyz="%s"/>' % (xyz, rpy, axis) + \
+                          '<limit lower="-1.5" upper="1.5" effort="10" velocity="2"/></joint>')
+    return '<?xml version="1.0"?>\n<robot name="chain%d">\n' % num_joints + "\n".join(links + joints) + "\n</robot>\n"
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+@pytest.fixture(scope = "module", params = [False, True], ids = ["fixed_base", "floating_base"])
+def model(request, urdf_package):
+    robot = urdf_package.URDFParser().parse_string(synthetic_chain_urdf(num_joints = 6, rng = 2), floating_base = request.param)
+    return robot.get_numeric_model()
+
+@pytest.fixture(scope = "module")
+def states(model):
+    rng = np.random.default_rng(3)
+    N = 8
+    return model.sample_uniform(N, rng), rng.standard_normal((N, model.num_vel)), rng.standard_normal((N, model.num_vel))
+
+def test_mass_matrix_columns(model, states):
+    # column i of M is the torque of a unit acceleration of velocity i (without gravity and velocities)
+    Q = states[0]
+    M = model.mass_matrix(Q)
+    for i in range(model.num_vel):
+        QDD = np.zeros((len(Q), model.num_vel))
+        QDD[:, i] = 1
+        np.testing.assert_allclose(M[:, :, i], model.inverse_dynamics(Q, 0*QDD, QDD, gravity = 0), atol = 1e-9)
+    np.testing.assert_allclose(M, np.swapaxes(M, 1, 2), atol = 1e-12)
+
+def test_coriolis_matrix(model, states):
+    # C qd are the velocity product forces
+    Q, QD, _ = states
+    bias = model.inverse_dynamics(Q, QD, np.zeros_like(QD), gravity = 0)
+    np.testing.assert_allclose(np.einsum("nij,nj->ni", model.coriolis_matrix(Q, QD), QD), bias, atol = 1e-9)
+
+def test_regressor(model, states):
+    tau = model.inverse_dynamics(*states, gravity = 9.81)
+    np.testing.assert_allclose(model.regressor(*states, gravity = 9.81) @ model.inertial_parameters(), tau, atol = 1e-9)
+
+def test_mass_matrix_derivative(model, states):
+    Q, QD, _ = states
+    Mdot = model.mass_matrix_derivative(Q, QD)
+    C = model.coriolis_matrix(Q, QD)
+    skew = Mdot - 2*C
+    np.testing.assert_allclose(skew, -np.swapaxes(skew, 1, 2), atol = 1e-9)
+    if not model.floating_base:
+        # central difference of M along the velocity (positions and velocities match without a floating base)
+        eps = 1e-6
+        expected = (model.mass_matrix(Q + eps*QD) - model.mass_matrix(Q - eps*QD)) / (2*eps)
+        np.testing.assert_allclose(Mdot, expected, atol = 1e-6)
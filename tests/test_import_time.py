@@ -0,0 +1,27 @@
+import re
+import sys
+import subprocess
+
+# optional or heavy modules that must only be imported when they are used (see LazyModule)
+LAZY_MODULES = ("sympy", "bs4", "lxml")
+# cumulative import time of the package itself (NumPy is imported first and not counted)
+MAX_IMPORT_SECONDS = 0.5
+
+def run_import(package_location):
+    parent_dir, package_name = package_location
+    code = "import numpy; import " + package_name + "; import sys; " + \
+           "print(' '.join(name for name in " + repr(LAZY_MODULES) + " if name in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd = parent_dir, \
+                            capture_output = True, text = True, check = True)
+    return result.stdout.split(), result.stderr
+
+def test_lazy_modules_not_imported(package_location):
+    imported, _ = run_import(package_location)
+    assert imported == []
+
+def test_import_time(package_location):
+    _, importtime = run_import(package_location)
+    # "import time: self [us] | cumulative | name" with the package's own line unindented
+    match = re.search(r"^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s" + re.escape(package_location[1]) + r"$", importtime, re.MULTILINE)
+    assert match is not None
+    assert int(match.group(1)) * 1e-6 < MAX_IMPORT_SECONDS
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+@pytest.fixture(scope = "module")
+def robot(urdf_package):
+    return urdf_package.URDFParser().parse_string(synthetic_chain_urdf(num_joints = 6, rng = 6))
+
+def test_reachable_targets_converge(urdf_package, robot):
+    ik = urdf_package.InverseKinematics(robot, "j6", max_iterations = 200)
+    model = robot.get_numeric_model()
+    rng = np.random.default_rng(7)
+    Q_true = model.sample_uniform(16, rng)
+    targets = model.frame_poses(Q_true, "j6")
+    Q0 = model.clamp(Q_true + 0.2*rng.standard_normal(Q_true.shape))
+    result = ik.solve(targets, Q0 = Q0, num_restarts = 5, rng = 10)
+    assert result["converged"].all()
+    assert model.within_limits(result["Q"]).all()
+    poses = model.frame_poses(result["Q"], "j6")
+    np.testing.assert_allclose(poses[:, :3, 3], targets[:, :3, 3], atol = ik.position_tolerance)
+    assert (result["position_error"] <= ik.position_tolerance).all()
+    assert (result["orientation_error"] <= ik.orientation_tolerance).all()
+
+def test_position_targets_and_limits(urdf_package, robot):
+    ik = urdf_package.InverseKinematics(robot, "j6")
+    model = robot.get_numeric_model()
+    reachable = model.frame_poses(model.sample_uniform(8, 8), "j6")[:, :3, 3]
+    # far out of reach targets do not converge but stay within the limits
+    targets = np.concatenate((reachable, [[100.0, 0, 0]]))
+    result = ik.solve(targets, num_restarts = 5, rng = 9)
+    assert result["converged"][:-1].all() and not result["converged"][-1]
+    assert model.within_limits(result["Q"]).all()
+    np.testing.assert_allclose(model.frame_poses(result["Q"][:-1], "j6")[:, :3, 3], reachable, atol = ik.position_tolerance)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+@pytest.fixture(scope = "module")
+def model(urdf_package):
+    robot = urdf_package.URDFParser().parse_string(synthetic_chain_urdf(num_joints = 6, rng = 4))
+    return robot.get_numeric_model()
+
+def test_spatial_velocities_match_finite_differences(model):
+    # world aligned velocities are [w; d(origin)/dt] of every link frame
+    rng = np.random.default_rng(5)
+    Q = model.sample_uniform(6, rng)
+    QD = rng.standard_normal((6, model.num_vel))
+    QDD = rng.standard_normal((6, model.num_vel))
+    eps = 1e-6
+    def poses(Q):
+        return model.link_poses(Q)
+    T = poses(Q)
+    T_dot = (poses(Q + eps*QD) - poses(Q - eps*QD)) / (2*eps)
+    R_dot_Rt = T_dot[..., :3, :3] @ np.swapaxes(T[..., :3, :3], -1, -2)
+    w = np.stack((R_dot_Rt[..., 2, 1], R_dot_Rt[..., 0, 2], R_dot_Rt[..., 1, 0]), axis = -1)
+    V, A = model.spatial_velocities_accelerations(Q, QD, QDD, frame = "world_aligned", classical = True)
+    np.testing.assert_allclose(V[..., :3], w, atol = 1e-6)
+    np.testing.assert_allclose(V[..., 3:], T_dot[..., :3, 3], atol = 1e-6)
+    # classical accelerations of the frame origins are the second derivative of the origins along q(t)
+    def origins(t):
+        return poses(Q + t*QD + 0.5*t*t*QDD)[..., :3, 3]
+    expected = (origins(1e-4) - 2*origins(0) + origins(-1e-4)) / 1e-8
+    np.testing.assert_allclose(A[..., 3:], expected, atol = 1e-4)
@@ -0,0 +1,61 @@
+import os
+import sys
+import subprocess
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+pytest.importorskip("numba")
+
+@pytest.fixture(scope = "module", params = [False, True], ids = ["fixed_base", "floating_base"])
+def models(request, urdf_package):
+    urdf_string = synthetic_chain_urdf(num_joints = 12, rng = 0)
+    robot = urdf_package.URDFParser().parse_string(urdf_string, floating_base = request.param)
+    return robot.get_numeric_model(), robot.get_numeric_model(backend = "numba")
+
+@pytest.fixture(scope = "module")
+def states(models):
+    model = models[0]
+    rng = np.random.default_rng(1)
+    N = 64
+    return model.sample_uniform(N, rng), rng.standard_normal((N, model.num_vel)), rng.standard_normal((N, model.num_vel))
+
+def test_backends_are_separate(models):
+    numpy_model, numba_model = models
+    assert numpy_model is not numba_model
+    assert numpy_model.backend == "numpy" and numpy_model.kernels is None
+    assert numba_model.backend == "numba"
+
+def test_forward_kinematics(models, states):
+    numpy_model, numba_model = models
+    Q = states[0]
+    np.testing.assert_allclose(numba_model.forward_kinematics_hom(Q), numpy_model.forward_kinematics_hom(Q), rtol = 1e-9, atol = 1e-9)
+
+def test_inverse_dynamics(models, states):
+    numpy_model, numba_model = models
+    np.testing.assert_allclose(numba_model.inverse_dynamics(*states), numpy_model.inverse_dynamics(*states), rtol = 1e-9, atol = 1e-8)
+
+def test_mass_matrix(models, states):
+    numpy_model, numba_model = models
+    Q = states[0]
+    np.testing.assert_allclose(numba_model.mass_matrix(Q), numpy_model.mass_matrix(Q), rtol = 1e-9, atol = 1e-9)
+
+# a default (NumPy) pool created after a numba kernel ran in the process must not hang the interpreter at exit
+POOL_AFTER_NUMBA = """
+import numpy as np
+from helpers import import_package, synthetic_chain_urdf
+robot = import_package().URDFParser().parse_string(synthetic_chain_urdf(num_joints = 5, rng = 0))
+Q = robot.get_numeric_model().sample_uniform(256, 0)
+robot.get_numeric_model(backend = "numba").inverse_dynamics(Q, Q, Q)
+with robot.get_shared_memory_pool(num_processes = 2) as pool:
+    assert np.allclose(pool.forward_kinematics_hom(Q), robot.get_numeric_model().forward_kinematics_hom(Q))
+print("done")
+"""
+
+def test_pool_after_numba_exits(package_location):
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH = os.pathsep.join([tests_dir, os.environ.get("PYTHONPATH", "")]))
+    result = subprocess.run([sys.executable, "-c", POOL_AFTER_NUMBA], cwd = package_location[0], env = env, \
+                            capture_output = True, text = True, timeout = 120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("done")
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+# a camera frame fixed to the base link of a serial chain
+ROOT_FIXED_FRAME = '<link name="camera"/><joint name="camera_joint" type="fixed"><parent link="l0"/><child link="camera"/>' + \
+                   '<origin xyz="0.1 0 0.2" rpy="0 0 1.5707963267948966"/></joint></robot>'
+
+@pytest.fixture(scope = "module")
+def root_fixed_urdf():
+    return synthetic_chain_urdf(num_joints = 3, rng = 0).replace("</robot>", ROOT_FIXED_FRAME)
+
+@pytest.mark.parametrize("floating_base", [False, True])
+def test_parse_root_fixed_frame(urdf_package, root_fixed_urdf, floating_base):
+    robot = urdf_package.URDFParser().parse_string(root_fixed_urdf, floating_base = floating_base)
+    assert robot is not None
+    fixed_joint = robot.get_fixed_joint_by_name("camera_joint")
+    # attached to the base link (or to the floating base joint's link)
+    assert fixed_joint.get_parent() == (None if not floating_base else robot.get_joints_ordered_by_id()[0].get_name())
+
+def test_root_fixed_frame_pose(urdf_package, root_fixed_urdf, tmp_path):
+    robot = urdf_package.URDFParser().parse_string(root_fixed_urdf)
+    expected = np.array([[0, -1, 0, 0.1], [1, 0, 0, 0], [0, 0, 1, 0.2], [0, 0, 0, 1]])
+    model = robot.get_numeric_model()
+    Q = model.sample_uniform(4, 0)
+    np.testing.assert_allclose(model.frame_poses(Q, "camera_joint"), np.broadcast_to(expected, (4, 4, 4)), atol = 1e-12)
+    T = model.forward_kinematics_hom(Q, include_fixed_joints = True)
+    np.testing.assert_allclose(T[:, -1], np.broadcast_to(expected, (4, 4, 4)), atol = 1e-12)
+    fk = urdf_package.CodeGenerator(robot, cache_dir = str(tmp_path)).load_module()
+    np.testing.assert_allclose(fk.fk_hom(Q), T, atol = 1e-12)
@@ -0,0 +1,48 @@
+import pickle
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+@pytest.fixture(scope = "module")
+def urdf_strings():
+    return [synthetic_chain_urdf(num_joints = 3, rng = seed) for seed in range(3)]
+
+def test_lru_eviction(urdf_package, urdf_strings):
+    registry = urdf_package.RobotRegistry(max_entries = 2)
+    first = registry.get_from_string(urdf_strings[0])
+    registry.get_from_string(urdf_strings[1])
+    assert registry.get_from_string(urdf_strings[0]) is first # a hit makes the first entry the most recent
+    registry.get_from_string(urdf_strings[2]) # evicts the second entry
+    stats = registry.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 3, 1)
+    assert registry.get_from_string(urdf_strings[0]) is first
+    registry.get_from_string(urdf_strings[1])
+    assert registry.get_stats()["misses"] == 4
+
+def test_byte_accounting(urdf_package, urdf_strings):
+    registry = urdf_package.RobotRegistry()
+    robots = [registry.get_from_string(urdf_string) for urdf_string in urdf_strings]
+    sizes = [len(pickle.dumps(robot, pickle.HIGHEST_PROTOCOL)) for robot in robots]
+    assert registry.get_stats()["total_bytes"] == sum(sizes)
+    # the update cache is not kept (or counted)
+    assert all(robot.parse_cache is None for robot in robots)
+    # only the newest entries that fit are kept
+    registry = urdf_package.RobotRegistry(max_bytes = sizes[1] + sizes[2])
+    for urdf_string in urdf_strings:
+        registry.get_from_string(urdf_string)
+    stats = registry.get_stats()
+    assert (stats["entries"], stats["evictions"], stats["total_bytes"]) == (2, 1, sizes[1] + sizes[2])
+    registry.clear()
+    assert registry.get_stats()["total_bytes"] == 0
+
+def test_read_only_sharing(urdf_package, urdf_strings):
+    registry = urdf_package.RobotRegistry()
+    shared = registry.get_from_string(urdf_strings[0])
+    assert registry.get_from_string(urdf_strings[0]) is shared
+    inertia = shared.get_links_ordered_by_id()[1].get_spatial_inertia()
+    with pytest.raises(ValueError):
+        inertia[0, 0] = 1
+    copy = registry.get_copy_from_string(urdf_strings[0])
+    assert copy is not shared
+    copy.get_links_ordered_by_id()[1].set_spatial_inertia(np.eye(6))
+    assert np.array_equal(shared.get_links_ordered_by_id()[1].get_spatial_inertia(), inertia)
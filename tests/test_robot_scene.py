@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+@pytest.fixture(scope = "module")
+def robots(urdf_package):
+    parser = urdf_package.URDFParser()
+    return [parser.parse_string(synthetic_chain_urdf(num_joints = 3, rng = 11)), \
+            parser.parse_string(synthetic_chain_urdf(num_joints = 6, rng = 12), floating_base = True), \
+            parser.parse_string(synthetic_chain_urdf(num_joints = 1, rng = 13))]
+
+def test_scene_matches_robot_models(urdf_package, robots):
+    scene = urdf_package.RobotScene(robots)
+    models = [robot.get_numeric_model() for robot in robots]
+    rng = np.random.default_rng(14)
+    N = 5
+    Qs = [model.sample_uniform(N, rng) for model in models]
+    QDs = [rng.standard_normal((N, model.num_vel)) for model in models]
+    QDDs = [rng.standard_normal((N, model.num_vel)) for model in models]
+    for T, model, Q in zip(scene.forward_kinematics_hom(Qs), models, Qs):
+        np.testing.assert_allclose(T, model.forward_kinematics_hom(Q), atol = 1e-12)
+    for tau, model, Q, QD, QDD in zip(scene.inverse_dynamics(Qs, QDs, QDDs), models, Qs, QDs, QDDs):
+        np.testing.assert_allclose(tau, model.inverse_dynamics(Q, QD, QDD), atol = 1e-9)
+    # packed inputs and padded outputs (padding is zero)
+    J, P, V = scene.get_padded_sizes()
+    tau = scene.inverse_dynamics(scene.pack_positions(Qs), scene.pack_velocities(QDs), scene.pack_velocities(QDDs), padded = True)
+    assert tau.shape == (N, len(robots), V)
+    for r, model in enumerate(models):
+        assert not tau[:, r, model.num_vel:].any()
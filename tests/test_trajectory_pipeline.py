@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+@pytest.fixture(scope = "module")
+def robot(urdf_package):
+    return urdf_package.URDFParser().parse_string(synthetic_chain_urdf(num_joints = 4, rng = 0))
+
+def test_csv_header_only_on_first_line(urdf_package, tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("a,b\n1,2\n\n3,4\n")
+    reader = urdf_package.TrajectoryReader(str(path))
+    assert reader.get_num_samples() == 2
+    np.testing.assert_array_equal(next(iter(reader))["data"], [[1, 2], [3, 4]])
+    path.write_text("a,b\n1,2\nnan?,4\n")
+    with pytest.raises(ValueError, match = "line 3"):
+        list(urdf_package.TrajectoryReader(str(path)))
+
+def test_npz_members_must_have_the_same_rows(urdf_package, tmp_path):
+    path = tmp_path / "log.npz"
+    np.savez(path, q = np.zeros((5, 4)), qd = np.zeros((6, 4)))
+    reader = urdf_package.TrajectoryReader(str(path))
+    with pytest.raises(ValueError, match = "different numbers of rows"):
+        reader.get_num_samples()
+    with pytest.raises(ValueError, match = "different numbers of rows"):
+        list(reader)
+
+def test_missing_columns(urdf_package, robot):
+    pipeline = urdf_package.TrajectoryPipeline(robot, quantities = ("torques",))
+    with pytest.raises(ValueError, match = "missing qd, qdd"):
+        list(pipeline.run({"q": np.zeros((3, 4))}))
+    with pytest.raises(ValueError, match = "columns"):
+        list(pipeline.run({"data": np.zeros((3, 5))}))
+    results = list(urdf_package.TrajectoryPipeline(robot, quantities = ("poses",)).run({"data": np.zeros((3, 4))}))
+    assert results[0][1]["poses"].shape[0] == 3
+
+def test_csv_header_names(urdf_package, robot, tmp_path):
+    pipeline = urdf_package.TrajectoryPipeline(robot, quantities = ("poses",))
+    assert pipeline.get_column_names()[:5] == ["q0", "q1", "q2", "q3", "qd0"]
+    path = tmp_path / "log.csv"
+    path.write_text("q0,q1,q2,q3\n" + "0,0,0,0\n" * 3)
+    assert len(next(pipeline.run(str(path)))[1]["poses"]) == 3
+    path.write_text("q0,q1,q3,q2\n" + "0,0,0,0\n" * 3)
+    with pytest.raises(ValueError, match = "Unexpected header"):
+        list(pipeline.run(str(path)))
+    path.write_text("q0,q1,q2\n" + "0,0,0,0\n" * 3)
+    with pytest.raises(ValueError, match = "names 3 columns"):
+        list(pipeline.run(str(path)))
+
+def test_write_empty_trajectory(urdf_package, robot, tmp_path):
+    pipeline = urdf_package.TrajectoryPipeline(robot, quantities = ("poses", "com"))
+    assert pipeline.write({"q": np.zeros((0, 4))}, str(tmp_path)) == {}
+    paths = pipeline.write({"q": np.zeros((5, 4))}, str(tmp_path))
+    assert sorted(paths) == ["com", "poses"] and np.load(paths["com"]).shape == (5, 3)
@@ -0,0 +1,36 @@
+import re
+import numpy as np
+import pytest
+from helpers import synthetic_chain_urdf
+
+def numeric_arrays(robot):
+    model = robot.get_numeric_model()
+    return {"Imats": model.Imats, "T_origin": model.T_origin, "parent_ids": model.parent_ids, "fixed_T": model.fixed_T}
+
+@pytest.mark.parametrize("floating_base", [False, True])
+def test_update_matches_full_parse(urdf_package, floating_base):
+    urdf_string = synthetic_chain_urdf(num_joints = 5, rng = 15).replace("</robot>", \
+        '<link name="camera"/><joint name="camera_joint" type="fixed"><parent link="l3"/><child link="camera"/>' + \
+        '<origin xyz="0.1 0 0.2" rpy="0 0 0"/></joint></robot>')
+    # edit an inertia, a joint axis, and a fixed frame origin
+    edited = re.sub(r'(<link name="l2">.*?<mass value=")[^"]*', r"\g<1>4.000", urdf_string)
+    edited = re.sub(r'(<joint name="j2".*?<axis xyz=")[^"]*', r"\g<1>0.6 0.8 0", edited)
+    edited = edited.replace('<origin xyz="0.1 0 0.2"', '<origin xyz="0.3 0 0.2"')
+    parser = urdf_package.URDFParser()
+    robot = parser.parse_string(urdf_string, floating_base = floating_base)
+    updated = parser.update_string(robot, edited)
+    reparsed = urdf_package.URDFParser().parse_string(edited, floating_base = floating_base)
+    assert updated is not None and reparsed is not None
+    # only the edited elements are rebuilt
+    assert parser.num_rebuilt == {"links": 1, "joints": 2}
+    assert [joint.get_name() for joint in updated.get_joints_ordered_by_id()] == [joint.get_name() for joint in reparsed.get_joints_ordered_by_id()]
+    expected = numeric_arrays(reparsed)
+    for name, values in numeric_arrays(updated).items():
+        np.testing.assert_allclose(values, expected[name], atol = 1e-12, err_msg = name)
+    model = reparsed.get_numeric_model()
+    rng = np.random.default_rng(16)
+    Q = model.sample_uniform(4, rng)
+    QD = rng.standard_normal((4, model.num_vel))
+    np.testing.assert_allclose(updated.get_numeric_model().inverse_dynamics(Q, QD, QD), model.inverse_dynamics(Q, QD, QD), atol = 1e-9)
+    # the unedited robot is unchanged
+    np.testing.assert_allclose(numeric_arrays(robot)["Imats"], numeric_arrays(parser.parse_string(urdf_string, floating_base = floating_base))["Imats"])